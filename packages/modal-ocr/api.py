@@ -15,25 +15,44 @@ Environment Variables:
 """
 
 import argparse
+import asyncio
 import base64
-import io
+import functools
+import hashlib
+import hmac
+import importlib
+import importlib.util
 import logging
 import os
+import random
 import sys
-import tempfile
 import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
 from contextlib import asynccontextmanager
 from datetime import datetime
 from enum import Enum
-from pathlib import Path
-from typing import Any, Dict, List, Optional, Union
+from typing import Any, Dict, List, Optional, Sequence
 
+import httpx
 import uvicorn
 from fastapi import Depends, FastAPI, File, Form, Header, HTTPException, UploadFile
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import JSONResponse
+from fastapi.responses import Response
 from pydantic import BaseModel, Field
 
+try:
+    # SIMD-accelerated decoder, same API as the stdlib module
+    import pybase64 as b64
+except ImportError:
+    b64 = base64
+
+try:
+    # SIMD/multi-lane hashing, several times faster than blake2b on large images
+    from blake3 import blake3
+except ImportError:
+    blake3 = None
+
 # Setup logging
 logging.basicConfig(
     level=logging.INFO,
@@ -49,16 +68,43 @@ API_VERSION = "1.0.0"
 API_KEY = os.getenv("OCR_API_KEY", "")
 DEFAULT_ENGINE = os.getenv("OCR_DEFAULT_ENGINE", "auto")
 
-ALLOWED_MIME_TYPES = {
+ALLOWED_MIME_TYPES = frozenset({
     "image/jpeg",
     "image/png",
     "image/webp",
     "image/tiff",
     "image/bmp",
     "application/pdf",
-}
+})
 
 MAX_FILE_SIZE = 50 * 1024 * 1024  # 50MB
+UPLOAD_CHUNK_SIZE = 1024 * 1024  # 1MB
+BASE64_OFFLOAD_SIZE = 1024 * 1024  # decode larger base64 payloads in the executor
+
+# uvicorn worker processes (set by main()); each one builds its own pools and executor,
+# so the per-process defaults below split the CPUs between them
+API_WORKERS = max(1, int(os.getenv("OCR_API_WORKERS") or 1))
+WORKER_CPUS = max(1, (os.cpu_count() or 1) // API_WORKERS)
+
+# Worker threads for blocking engine calls (most engines release the GIL in native code)
+EXECUTOR_MAX_WORKERS = int(os.getenv("OCR_EXECUTOR_WORKERS", min(8, WORKER_CPUS * 2)))
+
+# Global cap on in-flight OCR calls, and max instances per CPU engine
+MAX_CONCURRENT = int(os.getenv("OCR_MAX_CONCURRENT", EXECUTOR_MAX_WORKERS))
+CPU_ENGINE_POOL_SIZE = int(os.getenv("OCR_CPU_POOL_SIZE", WORKER_CPUS))
+
+# Outbound limits for API-based engines (Mistral OCR): requests/second and retries on 429
+API_ENGINE_RPS = float(os.getenv("OCR_API_ENGINE_RPS", 5))
+API_ENGINE_RETRIES = int(os.getenv("OCR_API_ENGINE_RETRIES", 3))
+API_RETRY_INITIAL_DELAY = 0.5
+API_RETRY_MAX_DELAY = 8.0
+RATE_LIMIT_MARKERS = ("429", "rate limit", "quota")
+
+# Debug: fully validate OCR responses instead of trusting process_with_engine's output
+VALIDATE_RESPONSES = os.getenv("OCR_VALIDATE_RESPONSES", "false").lower() in ("1", "true", "yes")
+
+# Max number of OCR results memoized in-process (0 disables the cache)
+RESULT_CACHE_SIZE = int(os.getenv("OCR_RESULT_CACHE_SIZE", 512))
 
 
 # =============================================================================
@@ -78,7 +124,51 @@ class EngineInfo(BaseModel):
 
 
 ENGINE_REGISTRY: Dict[str, EngineInfo] = {}
-ENGINE_INSTANCES: Dict[str, Any] = {}
+ENGINE_POOLS: Dict[str, asyncio.Queue] = {}
+ENGINE_POOL_CREATED: Dict[str, int] = {}
+EXECUTOR: Optional[ThreadPoolExecutor] = None
+PROCESS_SEMAPHORE: Optional[asyncio.Semaphore] = None
+HTTP_CLIENT: Optional[httpx.AsyncClient] = None
+RESULT_CACHE: "OrderedDict[tuple, Dict]" = OrderedDict()
+INFLIGHT: Dict[tuple, asyncio.Task] = {}
+API_RATE_LIMITERS: Dict[str, "AsyncRateLimiter"] = {}
+
+# Immutable views of the registry, rebuilt by register_engines()
+ENGINE_IDS: tuple = ()
+DEFAULT_COMPARE_ENGINES: tuple = ()
+ENGINES_LIST_RESPONSE: Optional["EngineListResponse"] = None
+
+
+# engine id -> (module, class name, default config)
+ENGINE_CLASSES: Dict[str, tuple] = {
+    "gutenocr-3b": ("engines.gutenocr_engine", "GutenOCREngine", {"model_size": "3b"}),
+    "gutenocr-7b": ("engines.gutenocr_engine", "GutenOCREngine", {"model_size": "7b"}),
+    # Rate limits are retried by _run_engine_uncached, which backs off without holding a worker
+    "mistral_ocr": ("engines.mistral_ocr_engine", "MistralOCREngine", {"retry_attempts": 1}),
+    "surya": ("engines.surya_engine", "SuryaEngine", {}),
+    "paddleocr": ("engines.paddleocr_engine", "PaddleOCREngine", {}),
+    "easyocr": ("engines.easyocr_engine", "EasyOCREngine", {}),
+    "tesseract": ("engines.tesseract_engine", "TesseractEngine", {}),
+}
+
+
+def _module_available(module_name: str) -> bool:
+    """Check a module can be imported, without importing it."""
+    try:
+        return importlib.util.find_spec(module_name) is not None
+    except (ImportError, ValueError):
+        # ValueError: already in sys.modules without a __spec__ (e.g. test stubs)
+        return module_name in sys.modules
+
+
+@functools.lru_cache(maxsize=None)
+def load_engine_class(engine_id: str) -> tuple:
+    """Import and return (engine class, default config) for an engine id."""
+    if engine_id not in ENGINE_CLASSES:
+        raise ValueError(f"Engine {engine_id} not implemented")
+    module_name, class_name, defaults = ENGINE_CLASSES[engine_id]
+    module = importlib.import_module(module_name)
+    return getattr(module, class_name), defaults
 
 
 def register_engines():
@@ -86,8 +176,7 @@ def register_engines():
     global ENGINE_REGISTRY
 
     # GutenOCR 3B
-    try:
-        from engines.gutenocr_engine import GutenOCREngine
+    if _module_available("engines.gutenocr_engine"):
         ENGINE_REGISTRY["gutenocr-3b"] = EngineInfo(
             id="gutenocr-3b",
             name="GutenOCR 3B",
@@ -109,12 +198,11 @@ def register_engines():
             cost_per_page=0.0,
         )
         logger.info("✅ GutenOCR engines registered")
-    except ImportError:
+    else:
         logger.warning("⚠️ GutenOCR not available (missing dependencies)")
 
     # Mistral OCR
-    try:
-        from engines.mistral_ocr_engine import MistralOCREngine
+    if _module_available("engines.mistral_ocr_engine"):
         mistral_available = bool(os.getenv("MISTRAL_API_KEY"))
         ENGINE_REGISTRY["mistral_ocr"] = EngineInfo(
             id="mistral_ocr",
@@ -126,13 +214,16 @@ def register_engines():
             available=mistral_available,
             cost_per_page=0.002,
         )
-        logger.info(f"{'✅' if mistral_available else '⚠️'} Mistral OCR {'registered' if mistral_available else 'requires MISTRAL_API_KEY'}")
-    except ImportError:
+        logger.info(
+            "%s Mistral OCR %s",
+            "✅" if mistral_available else "⚠️",
+            "registered" if mistral_available else "requires MISTRAL_API_KEY",
+        )
+    else:
         logger.warning("⚠️ Mistral OCR not available (missing dependencies)")
 
     # SuryaOCR
-    try:
-        from engines.surya_engine import SuryaEngine
+    if _module_available("engines.surya_engine"):
         ENGINE_REGISTRY["surya"] = EngineInfo(
             id="surya",
             name="SuryaOCR",
@@ -144,12 +235,11 @@ def register_engines():
             cost_per_page=0.0,
         )
         logger.info("✅ SuryaOCR registered")
-    except ImportError:
+    else:
         logger.warning("⚠️ SuryaOCR not available")
 
     # PaddleOCR
-    try:
-        from engines.paddleocr_engine import PaddleOCREngine
+    if _module_available("engines.paddleocr_engine"):
         ENGINE_REGISTRY["paddleocr"] = EngineInfo(
             id="paddleocr",
             name="PaddleOCR",
@@ -161,12 +251,11 @@ def register_engines():
             cost_per_page=0.0,
         )
         logger.info("✅ PaddleOCR registered")
-    except ImportError:
+    else:
         logger.warning("⚠️ PaddleOCR not available")
 
     # EasyOCR
-    try:
-        from engines.easyocr_engine import EasyOCREngine
+    if _module_available("engines.easyocr_engine"):
         ENGINE_REGISTRY["easyocr"] = EngineInfo(
             id="easyocr",
             name="EasyOCR",
@@ -178,12 +267,11 @@ def register_engines():
             cost_per_page=0.0,
         )
         logger.info("✅ EasyOCR registered")
-    except ImportError:
+    else:
         logger.warning("⚠️ EasyOCR not available")
 
     # Tesseract
-    try:
-        from engines.tesseract_engine import TesseractEngine
+    if _module_available("engines.tesseract_engine"):
         ENGINE_REGISTRY["tesseract"] = EngineInfo(
             id="tesseract",
             name="Tesseract",
@@ -195,17 +283,28 @@ def register_engines():
             cost_per_page=0.0,
         )
         logger.info("✅ Tesseract registered")
-    except ImportError:
+    else:
         logger.warning("⚠️ Tesseract not available")
 
-    logger.info(f"📋 Registered {len(ENGINE_REGISTRY)} OCR engines")
+    build_auto_table()
+    refresh_engine_snapshots()
+    logger.info("📋 Registered %d OCR engines", len(ENGINE_REGISTRY))
 
 
-def get_engine_instance(engine_id: str, config: Optional[Dict] = None) -> Any:
-    """Get or create an engine instance."""
-    if engine_id in ENGINE_INSTANCES:
-        return ENGINE_INSTANCES[engine_id]
+def refresh_engine_snapshots() -> None:
+    """Rebuild the per-request views of the registry (ids, defaults, /engines body)."""
+    global ENGINE_IDS, DEFAULT_COMPARE_ENGINES, ENGINES_LIST_RESPONSE
+    ENGINE_IDS = tuple(ENGINE_REGISTRY.keys())
+    DEFAULT_COMPARE_ENGINES = ENGINE_IDS[:3]  # Default: first 3 available
+    ENGINES_LIST_RESPONSE = EngineListResponse(
+        engines=list(ENGINE_REGISTRY.values()),
+        default=DEFAULT_ENGINE,
+        total=len(ENGINE_IDS),
+    )
 
+
+def create_engine_instance(engine_id: str, config: Optional[Dict] = None) -> Any:
+    """Create and initialize a new engine instance (blocking, run in the executor)."""
     if engine_id not in ENGINE_REGISTRY:
         raise ValueError(f"Unknown engine: {engine_id}")
 
@@ -214,44 +313,142 @@ def get_engine_instance(engine_id: str, config: Optional[Dict] = None) -> Any:
 
     config = config or {}
 
-    # Create engine instance
-    if engine_id == "gutenocr-3b":
-        from engines.gutenocr_engine import GutenOCREngine
-        engine = GutenOCREngine({"model_size": "3b", **config})
-    elif engine_id == "gutenocr-7b":
-        from engines.gutenocr_engine import GutenOCREngine
-        engine = GutenOCREngine({"model_size": "7b", **config})
-    elif engine_id == "mistral_ocr":
-        from engines.mistral_ocr_engine import MistralOCREngine
-        engine = MistralOCREngine(config)
-    elif engine_id == "surya":
-        from engines.surya_engine import SuryaEngine
-        engine = SuryaEngine(config)
-    elif engine_id == "paddleocr":
-        from engines.paddleocr_engine import PaddleOCREngine
-        engine = PaddleOCREngine(config)
-    elif engine_id == "easyocr":
-        from engines.easyocr_engine import EasyOCREngine
-        engine = EasyOCREngine(config)
-    elif engine_id == "tesseract":
-        from engines.tesseract_engine import TesseractEngine
-        engine = TesseractEngine(config)
-    else:
-        raise ValueError(f"Engine {engine_id} not implemented")
+    # Engine modules are imported here, on first use, not at registration
+    engine_class, defaults = load_engine_class(engine_id)
+    engine = engine_class({**defaults, **config})
 
     engine.initialize()
-    ENGINE_INSTANCES[engine_id] = engine
-    logger.info(f"✅ Engine {engine_id} initialized")
+    logger.info("✅ Engine %s initialized", engine_id)
 
     return engine
 
 
+def engine_pool_size(engine_id: str) -> int:
+    """Maximum number of instances kept for an engine."""
+    info = ENGINE_REGISTRY.get(engine_id)
+    if info is None or info.gpu_required or info.type == "vlm":
+        # One model per process: several copies would exhaust VRAM/RAM
+        return 1
+    if info.type == "api":
+        return MAX_CONCURRENT
+    return min(CPU_ENGINE_POOL_SIZE, MAX_CONCURRENT)
+
+
+def _get_semaphore() -> asyncio.Semaphore:
+    """Global semaphore bounding in-flight OCR calls."""
+    global PROCESS_SEMAPHORE
+    if PROCESS_SEMAPHORE is None:
+        PROCESS_SEMAPHORE = asyncio.Semaphore(MAX_CONCURRENT)
+    return PROCESS_SEMAPHORE
+
+
+def _new_http_client() -> httpx.AsyncClient:
+    """Create the shared client used to fetch image URLs (keeps connections alive)."""
+    return httpx.AsyncClient(
+        timeout=30.0,
+        limits=httpx.Limits(max_keepalive_connections=32, max_connections=64),
+    )
+
+
+def _get_http_client() -> httpx.AsyncClient:
+    """Shared HTTP client; created on demand when the lifespan did not run."""
+    global HTTP_CLIENT
+    if HTTP_CLIENT is None:
+        HTTP_CLIENT = _new_http_client()
+    return HTTP_CLIENT
+
+
+# Put in a pool when an instance creation fails, to wake one waiter so it retries
+_CREATION_FAILED = object()
+
+
+@asynccontextmanager
+async def acquire_engine(engine_id: str, config: Optional[Dict] = None):
+    """
+    Borrow an engine instance from its pool.
+
+    Instances are created lazily up to engine_pool_size(); once the pool is
+    full, callers wait for an instance to be returned. A failed or cancelled
+    creation frees its slot and wakes one waiter, which then retries it.
+    """
+    pool = ENGINE_POOLS.get(engine_id)
+    if pool is None:
+        pool = ENGINE_POOLS[engine_id] = asyncio.Queue()
+
+    while True:
+        if pool.empty() and ENGINE_POOL_CREATED.get(engine_id, 0) < engine_pool_size(engine_id):
+            # Reserve the slot before awaiting so concurrent callers don't overshoot
+            ENGINE_POOL_CREATED[engine_id] = ENGINE_POOL_CREATED.get(engine_id, 0) + 1
+            try:
+                loop = asyncio.get_running_loop()
+                engine = await loop.run_in_executor(
+                    EXECUTOR,
+                    functools.partial(create_engine_instance, engine_id, config),
+                )
+            except BaseException:
+                # BaseException: a client disconnect (CancelledError) must free the slot too
+                ENGINE_POOL_CREATED[engine_id] -= 1
+                pool.put_nowait(_CREATION_FAILED)
+                raise
+            break
+
+        engine = await pool.get()
+        if engine is not _CREATION_FAILED:
+            break
+
+    try:
+        yield engine
+    finally:
+        pool.put_nowait(engine)
+
+
+# Document type hints that change the auto-selection, grouped by class
+INVOICE_DOCUMENT_TYPES = frozenset({"invoice", "form", "facture", "formulaire"})
+MANUSCRIPT_DOCUMENT_TYPES = frozenset({"manuscript", "manuscrit", "handwriting"})
+PRIORITIES = ("speed", "accuracy", "cost", "balanced")
+
+# (priority, has_gpu, document class) -> engine id, rebuilt by register_engines()
+AUTO_TABLE: Dict[tuple, str] = {}
+
+
+def _doc_class(document_type: Optional[str]) -> Optional[str]:
+    """Reduce a document type hint to the classes auto-selection cares about."""
+    if document_type in INVOICE_DOCUMENT_TYPES:
+        return "invoice"
+    if document_type in MANUSCRIPT_DOCUMENT_TYPES:
+        return "manuscript"
+    return None
+
+
+def build_auto_table() -> None:
+    """Precompute auto-selection for every input combination (registry is static)."""
+    AUTO_TABLE.clear()
+    if not any(e.available for e in ENGINE_REGISTRY.values()):
+        return
+    for priority in PRIORITIES:
+        for has_gpu in (True, False):
+            for doc_class in (None, "invoice", "manuscript"):
+                AUTO_TABLE[(priority, has_gpu, doc_class)] = _auto_select(doc_class, priority, has_gpu)
+
+
 def auto_select_engine(
     document_type: Optional[str] = None,
     priority: str = "balanced",
     has_gpu: bool = False,
 ) -> str:
     """Auto-select the best engine based on criteria."""
+    doc_class = _doc_class(document_type)
+    if priority not in PRIORITIES:
+        priority = "balanced"
+    engine = AUTO_TABLE.get((priority, has_gpu, doc_class))
+    if engine is not None:
+        return engine
+    # Table not built yet (register_engines not run): evaluate directly
+    return _auto_select(doc_class, priority, has_gpu)
+
+
+def _auto_select(doc_class: Optional[str], priority: str, has_gpu: bool) -> str:
+    """Selection rules behind auto_select_engine and AUTO_TABLE."""
     available = [e for e in ENGINE_REGISTRY.values() if e.available]
 
     if not available:
@@ -265,10 +462,10 @@ def auto_select_engine(
 
     # Priority: accuracy
     if priority == "accuracy":
-        if document_type in ["invoice", "form", "facture", "formulaire"]:
+        if doc_class == "invoice":
             if "mistral_ocr" in ENGINE_REGISTRY and ENGINE_REGISTRY["mistral_ocr"].available:
                 return "mistral_ocr"
-        if document_type in ["manuscript", "manuscrit", "handwriting"]:
+        if doc_class == "manuscript":
             if "gutenocr-7b" in ENGINE_REGISTRY and ENGINE_REGISTRY["gutenocr-7b"].available and has_gpu:
                 return "gutenocr-7b"
         if "gutenocr-7b" in ENGINE_REGISTRY and ENGINE_REGISTRY["gutenocr-7b"].available and has_gpu:
@@ -291,6 +488,31 @@ def auto_select_engine(
     return available[0].id
 
 
+def select_engine_or_raise(
+    document_type: Optional[str] = None,
+    priority: str = "balanced",
+    has_gpu: bool = False,
+) -> str:
+    """auto_select_engine for endpoints: no usable engine becomes an HTTP error."""
+    try:
+        return auto_select_engine(document_type=document_type, priority=priority, has_gpu=has_gpu)
+    except ValueError as e:
+        raise HTTPException(
+            status_code=500,
+            detail={"error": str(e), "error_code": "NO_ENGINE_AVAILABLE"},
+        )
+
+
+@functools.lru_cache(maxsize=1)
+def detect_gpu() -> bool:
+    """Whether a CUDA GPU is usable; probed once (CUDA init is slow), then cached."""
+    try:
+        import torch
+        return torch.cuda.is_available()
+    except Exception:
+        return False
+
+
 # =============================================================================
 # Request/Response Models
 # =============================================================================
@@ -346,6 +568,20 @@ class OCRResponse(BaseModel):
     structured_data: Optional[Dict] = None
 
 
+def build_ocr_response(result: Dict) -> OCRResponse:
+    """
+    Wrap a process_with_engine result in an OCRResponse.
+
+    The dict is built by our own code with the right keys and types, so it is
+    constructed without re-validating every block unless OCR_VALIDATE_RESPONSES is set.
+    """
+    if VALIDATE_RESPONSES:
+        return OCRResponse.model_validate(result)
+    return OCRResponse.model_construct(
+        **{**result, "blocks": [OCRBlock.model_construct(**b) for b in result["blocks"]]}
+    )
+
+
 class HealthResponse(BaseModel):
     """Health check response."""
     status: str
@@ -397,19 +633,19 @@ class ErrorResponse(BaseModel):
 # Authentication
 # =============================================================================
 
-async def verify_api_key(x_api_key: Optional[str] = Header(None, alias="X-API-Key")):
-    """Verify API key from header."""
-    if not API_KEY:
-        # No API key configured = no auth required
-        return True
+_API_KEY_BYTES = API_KEY.encode("utf-8")
+
 
+async def _verify_api_key(x_api_key: Optional[str] = Header(None, alias="X-API-Key")):
+    """Verify API key from header."""
     if not x_api_key:
         raise HTTPException(
             status_code=401,
             detail={"error": "API key required", "error_code": "MISSING_API_KEY"},
         )
 
-    if x_api_key != API_KEY:
+    # Constant-time comparison: don't leak how much of the key matched
+    if not hmac.compare_digest(x_api_key.encode("utf-8"), _API_KEY_BYTES):
         raise HTTPException(
             status_code=403,
             detail={"error": "Invalid API key", "error_code": "INVALID_API_KEY"},
@@ -418,6 +654,14 @@ async def verify_api_key(x_api_key: Optional[str] = Header(None, alias="X-API-Ke
     return True
 
 
+async def _no_api_key_required():
+    """No API key configured = no auth required."""
+    return True
+
+
+verify_api_key = _verify_api_key if API_KEY else _no_api_key_required
+
+
 # =============================================================================
 # FastAPI Application
 # =============================================================================
@@ -426,17 +670,32 @@ async def verify_api_key(x_api_key: Optional[str] = Header(None, alias="X-API-Ke
 async def lifespan(app: FastAPI):
     """Application lifespan handler."""
     # Startup
+    global EXECUTOR, PROCESS_SEMAPHORE, HTTP_CLIENT
     logger.info("🚀 Starting ScanFactory OCR API...")
     register_engines()
+    logger.info("🖥️ GPU available: %s", detect_gpu())
+    EXECUTOR = ThreadPoolExecutor(max_workers=EXECUTOR_MAX_WORKERS, thread_name_prefix="ocr-engine")
+    PROCESS_SEMAPHORE = asyncio.Semaphore(MAX_CONCURRENT)
+    HTTP_CLIENT = _new_http_client()
     yield
     # Shutdown
     logger.info("🛑 Shutting down ScanFactory OCR API...")
-    for engine_id, engine in ENGINE_INSTANCES.items():
-        try:
-            engine.cleanup()
-            logger.info(f"Cleaned up {engine_id}")
-        except Exception as e:
-            logger.warning(f"Error cleaning up {engine_id}: {e}")
+    await HTTP_CLIENT.aclose()
+    HTTP_CLIENT = None
+    EXECUTOR.shutdown(wait=True, cancel_futures=True)
+    EXECUTOR = None
+    for engine_id, pool in ENGINE_POOLS.items():
+        while not pool.empty():
+            engine = pool.get_nowait()
+            if engine is _CREATION_FAILED:
+                continue
+            try:
+                engine.cleanup()
+                logger.info("Cleaned up %s", engine_id)
+            except Exception as e:
+                logger.warning("Error cleaning up %s: %s", engine_id, e)
+    ENGINE_POOLS.clear()
+    ENGINE_POOL_CREATED.clear()
 
 
 app = FastAPI(
@@ -481,20 +740,27 @@ async def get_image_bytes(
     image_url: Optional[str] = None,
 ) -> bytes:
     """Get image bytes from file upload, base64, or URL."""
-    import httpx
-
     if file:
-        content = await file.read()
-        if len(content) > MAX_FILE_SIZE:
-            raise HTTPException(
-                status_code=413,
-                detail={"error": f"File too large (max {MAX_FILE_SIZE // 1024 // 1024}MB)", "error_code": "FILE_TOO_LARGE"},
-            )
-        return content
+        # Read in chunks so oversized uploads are rejected without buffering them fully
+        chunks = []
+        received = 0
+        while chunk := await file.read(UPLOAD_CHUNK_SIZE):
+            received += len(chunk)
+            if received > MAX_FILE_SIZE:
+                raise HTTPException(
+                    status_code=413,
+                    detail={"error": f"File too large (max {MAX_FILE_SIZE // 1024 // 1024}MB)", "error_code": "FILE_TOO_LARGE"},
+                )
+            chunks.append(chunk)
+        return b"".join(chunks)
 
     if image_base64:
         try:
-            return base64.b64decode(image_base64)
+            if len(image_base64) > BASE64_OFFLOAD_SIZE:
+                # Multi-MB payloads: decode off the event loop
+                loop = asyncio.get_running_loop()
+                return await loop.run_in_executor(EXECUTOR, b64.b64decode, image_base64)
+            return b64.b64decode(image_base64)
         except Exception as e:
             raise HTTPException(
                 status_code=400,
@@ -503,10 +769,7 @@ async def get_image_bytes(
 
     if image_url:
         try:
-            async with httpx.AsyncClient(timeout=30.0) as client:
-                response = await client.get(image_url)
-                response.raise_for_status()
-                return response.content
+            return await _download_image(image_url)
         except Exception as e:
             raise HTTPException(
                 status_code=400,
@@ -519,56 +782,299 @@ async def get_image_bytes(
     )
 
 
-def process_with_engine(engine_id: str, image_bytes: bytes, config: Dict = None) -> Dict:
-    """Process image with specified engine."""
-    start_time = time.time()
+async def _download_image(url: str) -> bytes:
+    """Stream an image into one growing buffer, rejecting anything over MAX_FILE_SIZE."""
+    buffer = bytearray()
+    async with _get_http_client().stream("GET", url) as response:
+        response.raise_for_status()
+        if int(response.headers.get("content-length") or 0) > MAX_FILE_SIZE:
+            raise ValueError(f"image larger than {MAX_FILE_SIZE // 1024 // 1024}MB")
+        async for chunk in response.aiter_bytes(UPLOAD_CHUNK_SIZE):
+            buffer += chunk
+            if len(buffer) > MAX_FILE_SIZE:
+                raise ValueError(f"image larger than {MAX_FILE_SIZE // 1024 // 1024}MB")
+    return bytes(buffer)
+
+
+def _failed_result(engine_id: str, error: Exception, start_time: float) -> Dict:
+    """Build the result dict returned when an engine call fails."""
+    logger.error("Error processing with %s: %s", engine_id, error)
+    processing_time = int((time.time() - start_time) * 1000)
+    return {
+        "success": False,
+        "text": "",
+        "confidence": 0.0,
+        "blocks": [],
+        "engine": engine_id,
+        "processing_time_ms": processing_time,
+        "metadata": {"error": str(error)},
+    }
 
-    try:
-        engine = get_engine_instance(engine_id, config)
 
-        # Save to temp file for processing
-        with tempfile.NamedTemporaryFile(suffix=".png", delete=False) as f:
-            f.write(image_bytes)
-            temp_path = Path(f.name)
+def process_with_engine(engine_id: str, engine: Any, image_bytes: bytes) -> Dict:
+    """Process image with an already acquired engine instance."""
+    start_time = time.time()
 
-        try:
-            result = engine.process(temp_path)
-
-            processing_time = int((time.time() - start_time) * 1000)
-
-            return {
-                "success": True,
-                "text": result.text,
-                "confidence": result.confidence,
-                "blocks": [
-                    OCRBlock(
-                        text=b.get("text", ""),
-                        confidence=b.get("confidence", 0.0),
-                        bbox=b.get("bbox"),
-                        type=b.get("type"),
-                    ).model_dump()
-                    for b in result.blocks
-                ] if result.blocks else [],
-                "engine": engine_id,
-                "processing_time_ms": processing_time,
-                "metadata": result.metadata or {},
-            }
-        finally:
-            temp_path.unlink(missing_ok=True)
+    try:
+        # The upload bytes go straight to the engine, which decodes them from an
+        # in-memory buffer (BaseEngine.load_image); nothing is written to disk
+        result = engine.process_bytes(image_bytes)
 
-    except Exception as e:
-        logger.error(f"Error processing with {engine_id}: {e}")
         processing_time = int((time.time() - start_time) * 1000)
+
         return {
-            "success": False,
-            "text": "",
-            "confidence": 0.0,
-            "blocks": [],
+            "success": True,
+            "text": result.text,
+            "confidence": result.confidence,
+            # Already in OCRBlock's shape: build_ocr_response skips re-validating them
+            "blocks": [
+                {
+                    "text": b.get("text", ""),
+                    "confidence": b.get("confidence", 0.0),
+                    "bbox": b.get("bbox"),
+                    "type": b.get("type"),
+                }
+                for b in result.blocks
+            ] if result.blocks else [],
             "engine": engine_id,
             "processing_time_ms": processing_time,
-            "metadata": {"error": str(e)},
+            "metadata": result.metadata or {},
         }
 
+    except Exception as e:
+        return _failed_result(engine_id, e, start_time)
+
+
+def result_cache_key(engine_id: str, image_bytes: bytes, config: Optional[Dict] = None) -> tuple:
+    """Cache key for an OCR call: engine, content digest and options."""
+    if blake3 is not None:
+        digest = blake3(image_bytes).digest(length=16)
+    else:
+        digest = hashlib.blake2b(image_bytes, digest_size=16).digest()
+    return (engine_id, digest, tuple(sorted((config or {}).items())))
+
+
+def _cache_result(key: tuple, result: Dict) -> None:
+    """Store a successful result, evicting the least recently used entry."""
+    if RESULT_CACHE_SIZE <= 0 or not result["success"]:
+        return
+    RESULT_CACHE[key] = result
+    RESULT_CACHE.move_to_end(key)
+    while len(RESULT_CACHE) > RESULT_CACHE_SIZE:
+        RESULT_CACHE.popitem(last=False)
+
+
+async def run_engine(engine_id: str, image_bytes: bytes, config: Dict = None) -> Dict:
+    """
+    Run an OCR call, serving repeated identical requests from the result cache.
+
+    Only successful results are cached so transient failures can be retried.
+    Identical requests arriving while one is already running share its task
+    instead of starting another inference.
+    """
+    key = result_cache_key(engine_id, image_bytes, config)
+    cached = RESULT_CACHE.get(key)
+    if cached is not None:
+        RESULT_CACHE.move_to_end(key)
+        return cached
+
+    task = INFLIGHT.get(key)
+    if task is None:
+        task = asyncio.ensure_future(_run_engine_uncached(engine_id, image_bytes, config))
+        INFLIGHT[key] = task
+
+        def _done(t: asyncio.Task) -> None:
+            INFLIGHT.pop(key, None)
+            if not t.cancelled() and t.exception() is None:
+                _cache_result(key, t.result())
+
+        task.add_done_callback(_done)
+
+    # shield: one caller disconnecting must not cancel the work for the others
+    return await asyncio.shield(task)
+
+
+async def _run_engine_uncached(engine_id: str, image_bytes: bytes, config: Dict = None) -> Dict:
+    """
+    Dispatch an OCR call; API-based engines are rate limited and retried.
+
+    Retries only happen on rate-limit/quota errors, with exponential backoff
+    and jitter, outside the global semaphore so waiting calls don't hold a slot.
+    An engine configured to retry on its own (retry_attempts > 1) is rate
+    limited but called once, so the two retry loops don't multiply the calls.
+    """
+    info = ENGINE_REGISTRY.get(engine_id)
+    if info is None or info.type != "api":
+        return await _dispatch(engine_id, image_bytes, config)
+
+    limiter = API_RATE_LIMITERS.get(engine_id)
+    if limiter is None:
+        limiter = API_RATE_LIMITERS[engine_id] = AsyncRateLimiter(API_ENGINE_RPS)
+
+    # At least one attempt, even with OCR_API_ENGINE_RETRIES=0
+    attempts = 1 if _engine_retries(engine_id, config) > 1 else max(1, API_ENGINE_RETRIES)
+    for attempt in range(1, attempts + 1):
+        await limiter.acquire()
+        result = await _dispatch(engine_id, image_bytes, config)
+        if result["success"] or attempt == attempts or not _is_rate_limited(result):
+            return result
+
+        delay = min(API_RETRY_MAX_DELAY, API_RETRY_INITIAL_DELAY * 2 ** (attempt - 1))
+        delay = random.uniform(delay / 2, delay)
+        logger.warning(
+            "⏳ %s rate limited, retry %d/%d in %.1fs",
+            engine_id, attempt, attempts - 1, delay,
+        )
+        await asyncio.sleep(delay)
+
+
+async def _dispatch(engine_id: str, image_bytes: bytes, config: Dict = None) -> Dict:
+    """
+    Run an OCR call in the worker pool so the event loop stays free.
+
+    The engine pool bounds how many calls hit the same engine concurrently;
+    the global semaphore bounds in-flight work. The engine is taken first so
+    a call waiting on a busy pool does not hold a global slot.
+    """
+    start_time = time.time()
+    loop = asyncio.get_running_loop()
+
+    try:
+        async with acquire_engine(engine_id, config) as engine:
+            async with _get_semaphore():
+                # EXECUTOR is None outside the lifespan (e.g. TestClient without context)
+                return await loop.run_in_executor(
+                    EXECUTOR,
+                    functools.partial(process_with_engine, engine_id, engine, image_bytes),
+                )
+    except Exception as e:
+        return _failed_result(engine_id, e, start_time)
+
+
+def _engine_retries(engine_id: str, config: Optional[Dict] = None) -> int:
+    """Attempts the engine makes itself per call (its retry_attempts setting, 1 if unset)."""
+    defaults = ENGINE_CLASSES[engine_id][2] if engine_id in ENGINE_CLASSES else {}
+    return int({**defaults, **(config or {})}.get("retry_attempts", 1))
+
+
+def _is_rate_limited(result: Dict) -> bool:
+    """Whether a failed result was caused by a rate limit or quota error."""
+    error = str(result["metadata"].get("error", "")).lower()
+    return any(marker in error for marker in RATE_LIMIT_MARKERS)
+
+
+class AsyncRateLimiter:
+    """Space out acquisitions so at most `rate` calls start per second."""
+
+    def __init__(self, rate: float):
+        self.interval = 1.0 / rate if rate > 0 else 0.0
+        self._next_slot = 0.0
+
+    async def acquire(self) -> None:
+        # No lock needed: the slot is reserved before the first await
+        now = time.monotonic()
+        wait = self._next_slot - now
+        self._next_slot = max(now, self._next_slot) + self.interval
+        if wait > 0:
+            await asyncio.sleep(wait)
+
+
+async def _compare_one(engine_id: str, image_bytes: bytes) -> CompareResult:
+    """Run a single engine for a comparison request."""
+    if engine_id not in ENGINE_REGISTRY:
+        return CompareResult(
+            engine=engine_id,
+            success=False,
+            processing_time_ms=0,
+            error=f"Unknown engine: {engine_id}",
+        )
+
+    if not ENGINE_REGISTRY[engine_id].available:
+        return CompareResult(
+            engine=engine_id,
+            success=False,
+            processing_time_ms=0,
+            error=f"Engine not available: {engine_id}",
+        )
+
+    result = await run_engine(engine_id, image_bytes)
+    return CompareResult(
+        engine=engine_id,
+        success=result["success"],
+        text=result["text"][:500] if result["text"] else None,  # Truncate for comparison
+        confidence=result["confidence"],
+        processing_time_ms=result["processing_time_ms"],
+        error=result["metadata"].get("error") if not result["success"] else None,
+    )
+
+
+async def compare_on_engines(engine_list: Sequence[str], image_bytes: bytes) -> List[CompareResult]:
+    """
+    Run all engines concurrently; latency is the slowest engine, not the sum.
+
+    GPU engines are still serialized by their instance pool (see acquire_engine).
+    """
+    outcomes = await asyncio.gather(
+        *[_compare_one(engine_id, image_bytes) for engine_id in engine_list],
+        return_exceptions=True,
+    )
+    results = []
+    for engine_id, outcome in zip(engine_list, outcomes):
+        if isinstance(outcome, BaseException):
+            outcome = CompareResult(
+                engine=engine_id,
+                success=False,
+                processing_time_ms=0,
+                error=str(outcome),
+            )
+        results.append(outcome)
+    return results
+
+
+def model_json_response(model: BaseModel) -> Response:
+    """Serialize a response model straight to JSON with pydantic-core (no jsonable_encoder pass)."""
+    return Response(content=model.model_dump_json(), media_type="application/json")
+
+
+async def _process(
+    engine: str,
+    image_bytes: bytes,
+    cfg: Dict,
+    *,
+    document_type: Optional[str] = None,
+    priority: str = "balanced",
+) -> Response:
+    """Shared body of the process endpoints: auto-select, run, map errors."""
+    if engine == "auto":
+        engine = select_engine_or_raise(
+            document_type=document_type,
+            priority=priority,
+            has_gpu=detect_gpu(),
+        )
+        logger.info("Auto-selected engine: %s", engine)
+
+    result = await run_engine(engine, image_bytes, cfg)
+
+    if not result["success"]:
+        raise HTTPException(
+            status_code=500,
+            detail={
+                "error": result["metadata"].get("error", "Processing failed"),
+                "error_code": "PROCESSING_ERROR",
+            },
+        )
+
+    return model_json_response(build_ocr_response(result))
+
+
+async def _compare(engine_list: Sequence[str], image_bytes: bytes) -> Response:
+    """Shared body of the compare endpoints."""
+    results = await compare_on_engines(engine_list, image_bytes)
+    return model_json_response(CompareResponse(
+        success=any(r.success for r in results),
+        results=results,
+    ))
+
 
 # =============================================================================
 # Endpoints
@@ -587,7 +1093,7 @@ async def health_check():
         status="healthy",
         service="scanfactory-ocr-api",
         version=API_VERSION,
-        engines=list(ENGINE_REGISTRY.keys()),
+        engines=ENGINE_IDS,
         timestamp=datetime.utcnow().isoformat(),
     )
 
@@ -595,14 +1101,12 @@ async def health_check():
 @app.get("/api/v1/ocr/engines", response_model=EngineListResponse, tags=["OCR"])
 async def list_engines(_: bool = Depends(verify_api_key)):
     """List all available OCR engines."""
-    return EngineListResponse(
-        engines=list(ENGINE_REGISTRY.values()),
-        default=DEFAULT_ENGINE,
-        total=len(ENGINE_REGISTRY),
-    )
+    if ENGINES_LIST_RESPONSE is None:
+        refresh_engine_snapshots()
+    return ENGINES_LIST_RESPONSE
 
 
-@app.post("/api/v1/ocr/process", response_model=OCRResponse, tags=["OCR"])
+@app.post("/api/v1/ocr/process", response_class=Response, responses={200: {"model": OCRResponse}}, tags=["OCR"])
 async def process_document(
     file: Optional[UploadFile] = File(None, description="Document file to process"),
     engine: str = Form("auto", description="OCR engine to use"),
@@ -643,37 +1147,20 @@ async def process_document(
 
     image_bytes = await get_image_bytes(file=file)
 
-    # Select engine
-    if engine == "auto":
-        import torch
-        has_gpu = torch.cuda.is_available() if "torch" in sys.modules else False
-        engine = auto_select_engine(
-            document_type=document_type,
-            priority=priority,
-            has_gpu=has_gpu,
-        )
-        logger.info(f"Auto-selected engine: {engine}")
-
-    # Process
-    result = process_with_engine(engine, image_bytes, {
-        "output_format": output_format.upper(),
-        "extract_tables": extract_tables,
-        "extract_structure": extract_structure,
-    })
-
-    if not result["success"]:
-        raise HTTPException(
-            status_code=500,
-            detail={
-                "error": result["metadata"].get("error", "Processing failed"),
-                "error_code": "PROCESSING_ERROR",
-            },
-        )
-
-    return OCRResponse(**result)
+    return await _process(
+        engine,
+        image_bytes,
+        {
+            "output_format": output_format.upper(),
+            "extract_tables": extract_tables,
+            "extract_structure": extract_structure,
+        },
+        document_type=document_type,
+        priority=priority,
+    )
 
 
-@app.post("/api/v1/ocr/process/json", response_model=OCRResponse, tags=["OCR"])
+@app.post("/api/v1/ocr/process/json", response_class=Response, responses={200: {"model": OCRResponse}}, tags=["OCR"])
 async def process_document_json(
     request: OCRRequest,
     _: bool = Depends(verify_api_key),
@@ -688,38 +1175,20 @@ async def process_document_json(
         image_url=request.image_url,
     )
 
-    # Select engine
-    engine = request.engine
-    if engine == "auto":
-        import torch
-        has_gpu = torch.cuda.is_available() if "torch" in sys.modules else False
-        engine = auto_select_engine(
-            document_type=request.document_type,
-            priority=request.priority.value,
-            has_gpu=has_gpu,
-        )
-        logger.info(f"Auto-selected engine: {engine}")
-
-    # Process
-    result = process_with_engine(engine, image_bytes, {
-        "output_format": request.output_format.value.upper(),
-        "extract_tables": request.extract_tables,
-        "extract_structure": request.extract_structure,
-    })
-
-    if not result["success"]:
-        raise HTTPException(
-            status_code=500,
-            detail={
-                "error": result["metadata"].get("error", "Processing failed"),
-                "error_code": "PROCESSING_ERROR",
-            },
-        )
-
-    return OCRResponse(**result)
+    return await _process(
+        request.engine,
+        image_bytes,
+        {
+            "output_format": request.output_format.value.upper(),
+            "extract_tables": request.extract_tables,
+            "extract_structure": request.extract_structure,
+        },
+        document_type=request.document_type,
+        priority=request.priority.value,
+    )
 
 
-@app.post("/api/v1/ocr/compare", response_model=CompareResponse, tags=["OCR"])
+@app.post("/api/v1/ocr/compare", response_class=Response, responses={200: {"model": CompareResponse}}, tags=["OCR"])
 async def compare_engines(
     file: Optional[UploadFile] = File(None),
     engines: str = Form("", description="Comma-separated list of engines to compare"),
@@ -741,45 +1210,12 @@ async def compare_engines(
     # Parse engines
     engine_list = [e.strip() for e in engines.split(",") if e.strip()]
     if not engine_list:
-        engine_list = list(ENGINE_REGISTRY.keys())[:3]  # Default: first 3 available
-
-    results = []
-    for engine_id in engine_list:
-        if engine_id not in ENGINE_REGISTRY:
-            results.append(CompareResult(
-                engine=engine_id,
-                success=False,
-                processing_time_ms=0,
-                error=f"Unknown engine: {engine_id}",
-            ))
-            continue
+        engine_list = DEFAULT_COMPARE_ENGINES
 
-        if not ENGINE_REGISTRY[engine_id].available:
-            results.append(CompareResult(
-                engine=engine_id,
-                success=False,
-                processing_time_ms=0,
-                error=f"Engine not available: {engine_id}",
-            ))
-            continue
-
-        result = process_with_engine(engine_id, image_bytes)
-        results.append(CompareResult(
-            engine=engine_id,
-            success=result["success"],
-            text=result["text"][:500] if result["text"] else None,  # Truncate for comparison
-            confidence=result["confidence"],
-            processing_time_ms=result["processing_time_ms"],
-            error=result["metadata"].get("error") if not result["success"] else None,
-        ))
-
-    return CompareResponse(
-        success=any(r.success for r in results),
-        results=results,
-    )
+    return await _compare(engine_list, image_bytes)
 
 
-@app.post("/api/v1/ocr/compare/json", response_model=CompareResponse, tags=["OCR"])
+@app.post("/api/v1/ocr/compare/json", response_class=Response, responses={200: {"model": CompareResponse}}, tags=["OCR"])
 async def compare_engines_json(
     request: CompareRequest,
     _: bool = Depends(verify_api_key),
@@ -790,42 +1226,9 @@ async def compare_engines_json(
         image_url=request.image_url,
     )
 
-    engine_list = request.engines or list(ENGINE_REGISTRY.keys())[:3]
+    engine_list = request.engines or DEFAULT_COMPARE_ENGINES
 
-    results = []
-    for engine_id in engine_list:
-        if engine_id not in ENGINE_REGISTRY:
-            results.append(CompareResult(
-                engine=engine_id,
-                success=False,
-                processing_time_ms=0,
-                error=f"Unknown engine: {engine_id}",
-            ))
-            continue
-
-        if not ENGINE_REGISTRY[engine_id].available:
-            results.append(CompareResult(
-                engine=engine_id,
-                success=False,
-                processing_time_ms=0,
-                error=f"Engine not available: {engine_id}",
-            ))
-            continue
-
-        result = process_with_engine(engine_id, image_bytes)
-        results.append(CompareResult(
-            engine=engine_id,
-            success=result["success"],
-            text=result["text"][:500] if result["text"] else None,
-            confidence=result["confidence"],
-            processing_time_ms=result["processing_time_ms"],
-            error=result["metadata"].get("error") if not result["success"] else None,
-        ))
-
-    return CompareResponse(
-        success=any(r.success for r in results),
-        results=results,
-    )
+    return await _compare(engine_list, image_bytes)
 
 
 @app.get("/api/v1/ocr/cost-estimate", tags=["OCR"])
@@ -863,9 +1266,18 @@ def main():
     parser.add_argument("--host", default="0.0.0.0", help="Host to bind to")
     parser.add_argument("--port", type=int, default=8000, help="Port to bind to")
     parser.add_argument("--reload", action="store_true", help="Enable auto-reload")
-    parser.add_argument("--workers", type=int, default=1, help="Number of workers")
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=int(os.getenv("OCR_API_WORKERS") or 1),
+        help="Number of worker processes (default: 1; the engine pools already use every CPU)",
+    )
     args = parser.parse_args()
 
+    # Each worker loads its own models and executor: workers inherit this and split the CPUs
+    args.workers = max(1, args.workers)
+    os.environ["OCR_API_WORKERS"] = str(args.workers)
+
     print(f"""
 ╔══════════════════════════════════════════════════════════════╗
 ║           ScanFactory OCR API v{API_VERSION}                        ║
@@ -886,6 +1298,9 @@ def main():
         port=args.port,
         reload=args.reload,
         workers=args.workers,
+        # uvloop/httptools come with uvicorn[standard]; fall back to the pure-Python stack
+        loop="uvloop" if _module_available("uvloop") else "asyncio",
+        http="httptools" if _module_available("httptools") else "h11",
         log_level="info",
     )
 
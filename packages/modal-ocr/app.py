@@ -8,74 +8,161 @@ Architecture:
   Image → Modal (OCR Engine) → Cloudflare Workers AI (Extraction) → Données
 """
 
-import modal
+import asyncio
+import io
 import os
+import random
+import time
+
+import modal
+
+try:
+    from fastapi import Request, Response
+except ImportError:  # fastapi n'est requis que dans les conteneurs Modal
+    Request = Response = None
 
 # Configuration de l'application Modal
 app = modal.App("scanfactory-ocr")
 
+# Racine unique du volume de modèles, un sous-dossier par bibliothèque :
+# les assets partagés (HF hub, torch hub) ne sont téléchargés qu'une fois
+MODELS_DIR = "/models"
+MODEL_CACHE_ENV = {
+    "HF_HOME": f"{MODELS_DIR}/hf",
+    "TORCH_HOME": f"{MODELS_DIR}/torch",
+    "XDG_CACHE_HOME": f"{MODELS_DIR}/cache",  # Surya/Docling et autres caches ~/.cache
+    "EASYOCR_MODULE_PATH": f"{MODELS_DIR}/easyocr",
+    "PADDLE_OCR_BASE_DIR": f"{MODELS_DIR}/paddle",
+}
+
 # Image Docker de base avec dépendances communes
-base_image = (
-    modal.Image.debian_slim(python_version="3.11")
-    .apt_install(
-        "libgl1-mesa-glx",
-        "libglib2.0-0",
-        "libsm6",
-        "libxext6",
-        "libxrender-dev",
-        "libgomp1",
-        "tesseract-ocr",
-        "tesseract-ocr-fra",
-        "tesseract-ocr-eng",
-    )
-    .pip_install(
-        "pyyaml>=6.0",
-        "Pillow>=10.1.0",
-        "numpy>=1.24.3",
-        "httpx>=0.25.2",
-        "pydantic>=2.5.2",
-    )
+BASE_APT_PACKAGES = (
+    "libgl1-mesa-glx",
+    "libglib2.0-0",
+    "libsm6",
+    "libxext6",
+    "libxrender-dev",
+    "libgomp1",
+    "tesseract-ocr",
+    "tesseract-ocr-fra",
+    "tesseract-ocr-eng",
 )
-
-# Image PaddleOCR
-paddleocr_image = base_image.pip_install(
-    "paddlepaddle==2.5.2",
-    "paddleocr==2.7.3",
+BASE_PIP_PACKAGES = (
+    "pyyaml>=6.0",
+    "Pillow>=10.1.0",
+    "numpy>=1.24.3",
+    "httpx[http2]>=0.25.2",
+    "pydantic>=2.5.2",
+    "fastapi>=0.100.0",
     "opencv-python-headless==4.8.1.78",
+    "blake3>=0.3.0",
+    "pybase64>=1.3.0",
+    "orjson>=3.9.0",
+    "pypdfium2>=4.20.0",
 )
 
-# Image SuryaOCR avec Docling
-surya_image = base_image.pip_install(
-    "torch>=2.2.0",
-    "docling>=2.0.0",
-    "docling-surya>=1.0.0",
-    "surya-ocr>=0.6.0",
+base_image = (
+    modal.Image.debian_slim(python_version="3.11")
+    .apt_install(*BASE_APT_PACKAGES)
+    .pip_install(*BASE_PIP_PACKAGES)
+    .env(MODEL_CACHE_ENV)
 )
 
-# Image EasyOCR
-easyocr_image = base_image.pip_install(
-    "torch>=2.2.0",
-    "easyocr>=1.7.0",
+# Dépendances de base (BASE_PIP_PACKAGES, présentes dans toutes les images) :
+# importées une fois au chargement du module dans le conteneur, et non à chaque
+# appel. En local, où seul modal est requis pour déployer, leur absence est ignorée.
+with base_image.imports():
+    import cv2
+    import httpx
+    import numpy as np
+    import orjson
+    import pybase64
+    from PIL import Image
+
+# PaddleOCR + EasyOCR sur GPU si CLASSIC_OCR_GPU est défini au déploiement (ex: "T4", "A10G").
+# La valeur est recopiée dans l'image pour que le conteneur voie la même configuration.
+CLASSIC_OCR_GPU = os.getenv("CLASSIC_OCR_GPU") or None
+
+# vCPU du conteneur PaddleOCR + EasyOCR. OpenMP/BLAS démarrent sinon autant de
+# threads que de cœurs de l'hôte et se disputent les 2 vCPU du cgroup.
+CLASSIC_OCR_CPU = 2
+CPU_THREADS_ENV = {
+    "OMP_NUM_THREADS": str(CLASSIC_OCR_CPU),
+    "MKL_NUM_THREADS": str(CLASSIC_OCR_CPU),
+    "OPENBLAS_NUM_THREADS": str(CLASSIC_OCR_CPU),
+}
+
+# Modèles PaddleOCR (fr det/rec/cls) et EasyOCR (fr/en) téléchargés au build et
+# intégrés à l'image : le premier conteneur démarre sans I/O réseau ni volume. Hors
+# de /models, que le volume masquerait ; celui-ci reste monté pour les modèles INT8.
+BAKED_MODELS_DIR = "/opt/ocr-models"
+CLASSIC_MODELS_ENV = {
+    "PADDLE_OCR_BASE_DIR": f"{BAKED_MODELS_DIR}/paddle",
+    "EASYOCR_MODULE_PATH": f"{BAKED_MODELS_DIR}/easyocr",
+}
+DOWNLOAD_CLASSIC_MODELS = (
+    "python -c \""
+    "from paddleocr import PaddleOCR; PaddleOCR(lang='fr', use_angle_cls=True, use_gpu=False, show_log=False); "
+    "import easyocr; easyocr.Reader(['fr', 'en'], gpu=False, verbose=False)\""
 )
 
-# Image GutenOCR (VLM based on Qwen2.5-VL)
-gutenocr_image = (
-    modal.Image.debian_slim(python_version="3.11")
-    .apt_install(
-        "libgl1-mesa-glx",
-        "libglib2.0-0",
-        "git",
+# Image PaddleOCR + EasyOCR dans un même conteneur (CPU par défaut)
+if CLASSIC_OCR_GPU:
+    cpu_ocr_image = (
+        modal.Image.from_registry("nvidia/cuda:11.8.0-cudnn8-runtime-ubuntu22.04", add_python="3.11")
+        .apt_install(*BASE_APT_PACKAGES)
+        .pip_install(
+            *BASE_PIP_PACKAGES,
+            "paddlepaddle-gpu==2.5.2",
+            "paddleocr==2.7.3",
+            "torch>=2.2.0",
+            "easyocr>=1.7.0",
+        )
+        .env({
+            **MODEL_CACHE_ENV,
+            **CPU_THREADS_ENV,
+            **CLASSIC_MODELS_ENV,
+            "CLASSIC_OCR_GPU": CLASSIC_OCR_GPU,
+            "CUDA_MODULE_LOADING": "LAZY",  # CUDA kernels loaded on first use
+        })
+        .run_commands(DOWNLOAD_CLASSIC_MODELS)
+    )
+else:
+    cpu_ocr_image = (
+        base_image.pip_install(
+            "paddlepaddle==2.5.2",
+            "paddleocr==2.7.3",
+            "torch>=2.2.0",
+            "easyocr>=1.7.0",
+        )
+        .env({**CPU_THREADS_ENV, **CLASSIC_MODELS_ENV})
+        .run_commands(DOWNLOAD_CLASSIC_MODELS)
     )
+
+# Moteur de génération GutenOCR : "hf" (transformers.generate) ou "vllm" (PagedAttention,
+# batching continu). Lu au déploiement et recopié dans l'image, comme CLASSIC_OCR_GPU.
+GUTENOCR_BACKEND = os.getenv("GUTENOCR_BACKEND", "hf").lower()
+
+# Image GPU : SuryaOCR (Docling) + GutenOCR (VLM basé sur Qwen2.5-VL)
+gpu_ocr_image = (
+    base_image.apt_install("git")
     .pip_install(
         "torch>=2.2.0",
+        "docling>=2.0.0",
+        "docling-surya>=1.0.0",
+        "surya-ocr>=0.6.0",
         "transformers>=4.37.0",
         "accelerate>=0.26.0",
         "qwen-vl-utils>=0.0.8",
-        "Pillow>=10.1.0",
-        "numpy>=1.24.3",
-        "pydantic>=2.5.2",
+        "numba>=0.59.0",
+        "bitsandbytes>=0.43.0",
+        "torchao>=0.5.0",
     )
+    .env({"GUTENOCR_BACKEND": GUTENOCR_BACKEND})
 )
+if GUTENOCR_BACKEND == "vllm":
+    # vLLM épingle ses propres torch/transformers et pèse plusieurs Go : seulement s'il sert
+    gpu_ocr_image = gpu_ocr_image.pip_install("vllm>=0.6.0")
 
 # Image Mistral OCR (API-based)
 mistral_image = base_image.pip_install(
@@ -85,341 +172,1170 @@ mistral_image = base_image.pip_install(
 # Volume pour le cache des modèles
 model_cache = modal.Volume.from_name("scanfactory-model-cache", create_if_missing=True)
 
+# Volume de transit pour les gros documents : passés aux services par clé, pas en bytes
+uploads_volume = modal.Volume.from_name("scanfactory-ocr-uploads", create_if_missing=True)
+
+# Cache de résultats partagé entre conteneurs du routeur (retries, dashboards). Désactivé par
+# défaut : il conserve le texte OCR des documents (médicaux) et répond à tout appelant qui envoie
+# les mêmes bytes. Activé, chaque entrée expire après OCR_SHARED_CACHE_TTL secondes et le cache
+# n'accepte plus d'écritures au-delà de OCR_SHARED_CACHE_MAX_ENTRIES entrées.
+shared_result_cache = modal.Dict.from_name("scanfactory-ocr-cache", create_if_missing=True)
+SHARED_CACHE_ENABLED = os.getenv("OCR_SHARED_CACHE", "0").lower() in ("1", "true", "yes")
+SHARED_CACHE_TTL = int(os.getenv("OCR_SHARED_CACHE_TTL", "3600"))
+SHARED_CACHE_MAX_ENTRIES = int(os.getenv("OCR_SHARED_CACHE_MAX_ENTRIES", "10000"))
+
+UPLOADS_DIR = "/uploads"
+INLINE_MAX_BYTES = 4 * 1024 * 1024  # au-delà, le document transite par le volume
+MAX_DOWNLOAD_BYTES = 50 * 1024 * 1024
+MAX_CONCURRENT_FETCHES = 16
+URL_PIPELINE_DEPTH = 16  # images téléchargées en attente d'OCR
+URL_PIPELINE_CHUNK = 8
+DOWNLOAD_CHUNK_SIZE = 64 * 1024
+FETCH_CONNECT_TIMEOUT = 5.0
+FETCH_TIMEOUT = 30.0
+FETCH_MAX_ATTEMPTS = 3
+FETCH_RETRY_STATUSES = (429, 502, 503, 504)
+HTTP_MAX_CONNECTIONS = 100
+HTTP_MAX_KEEPALIVE = 20
+
+
+def stage_upload(image_bytes: bytes) -> str:
+    """Écrit un gros document sur le volume de transit et retourne sa clé."""
+    import uuid
+
+    key = uuid.uuid4().hex
+    with open(f"{UPLOADS_DIR}/{key}", "wb") as f:
+        f.write(image_bytes)
+    uploads_volume.commit()
+    return key
+
+
+def load_payload(payload) -> bytes:
+    """
+    Côté service : bytes inline, ou clé d'un document déposé sur le volume.
+
+    Un document déposé après le montage n'est pas visible sur le point de montage :
+    il est lu par l'API du volume plutôt qu'après un reload(), qui échoue quand
+    d'autres entrées du conteneur ont des fichiers ouverts.
+    """
+    if isinstance(payload, (bytes, bytearray)):
+        return payload
+    path = f"{UPLOADS_DIR}/{payload}"
+    if os.path.exists(path):
+        with open(path, "rb") as f:
+            return f.read()
+    return b"".join(uploads_volume.read_file(payload))
+
+
+def discard_upload(*keys: str) -> None:
+    """Supprime des documents de transit une fois traités (un seul commit)."""
+    removed = False
+    for key in keys:
+        try:
+            os.remove(f"{UPLOADS_DIR}/{key}")
+            removed = True
+        except OSError:
+            pass
+    if removed:
+        uploads_volume.commit()
+
+
+def letterbox(rgb, width: int, height: int):
+    """
+    Redimensionne une image RGB dans width x height sans la déformer, complétée en blanc
+    en bas et à droite : (canevas, échelle). Les coordonnées d'origine = canevas / échelle.
+    """
+    scale = min(width / rgb.shape[1], height / rgb.shape[0])
+    resized_width = max(1, min(width, round(rgb.shape[1] * scale)))
+    resized_height = max(1, min(height, round(rgb.shape[0] * scale)))
+    interpolation = cv2.INTER_AREA if scale < 1 else cv2.INTER_LINEAR
+    resized = cv2.resize(rgb, (resized_width, resized_height), interpolation=interpolation)
+
+    canvas = np.full((height, width, 3), 255, dtype=np.uint8)
+    canvas[:resized_height, :resized_width] = resized
+    return canvas, scale
+
+
+def decode_rgb(image_bytes: bytes):
+    """
+    Décode des bytes image en tableau RGB uint8 contigu (H, W, 3).
+
+    cv2.imdecode fait décodage + conversion en une passe, sans objet PIL
+    intermédiaire ; PIL reste le repli pour les formats qu'OpenCV ne lit pas.
+    """
+    bgr = cv2.imdecode(np.frombuffer(image_bytes, np.uint8), cv2.IMREAD_COLOR)
+    if bgr is not None:
+        return cv2.cvtColor(bgr, cv2.COLOR_BGR2RGB)
+
+    image = Image.open(io.BytesIO(image_bytes))
+    if image.mode != "RGB":
+        image = image.convert("RGB")
+    return np.asarray(image)
+
+
+_JPEG_SOF_MARKERS = frozenset(range(0xC0, 0xD0)) - {0xC4, 0xC8, 0xCC}
+
+
+def peek_dims(data: bytes):
+    """
+    Lit (largeur, hauteur) dans l'en-tête PNG / JPEG / PDF, sans décoder de pixels.
+
+    Retourne None si le format n'est pas reconnu.
+    """
+    if data[:8] == b"\x89PNG\r\n\x1a\n":
+        return int.from_bytes(data[16:20], "big"), int.from_bytes(data[20:24], "big")
+
+    if data[:2] == b"\xff\xd8":
+        # Walk the marker segments up to the first SOFn frame header
+        i = 2
+        while i + 9 <= len(data):
+            if data[i] != 0xFF:
+                return None
+            marker = data[i + 1]
+            if marker == 0xFF:  # fill byte
+                i += 1
+                continue
+            if marker in _JPEG_SOF_MARKERS:
+                return int.from_bytes(data[i + 7:i + 9], "big"), int.from_bytes(data[i + 5:i + 7], "big")
+            if marker == 0x01 or 0xD0 <= marker <= 0xD9:  # standalone markers, no length
+                i += 2
+                continue
+            i += 2 + int.from_bytes(data[i + 2:i + 4], "big")
+        return None
+
+    if data[:4] == b"%PDF":
+        import re
+
+        # First page box, in points
+        match = re.search(rb"/MediaBox\s*\[\s*([-\d.]+)\s+([-\d.]+)\s+([-\d.]+)\s+([-\d.]+)\s*\]", data)
+        if match:
+            x0, y0, x1, y1 = (float(v) for v in match.groups())
+            return round(x1 - x0), round(y1 - y0)
+
+    return None
+
+
+# Caches par conteneur, indexés par le hash du contenu : un document re-soumis
+# (retry, comparaison multi-moteurs, rafraîchissement) ne repasse ni par le
+# décodage ni par le modèle. Une page décodée pèse ~25 Mo, d'où la petite taille.
+IMAGE_CACHE_SIZE = int(os.getenv("OCR_IMAGE_CACHE_SIZE", "16"))
+RESULT_CACHE_SIZE = int(os.getenv("OCR_RESULT_CACHE_SIZE", "1024"))
+
+
+class LRUCache:
+    """LRU borné, thread-safe (les services acceptent des entrées concurrentes)."""
+
+    def __init__(self, max_size: int):
+        import threading
+        from collections import OrderedDict
+
+        self.max_size = max_size
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            value = self._data.get(key)
+            if value is not None:
+                self._data.move_to_end(key)
+            return value
+
+    def put(self, key, value) -> None:
+        if self.max_size <= 0:
+            return
+        with self._lock:
+            self._data[key] = value
+            self._data.move_to_end(key)
+            while len(self._data) > self.max_size:
+                self._data.popitem(last=False)
+
+
+image_cache = LRUCache(IMAGE_CACHE_SIZE)
+result_cache = LRUCache(RESULT_CACHE_SIZE)
+
+
+def content_key(image_bytes: bytes) -> bytes:
+    """Empreinte 128 bits du document (blake3, blake2b si indisponible)."""
+    try:
+        from blake3 import blake3
+    except ImportError:
+        import hashlib
+
+        return hashlib.blake2b(image_bytes, digest_size=16).digest()
+    return blake3(image_bytes).digest(length=16)
+
+
+def decode_rgb_cached(image_bytes: bytes, key: bytes):
+    """decode_rgb avec cache : le tableau retourné est partagé, ne pas le modifier."""
+    rgb = image_cache.get(key)
+    if rgb is None:
+        rgb = decode_rgb(image_bytes)
+        image_cache.put(key, rgb)
+    return rgb
+
+
+def cache_result(cache_key: tuple, result: dict) -> dict:
+    """Mémorise un résultat OCR réussi ; les erreurs ne sont jamais mises en cache."""
+    if not result.get("error"):
+        result_cache.put(cache_key, result)
+    return result
+
+
+def warmup_page(width: int, height: int):
+    """
+    Page factice avec quelques lignes de texte, pour le warmup des modèles.
+
+    Une image vide ne produit aucune boîte : seule la détection tournerait, et
+    la reconnaissance (kernels cuDNN/oneDNN, arènes mémoire) resterait froide
+    jusqu'à la première vraie requête.
+    """
+    page = np.full((height, width, 3), 255, np.uint8)
+    for i, line in enumerate(("ScanFactory OCR", "Facture 2024-001", "Total: 123,45 EUR")):
+        cv2.putText(page, line, (40, 80 + i * 70), cv2.FONT_HERSHEY_SIMPLEX, 1.5, (0, 0, 0), 3)
+    return page
+
 
 # =============================================================================
-# PaddleOCR Service
+# CPU OCR Service (PaddleOCR + EasyOCR, GPU en option)
 # =============================================================================
 
+# Taille de batch attendue pour readtext_batched (sert aussi au warmup)
+EASYOCR_BATCH_SIZE = int(os.getenv("EASYOCR_BATCH_SIZE", "4"))
+EASYOCR_BATCH_WIDTH = 800
+EASYOCR_BATCH_HEIGHT = 600
+
+# Batch de reconnaissance/classification Paddle : sur CPU, l'arène mémoire de
+# l'inférence grandit avec le batch alors que les crops passent de toute façon un
+# par un ; 1 réduit fortement la RSS sans perte de débit. Sur GPU le batch paie.
+PADDLE_REC_BATCH_NUM = int(os.getenv("PADDLE_REC_BATCH_NUM", "6" if CLASSIC_OCR_GPU else "1"))
+
+# Profondeur des files entre les étages decode → detect → recognize (process_paddle_many)
+PADDLE_PIPELINE_DEPTH = int(os.getenv("PADDLE_PIPELINE_DEPTH", "4"))
+
+# Nombre maximal d'images par appel à CPUOCRService.ocr_batch
+CLASSIC_OCR_MAX_BATCH = int(os.getenv("CLASSIC_OCR_MAX_BATCH", "32"))
+
+# Conteneurs chauds PaddleOCR + EasyOCR : un conteneur toujours prêt, et ceux lancés
+# par un pic restent une heure. Coût : ~2 vCPU / 4 Go facturés en continu, contre
+# plusieurs secondes de démarrage à froid sur la première requête après inactivité.
+# CLASSIC_OCR_KEEP_WARM=0 rend le service entièrement scale-to-zero.
+CLASSIC_OCR_KEEP_WARM = int(os.getenv("CLASSIC_OCR_KEEP_WARM", "1"))
+CLASSIC_OCR_IDLE_TIMEOUT = int(os.getenv("CLASSIC_OCR_IDLE_TIMEOUT", "3600"))
+
+# Modèles det/rec/cls quantifiés INT8 (PaddleSlim PTQ, export d'inférence), déposés
+# sur le volume des modèles sous <dir>/{det,rec,cls}. Utilisés s'ils sont présents,
+# sinon PaddleOCR charge ses modèles FP32 habituels.
+PADDLE_INT8_DIR = os.getenv("PADDLE_INT8_DIR", f"{MODELS_DIR}/paddle-int8")
+
+
+def paddle_int8_model_dirs() -> dict:
+    """Arguments PaddleOCR pointant vers les modèles INT8, ou {} s'ils manquent."""
+    dirs = {name: f"{PADDLE_INT8_DIR}/{name}" for name in ("det", "rec", "cls")}
+    if not all(os.path.isfile(f"{path}/inference.pdmodel") for path in dirs.values()):
+        return {}
+    return {
+        "det_model_dir": dirs["det"],
+        "rec_model_dir": dirs["rec"],
+        "cls_model_dir": dirs["cls"],
+    }
+
+
 @app.cls(
-    image=paddleocr_image,
-    volumes={"/root/.paddleocr": model_cache},
-    cpu=2,
+    image=cpu_ocr_image,
+    volumes={MODELS_DIR: model_cache, UPLOADS_DIR: uploads_volume},
+    cpu=CLASSIC_OCR_CPU,
     memory=4096,
+    gpu=CLASSIC_OCR_GPU,
     timeout=300,
-    container_idle_timeout=60,
+    container_idle_timeout=CLASSIC_OCR_IDLE_TIMEOUT,
+    keep_warm=CLASSIC_OCR_KEEP_WARM,
+    enable_memory_snapshot=True,
 )
-class PaddleOCRService:
-    """Service OCR avec PaddleOCR."""
+class CPUOCRService:
+    """
+    Service OCR CPU : PaddleOCR et EasyOCR chargés dans le même conteneur.
+
+    Un seul conteneur chaud sert les deux moteurs, au lieu d'un démarrage
+    à froid par moteur. Avec CLASSIC_OCR_GPU, les deux moteurs tournent sur
+    le GPU (Paddle en FP16 via TensorRT si CLASSIC_OCR_TENSORRT=1).
+    """
 
     def __init__(self):
-        self.ocr = None
+        self.paddle = None
+        self.easy = None
 
-    @modal.enter()
+    # CPU-only models: the initialized process is snapshotted, cold starts restore it.
+    # On GPU the snapshot phase has no device, so setup runs after restore.
+    @modal.enter(snap=not CLASSIC_OCR_GPU)
     def setup(self):
+        import easyocr
         from paddleocr import PaddleOCR
 
-        self.ocr = PaddleOCR(
+        use_gpu = bool(CLASSIC_OCR_GPU)
+        int8_models = paddle_int8_model_dirs()
+        print(f"🧵 CPU affinity: {sorted(os.sched_getaffinity(0))}, OMP_NUM_THREADS={os.getenv('OMP_NUM_THREADS')}")
+        self.paddle = PaddleOCR(
             use_angle_cls=True,
             lang="fr",
-            use_gpu=False,
+            use_gpu=use_gpu,
+            use_tensorrt=use_gpu and os.getenv("CLASSIC_OCR_TENSORRT") == "1",
+            precision="int8" if int8_models else "fp16" if use_gpu else "fp32",
+            # oneDNN kernels: faster CPU inference than the default Paddle ones
+            enable_mkldnn=not use_gpu and os.getenv("PADDLE_MKLDNN", "1") == "1",
+            cpu_threads=CLASSIC_OCR_CPU,
+            rec_batch_num=PADDLE_REC_BATCH_NUM,
+            cls_batch_num=PADDLE_REC_BATCH_NUM,
             show_log=False,
             det_db_thresh=0.3,
             det_db_box_thresh=0.5,
             det_db_unclip_ratio=1.6,
+            **int8_models,
         )
-        print("✅ PaddleOCR initialized")
-
-    @modal.method()
-    def process(self, image_bytes: bytes, with_layout: bool = True) -> dict:
-        import io
-        import numpy as np
-        from PIL import Image
+        # Warmup on a page with text so det, cls and rec all run: cuDNN picks its
+        # kernels on GPU, oneDNN fills its primitive cache on CPU (then snapshotted)
+        page = warmup_page(EASYOCR_BATCH_WIDTH, EASYOCR_BATCH_HEIGHT)
+        self.paddle.ocr(page, cls=True)
+        print(f"✅ PaddleOCR initialized ({'GPU' if use_gpu else 'CPU'}{', INT8' if int8_models else ''})")
+
+        self.easy = easyocr.Reader(["fr", "en"], gpu=use_gpu, cudnn_benchmark=use_gpu, verbose=False)
+
+        # Warmup: single-page path, then the batched call allocates detector buffers for its shape
+        self.easy.readtext(page)
+        self.easy.readtext_batched(
+            np.stack([page] * EASYOCR_BATCH_SIZE),
+            n_width=EASYOCR_BATCH_WIDTH,
+            n_height=EASYOCR_BATCH_HEIGHT,
+        )
+        print("✅ EasyOCR initialized")
 
-        image = Image.open(io.BytesIO(image_bytes))
-        if image.mode != "RGB":
-            image = image.convert("RGB")
+    @modal.web_endpoint(method="POST", docs=True)
+    async def ocr(self, request: Request) -> Response:
+        """
+        OCR PaddleOCR / EasyOCR servi directement par ce conteneur.
+
+        La requête arrive sur le conteneur qui tient déjà les modèles, sans le
+        saut routeur → service de /process_ocr_raw. Image brute en body ;
+        query params :
+            engine: paddleocr (défaut) ou easyocr
+            with_layout: Inclure les infos de layout (défaut: true)
+        """
+        image_bytes = await request.body()
+        if not image_bytes:
+            return json_response({"error": "empty request body", "success": False})
+        if len(image_bytes) > MAX_DOWNLOAD_BYTES:
+            return json_response({"error": f"image larger than {MAX_DOWNLOAD_BYTES // 1024 // 1024}MB", "success": False})
+
+        params = request.query_params
+        try:
+            if params.get("engine", "paddleocr") == "easyocr":
+                result = await asyncio.to_thread(self.process_easy.local, image_bytes)
+            else:
+                with_layout = params.get("with_layout", "true").lower() != "false"
+                result = await asyncio.to_thread(self.process_paddle.local, image_bytes, with_layout)
+        except Exception as e:
+            return json_response({"error": str(e), "success": False})
+        return json_response({"success": True, **result})
+
+    @modal.web_endpoint(method="POST", docs=True)
+    async def ocr_batch(self, request: Request) -> Response:
+        """
+        OCR de plusieurs images en un seul appel, servi par ce conteneur.
+
+        Les surcoûts fixes (requête HTTP, aller-retour Modal) sont payés une fois
+        pour tout le lot : PaddleOCR passe par le pipeline decode → detect →
+        recognize de process_paddle_many, EasyOCR par readtext_batched.
+        Body JSON :
+            image_base64_list: Images en base64 (au plus CLASSIC_OCR_MAX_BATCH)
+            engine: paddleocr (défaut) ou easyocr
+            with_layout: Inclure les infos de layout (défaut: true)
+        """
+        try:
+            body = orjson.loads(await request.body())
+            images_bytes = [pybase64.b64decode(b, validate=False) for b in body["image_base64_list"]]
+        except (orjson.JSONDecodeError, KeyError, TypeError, ValueError) as e:
+            return json_response({"error": f"Invalid request: {str(e)}", "success": False})
+        if len(images_bytes) > CLASSIC_OCR_MAX_BATCH:
+            return json_response({"error": f"at most {CLASSIC_OCR_MAX_BATCH} images per batch", "success": False})
+
+        engine = body.get("engine", "paddleocr")
+        try:
+            if engine == "easyocr":
+                results = await asyncio.to_thread(self.process_easy_batch.local, images_bytes)
+            else:
+                engine = "paddleocr"
+                results = await asyncio.to_thread(
+                    self.process_paddle_many.local, images_bytes, body.get("with_layout", True)
+                )
+        except Exception as e:
+            return json_response({"error": str(e), "success": False})
+        return json_response({"success": True, "engine": engine, "results": results})
 
-        result = self.ocr.ocr(np.array(image), cls=True)
+    @modal.method()
+    def process_paddle(self, image_bytes: bytes | str, with_layout: bool = True) -> dict:
+        image_bytes = load_payload(image_bytes)
+        key = content_key(image_bytes)
+        cached = result_cache.get((key, "paddleocr", with_layout))
+        if cached is not None:
+            return cached
+
+        rgb = decode_rgb_cached(image_bytes, key)
+        height, width = rgb.shape[:2]
+
+        result = self.paddle.ocr(rgb, cls=True)
+        lines = result[0] if result else None
+
+        return cache_result(
+            (key, "paddleocr", with_layout),
+            self._paddle_result(lines, width, height, with_layout),
+        )
 
-        if not result or not result[0]:
+    @staticmethod
+    def _paddle_result(lines, width: int, height: int, with_layout: bool) -> dict:
+        if not lines:
             return {"text": "", "blocks": [], "confidence": 0.0, "engine": "paddleocr"}
 
-        blocks = []
-        texts = []
-        confidences = []
+        # One array pass for all boxes: top-left and bottom-right corners as (x1, y1, x2, y2)
+        box_list, recognitions = zip(*lines)
+        texts, scores = zip(*recognitions)
+        boxes = np.array(box_list, dtype=np.float64)
+        corners = boxes[:, [0, 2], :].reshape(len(lines), 4).astype(np.int32).tolist()
+        confidences = np.array(scores, dtype=np.float64)
 
-        for line in result[0]:
-            box, (text, confidence) = line
-            blocks.append({
-                "text": text,
-                "confidence": float(confidence),
-                "bbox": {
-                    "x1": int(box[0][0]), "y1": int(box[0][1]),
-                    "x2": int(box[2][0]), "y2": int(box[2][1]),
-                },
-            })
-            texts.append(text)
-            confidences.append(confidence)
+        blocks = [
+            {"text": text, "confidence": confidence, "bbox": {"x1": x1, "y1": y1, "x2": x2, "y2": y2}}
+            for text, confidence, (x1, y1, x2, y2) in zip(texts, confidences.tolist(), corners)
+        ]
 
         return {
             "text": "\n".join(texts),
             "blocks": blocks,
-            "confidence": round(sum(confidences) / len(confidences), 4) if confidences else 0.0,
+            "confidence": round(float(confidences.mean()), 4),
             "engine": "paddleocr",
-            "layout": {"width": image.width, "height": image.height} if with_layout else None,
+            "layout": {"width": width, "height": height} if with_layout else None,
         }
 
+    @modal.method()
+    def process_paddle_many(self, images_bytes: list, with_layout: bool = True) -> list:
+        """
+        Traite plusieurs pages avec PaddleOCR en pipeline sur trois threads.
+
+        decode → detect (+ classifieur d'angle) → recognize : pendant que la
+        page N est reconnue, la page N+1 est détectée et la N+2 décodée. Le
+        temps total tend vers celui de l'étage le plus lent au lieu de la somme.
+        """
+        import copy
+        import queue
+        import threading
+
+        # Modules internes de paddleocr (son dossier est ajouté au sys.path à l'import)
+        from tools.infer.predict_system import sorted_boxes
+        from tools.infer.utility import get_rotate_crop_image
+
+        decoded = queue.Queue(maxsize=PADDLE_PIPELINE_DEPTH)
+        detected = queue.Queue(maxsize=PADDLE_PIPELINE_DEPTH)
+        results = [None] * len(images_bytes)
+
+        def failed(error: Exception) -> dict:
+            return {"text": "", "blocks": [], "confidence": 0.0, "engine": "paddleocr", "error": str(error)}
+
+        def decode_worker():
+            # One OpenCV thread per stage: the other stages already use the cores
+            cv2.setNumThreads(1)
+            try:
+                for index, payload in enumerate(images_bytes):
+                    try:
+                        image_bytes = load_payload(payload)
+                        key = content_key(image_bytes)
+                        cached = result_cache.get((key, "paddleocr", with_layout))
+                        if cached is not None:
+                            results[index] = cached
+                            continue
+                        decoded.put((index, key, decode_rgb_cached(image_bytes, key)))
+                    except Exception as e:
+                        results[index] = failed(e)
+            finally:
+                decoded.put(None)
+
+        def detect_worker():
+            try:
+                while (item := decoded.get()) is not None:
+                    index, key, rgb = item
+                    try:
+                        dt_boxes, _ = self.paddle.text_detector(rgb)
+                        boxes = sorted_boxes(dt_boxes) if dt_boxes is not None and len(dt_boxes) else []
+                        crops = [get_rotate_crop_image(rgb, copy.deepcopy(box)) for box in boxes]
+                        if crops and self.paddle.use_angle_cls:
+                            crops, _, _ = self.paddle.text_classifier(crops)
+                        detected.put((index, key, rgb.shape[:2], boxes, crops))
+                    except Exception as e:
+                        results[index] = failed(e)
+            finally:
+                detected.put(None)
+
+        workers = [
+            threading.Thread(target=decode_worker, daemon=True),
+            threading.Thread(target=detect_worker, daemon=True),
+        ]
+        for worker in workers:
+            worker.start()
+
+        # Recognition runs on the calling thread and drains the last queue
+        while (item := detected.get()) is not None:
+            index, key, (height, width), boxes, crops = item
+            try:
+                rec_res, _ = self.paddle.text_recognizer(crops) if crops else ([], 0.0)
+                lines = [
+                    (box.tolist(), (text, score))
+                    for box, (text, score) in zip(boxes, rec_res)
+                    if score >= self.paddle.drop_score
+                ]
+                results[index] = cache_result(
+                    (key, "paddleocr", with_layout),
+                    self._paddle_result(lines, width, height, with_layout),
+                )
+            except Exception as e:
+                results[index] = failed(e)
+
+        for worker in workers:
+            worker.join()
+        return results
+
+    @staticmethod
+    def _easy_result(results, scale_x: float = 1.0, scale_y: float = 1.0) -> dict:
+        if not results:
+            return {"text": "", "blocks": [], "confidence": 0.0, "engine": "easyocr"}
+
+        # (N, 4, 2) quadrilaterals -> axis-aligned (x1, y1, x2, y2), scaled in one pass
+        bbox_list, texts, scores = zip(*results)
+        bboxes = np.array(bbox_list, dtype=np.float64)
+        scale = np.array([scale_x, scale_y, scale_x, scale_y])
+        corners = (np.concatenate([bboxes.min(axis=1), bboxes.max(axis=1)], axis=1) * scale).astype(np.int32).tolist()
+        confidences = np.array(scores, dtype=np.float64)
+
+        blocks = [
+            {"text": text, "confidence": confidence, "bbox": {"x1": x1, "y1": y1, "x2": x2, "y2": y2}}
+            for text, confidence, (x1, y1, x2, y2) in zip(texts, confidences.tolist(), corners)
+        ]
+
+        return {
+            "text": "\n".join(texts),
+            "blocks": blocks,
+            "confidence": round(float(confidences.mean()), 4),
+            "engine": "easyocr",
+        }
+
+    @modal.method()
+    def process_easy(self, image_bytes: bytes | str) -> dict:
+        image_bytes = load_payload(image_bytes)
+        key = content_key(image_bytes)
+        cached = result_cache.get((key, "easyocr"))
+        if cached is not None:
+            return cached
+
+        rgb = decode_rgb_cached(image_bytes, key)
+        return cache_result((key, "easyocr"), self._easy_result(self.easy.readtext(rgb)))
+
+    @modal.method()
+    def process_easy_batch(
+        self,
+        images_bytes: list,
+        n_width: int = EASYOCR_BATCH_WIDTH,
+        n_height: int = EASYOCR_BATCH_HEIGHT,
+    ) -> list:
+        """
+        Traite plusieurs images en un passage du détecteur (readtext_batched) par orientation.
+
+        Chaque image est réduite en gardant ses proportions puis complétée en blanc
+        jusqu'au format du batch (n_width x n_height, inversé pour les pages portrait) :
+        une page A4 n'est pas écrasée. Les bbox sont ramenées aux dimensions d'origine.
+        """
+        images = [decode_rgb(load_payload(b)) for b in images_bytes]
+
+        buckets = {}
+        for index, image in enumerate(images):
+            height, width = image.shape[:2]
+            size = (n_width, n_height) if width >= height else (n_height, n_width)
+            buckets.setdefault(size, []).append(index)
+
+        results = [None] * len(images)
+        for (width, height), indices in buckets.items():
+            boxed = [letterbox(images[index], width, height) for index in indices]
+            batched = self.easy.readtext_batched(
+                np.stack([canvas for canvas, _ in boxed]), n_width=width, n_height=height
+            )
+            for index, (_, scale), page in zip(indices, boxed, batched):
+                results[index] = self._easy_result(page, 1 / scale, 1 / scale)
+        return results
+
 
 # =============================================================================
-# SuryaOCR Service
+# GPU OCR Service (SuryaOCR + GutenOCR)
 # =============================================================================
 
-@app.cls(
-    image=surya_image,
-    volumes={"/root/.cache": model_cache},
-    cpu=2,
-    memory=8192,
-    gpu="T4",
-    timeout=600,
-    container_idle_timeout=120,
-)
-class SuryaOCRService:
-    """Service OCR avec SuryaOCR + Docling."""
+# Batching dynamique : les requêtes concurrentes sont regroupées en mini-batches
+GUTENOCR_MAX_BATCH_SIZE = int(os.getenv("GUTENOCR_MAX_BATCH_SIZE", "4"))  # 4 sur T4, 8 sur A10
+GUTENOCR_MAX_WAIT_MS = int(os.getenv("GUTENOCR_MAX_WAIT_MS", "80"))
 
-    def __init__(self):
-        self.converter = None
+# Backend vLLM : Surya partage le GPU, vLLM ne doit pas réserver toute la mémoire
+GUTENOCR_VLLM_GPU_MEMORY = float(os.getenv("GUTENOCR_VLLM_GPU_MEMORY", "0.6"))
+GUTENOCR_VLLM_MAX_BATCHED_TOKENS = int(os.getenv("GUTENOCR_VLLM_MAX_BATCHED_TOKENS", "8192"))
 
-    @modal.enter()
-    def setup(self):
-        from docling.datamodel.base_models import InputFormat
-        from docling.datamodel.pipeline_options import PdfPipelineOptions
-        from docling.document_converter import DocumentConverter, PdfFormatOption
-        from docling_surya import SuryaOcrOptions
+# Quantification des poids, opt-in : none (fp16, défaut), int8 (bitsandbytes), fp8 (torchao, A10/L40S et plus).
+# int8/fp8 réduisent la VRAM mais modifient le texte extrait (à valider sur les documents médicaux),
+# int8 génère plus lentement que fp16 sur A10G/T4, et toute quantification désactive le memory snapshot.
+GUTENOCR_QUANTIZATION = os.getenv("GUTENOCR_QUANTIZATION", "none").lower()
 
-        pipeline_options = PdfPipelineOptions(
-            do_ocr=True,
-            ocr_model="suryaocr",
-            allow_external_plugins=True,
-            accelerator="cuda",
-            ocr_options=SuryaOcrOptions(lang=["en", "fr"]),
-        )
 
-        self.converter = DocumentConverter(
-            format_options={
-                InputFormat.PDF: PdfFormatOption(pipeline_options=pipeline_options),
-                InputFormat.IMAGE: PdfFormatOption(pipeline_options=pipeline_options),
-            }
-        )
-        print("✅ SuryaOCR (Docling) initialized")
+def gutenocr_quantization_config():
+    """Config de quantification transformers pour GUTENOCR_QUANTIZATION (None = fp16)."""
+    if GUTENOCR_QUANTIZATION == "int8":
+        from transformers import BitsAndBytesConfig
 
-    @modal.method()
-    def process(self, image_bytes: bytes) -> dict:
-        import tempfile
-        from pathlib import Path
+        return BitsAndBytesConfig(load_in_8bit=True, llm_int8_threshold=6.0)
+    if GUTENOCR_QUANTIZATION == "fp8":
+        from transformers import TorchAoConfig
 
-        # Save to temp file for Docling
-        with tempfile.NamedTemporaryFile(suffix=".png", delete=False) as f:
-            f.write(image_bytes)
-            temp_path = Path(f.name)
+        return TorchAoConfig("float8_weight_only")
+    return None
 
-        try:
-            result = self.converter.convert(str(temp_path))
-            markdown = result.document.export_to_markdown()
-            doc_dict = result.document.export_to_dict()
+GUTENOCR_PROMPTS = {
+    "TEXT": "Extract all text from this image.",
+    "LINES": "Extract text from this image line by line.",
+    "WORDS": "Extract all words from this image with their positions.",
+    "LATEX": "Extract mathematical expressions in LaTeX format.",
+}
 
-            return {
-                "text": markdown,
-                "blocks": [],
-                "confidence": 0.95,
-                "engine": "surya",
-                "layout": doc_dict,
-            }
-        finally:
-            temp_path.unlink()
 
+class AsyncBatchQueue:
+    """
+    Regroupe les requêtes concurrentes en mini-batches.
 
-# =============================================================================
-# EasyOCR Service
-# =============================================================================
+    Un batch part dès que max_batch_size éléments sont en attente, ou
+    max_wait_ms après l'arrivée du premier élément. Avec max_in_flight > 1,
+    le batch suivant se constitue pendant que les précédents s'exécutent.
+    """
 
-@app.cls(
-    image=easyocr_image,
-    volumes={"/root/.EasyOCR": model_cache},
-    cpu=2,
-    memory=4096,
-    timeout=300,
-    container_idle_timeout=60,
-)
-class EasyOCRService:
-    """Service OCR avec EasyOCR."""
+    def __init__(self, run_batch, max_batch_size: int, max_wait_ms: int, max_in_flight: int = 1):
+        # list[items] -> list[results] : callable bloquant, ou coroutine
+        self.run_batch = run_batch
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait_ms / 1000
+        self.max_in_flight = max(1, max_in_flight)
+        self._queue = None
+        self._worker = None
+        self._slots = None
+        self._running = set()
+
+    async def submit(self, item):
+        loop = asyncio.get_running_loop()
+        if self._worker is None:
+            self._queue = asyncio.Queue()
+            self._slots = asyncio.Semaphore(self.max_in_flight)
+            self._worker = loop.create_task(self._drain())
+
+        future = loop.create_future()
+        await self._queue.put((item, future))
+        return await future
+
+    async def _drain(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            batch = [await self._queue.get()]
+            deadline = loop.time() + self.max_wait
+            while len(batch) < self.max_batch_size:
+                timeout = deadline - loop.time()
+                if timeout <= 0:
+                    break
+                try:
+                    batch.append(await asyncio.wait_for(self._queue.get(), timeout))
+                except asyncio.TimeoutError:
+                    break
+
+            if self.max_in_flight == 1:
+                await self._run(batch)
+                continue
+            # Launched as its own task: the next batch does not wait for this one
+            await self._slots.acquire()
+            task = loop.create_task(self._run(batch))
+            self._running.add(task)
+            task.add_done_callback(self._batch_done)
+
+    def _batch_done(self, task):
+        self._running.discard(task)
+        self._slots.release()
+
+    async def _run(self, batch: list):
+        items = [item for item, _ in batch]
+        try:
+            if asyncio.iscoroutinefunction(self.run_batch):
+                results = await self.run_batch(items)
+            else:
+                # Inference in a thread so new requests keep queueing meanwhile
+                results = await asyncio.to_thread(self.run_batch, items)
+        except Exception as e:
+            for _, future in batch:
+                if not future.done():
+                    future.set_exception(e)
+            return
 
-    def __init__(self):
-        self.reader = None
+        for (_, future), result in zip(batch, results):
+            if not future.done():
+                future.set_result(result)
 
-    @modal.enter()
-    def setup(self):
-        import easyocr
 
-        self.reader = easyocr.Reader(["fr", "en"], gpu=False, verbose=False)
-        print("✅ EasyOCR initialized")
+def make_rescale_normalize():
+    """
+    Noyau fusionné (x * scale - mean) / std en une seule passe sur l'image HWC.
 
-    @modal.method()
-    def process(self, image_bytes: bytes) -> dict:
-        import io
-        import numpy as np
-        from PIL import Image
+    Utilise Numba (parallèle, cache disque) si disponible, sinon numpy.
+    """
+    try:
+        import numba as nb
+    except ImportError:
+        def kernel(image, a, b):
+            return image.astype(np.float32) * a - b
+        return kernel
 
-        image = Image.open(io.BytesIO(image_bytes))
-        if image.mode != "RGB":
-            image = image.convert("RGB")
+    @nb.njit(parallel=True, fastmath=True, cache=True)
+    def _fused(image, a, b, out):
+        height, width, channels = image.shape
+        for y in nb.prange(height):
+            for x in range(width):
+                for c in range(channels):
+                    out[y, x, c] = image[y, x, c] * a[c] - b[c]
 
-        results = self.reader.readtext(np.array(image))
+    def kernel(image, a, b):
+        out = np.empty(image.shape, dtype=np.float32)
+        _fused(np.ascontiguousarray(image), a, b, out)
+        return out
 
-        if not results:
-            return {"text": "", "blocks": [], "confidence": 0.0, "engine": "easyocr"}
+    # Warm the JIT (uint8 input, as produced by the resize step)
+    kernel(np.zeros((2, 2, 3), np.uint8), np.ones(3, np.float32), np.zeros(3, np.float32))
+    return kernel
 
-        blocks = []
-        texts = []
-        confidences = []
 
-        for bbox, text, confidence in results:
-            x1 = int(min(p[0] for p in bbox))
-            y1 = int(min(p[1] for p in bbox))
-            x2 = int(max(p[0] for p in bbox))
-            y2 = int(max(p[1] for p in bbox))
+# Processeurs d'images Qwen2-VL NumPy/PIL (transformers 4.x, 5.x) patchés par install_fused_normalize
+SLOW_QWEN2VL_PROCESSORS = frozenset({"Qwen2VLImageProcessor", "Qwen2VLImageProcessorPil"})
 
-            blocks.append({
-                "text": text,
-                "confidence": float(confidence),
-                "bbox": {"x1": x1, "y1": y1, "x2": x2, "y2": y2},
-            })
-            texts.append(text)
-            confidences.append(confidence)
 
-        return {
-            "text": "\n".join(texts),
-            "blocks": blocks,
-            "confidence": round(sum(confidences) / len(confidences), 4) if confidences else 0.0,
-            "engine": "easyocr",
-        }
+def install_fused_normalize(image_processor) -> bool:
+    """
+    Fusionne rescale() + normalize() du processeur d'images Qwen2-VL lent (PIL/NumPy).
+
+    (x * s - mean) / std == (x - mean / s) / (std / s) : quand un appel rescale puis
+    normalise, _preprocess est lancé sans rescale, avec mean et std divisés par s, et
+    normalize() fait une passe float32 sur H*W*3 au lieu de deux. Les surcharges par
+    appel (do_rescale, do_normalize, rescale_factor) restent exactes. Seul le processeur
+    NumPy est modifié (Qwen2VLImageProcessor en transformers 4.x, Qwen2VLImageProcessorPil
+    en 5.x) : les processeurs torch ont d'autres attributs et signatures.
+    """
+    from transformers.image_utils import ChannelDimension, infer_channel_dimension_format
 
+    processor_type = type(image_processor)
+    torch_backend = {cls.__name__ for cls in processor_type.__mro__} & {
+        "BaseImageProcessorFast",
+        "TorchvisionBackend",
+    }
+    if processor_type.__name__ not in SLOW_QWEN2VL_PROCESSORS or torch_backend:
+        return False
+
+    kernel = make_rescale_normalize()
+    preprocess = image_processor._preprocess
+
+    def _preprocess(*args, **kwargs):
+        mean, std = kwargs.get("image_mean"), kwargs.get("image_std")
+        fuse = kwargs.get("do_rescale") and kwargs.get("do_normalize")
+        if fuse and kwargs.get("rescale_factor") and mean is not None and std is not None:
+            scale = float(kwargs["rescale_factor"])
+            kwargs["do_rescale"] = False
+            kwargs["image_mean"] = (np.asarray(mean, dtype=np.float64) / scale).tolist()
+            kwargs["image_std"] = (np.asarray(std, dtype=np.float64) / scale).tolist()
+        return preprocess(*args, **kwargs)
+
+    def normalize(image, mean, std, data_format=None, input_data_format=None, **kwargs):
+        if input_data_format is None:
+            input_data_format = infer_channel_dimension_format(image)
+        channels_first = input_data_format == ChannelDimension.FIRST
+        hwc = np.moveaxis(image, 0, -1) if channels_first else image
+
+        channels = hwc.shape[-1:]
+        std = np.broadcast_to(np.asarray(std, dtype=np.float32).reshape(-1), channels)
+        mean = np.broadcast_to(np.asarray(mean, dtype=np.float32).reshape(-1), channels)
+        a = (1.0 / std).astype(np.float32)
+        b = (mean / std).astype(np.float32)
+        out = kernel(hwc, a, b)
+
+        if data_format is None:
+            data_format = input_data_format
+        return np.moveaxis(out, -1, 0) if data_format == ChannelDimension.FIRST else out
+
+    image_processor._preprocess = _preprocess
+    image_processor.normalize = normalize
+    return True
 
-# =============================================================================
-# GutenOCR Service (VLM-based)
-# =============================================================================
 
 @app.cls(
-    image=gutenocr_image,
-    volumes={"/root/.cache": model_cache},
+    image=gpu_ocr_image,
+    volumes={MODELS_DIR: model_cache, UPLOADS_DIR: uploads_volume},
     cpu=4,
     memory=16384,
     gpu="T4",
     timeout=600,
     container_idle_timeout=120,
+    allow_concurrent_inputs=GUTENOCR_MAX_BATCH_SIZE * 2,
+    enable_memory_snapshot=True,
 )
-class GutenOCRService:
-    """Service OCR avec GutenOCR (VLM basé sur Qwen2.5-VL)."""
+class GPUOCRService:
+    """
+    Service OCR GPU : SuryaOCR (Docling) et GutenOCR (VLM basé sur Qwen2.5-VL)
+    partagent le même conteneur T4.
+    """
 
     def __init__(self):
+        self.converter = None
+        self.surya_lock = None
         self.processor = None
         self.model = None
         self.model_size = os.getenv("GUTENOCR_MODEL_SIZE", "3b")
+        self.batcher = None
+        self.copy_stream = None
+        self.pinned = {}
+        self.llm = None
+        self.sampling_params = None
+        self.chat_templates = {}
+
+    # Snapshot phase has no GPU: load everything that can live on the CPU there,
+    # then create the CUDA context and move weights after restore.
+    @modal.enter(snap=True)
+    def load_weights(self):
+        self._setup_surya()
+        self._load_gutenocr()
+
+    @modal.enter(snap=False)
+    def move_to_gpu(self):
+        self._start_gutenocr()
+
+    def _setup_surya(self):
+        import threading
+        from docling.datamodel.base_models import InputFormat
+        from docling.datamodel.pipeline_options import PdfPipelineOptions
+        from docling.document_converter import DocumentConverter, PdfFormatOption
+        from docling_surya import SuryaOcrOptions
 
-    @modal.enter()
-    def setup(self):
+        pipeline_options = PdfPipelineOptions(
+            do_ocr=True,
+            ocr_model="suryaocr",
+            allow_external_plugins=True,
+            accelerator="cuda",
+            ocr_options=SuryaOcrOptions(lang=["en", "fr"]),
+        )
+
+        self.converter = DocumentConverter(
+            format_options={
+                InputFormat.PDF: PdfFormatOption(pipeline_options=pipeline_options),
+                InputFormat.IMAGE: PdfFormatOption(pipeline_options=pipeline_options),
+            }
+        )
+        # Concurrent inputs are enabled for GutenOCR batching; Docling runs one at a time
+        self.surya_lock = threading.Lock()
+        print("✅ SuryaOCR (Docling) initialized")
+
+    def _load_gutenocr(self):
         import torch
         from transformers import AutoProcessor, Qwen2VLForConditionalGeneration
 
         model_name = f"rootsautomation/GutenOCR-{self.model_size.upper()}"
         print(f"Loading GutenOCR model: {model_name}")
 
+        # Processeur d'images lent (NumPy) : celui que install_fused_normalize sait fusionner
         self.processor = AutoProcessor.from_pretrained(
             model_name,
             trust_remote_code=True,
+            use_fast=False,
         )
+        # Decoder-only generation in batch: pad on the left so outputs line up
+        self.processor.tokenizer.padding_side = "left"
+        if install_fused_normalize(self.processor.image_processor):
+            print("⚡ Fused rescale+normalize enabled")
+
+        # Plain fp16 weights can be loaded on the CPU and captured in the snapshot;
+        # quantized and vLLM loads need the GPU and wait for _start_gutenocr
+        if GUTENOCR_BACKEND != "vllm" and gutenocr_quantization_config() is None:
+            self.model = Qwen2VLForConditionalGeneration.from_pretrained(
+                model_name,
+                torch_dtype=torch.float16,
+                device_map="cpu",
+                trust_remote_code=True,
+            )
 
-        self.model = Qwen2VLForConditionalGeneration.from_pretrained(
-            model_name,
-            torch_dtype=torch.float16,
-            device_map="auto",
-            trust_remote_code=True,
+    def _start_gutenocr(self):
+        import torch
+
+        torch.backends.cudnn.benchmark = True
+        torch.set_float32_matmul_precision("high")
+        # Dedicated stream for host-to-device copies of the preprocessed inputs
+        self.copy_stream = torch.cuda.Stream()
+
+        model_name = f"rootsautomation/GutenOCR-{self.model_size.upper()}"
+        if self.model is not None:
+            self.model.to("cuda")
+        elif GUTENOCR_BACKEND == "vllm":
+            from vllm import LLM, SamplingParams
+
+            self.llm = LLM(
+                model=model_name,
+                dtype="float16",
+                max_num_batched_tokens=GUTENOCR_VLLM_MAX_BATCHED_TOKENS,
+                gpu_memory_utilization=GUTENOCR_VLLM_GPU_MEMORY,
+                limit_mm_per_prompt={"image": 1},
+                # Reuse the KV cache of the shared chat-template prefix across requests
+                enable_prefix_caching=True,
+                trust_remote_code=True,
+            )
+            self.sampling_params = SamplingParams(max_tokens=4096, temperature=0)
+        else:
+            from transformers import Qwen2VLForConditionalGeneration
+
+            self.model = Qwen2VLForConditionalGeneration.from_pretrained(
+                model_name,
+                quantization_config=gutenocr_quantization_config(),
+                torch_dtype=torch.float16,
+                device_map="auto",
+                trust_remote_code=True,
+            )
+        self.batcher = AsyncBatchQueue(
+            lambda items: self._generate([image for image, _ in items], [fmt for _, fmt in items]),
+            max_batch_size=GUTENOCR_MAX_BATCH_SIZE,
+            max_wait_ms=GUTENOCR_MAX_WAIT_MS,
         )
-        print(f"✅ GutenOCR {self.model_size.upper()} initialized")
+        # Warmup: the first generate() compiles kernels and sizes the caches
+        self._generate([Image.fromarray(warmup_page(800, 600))], ["TEXT"])
+        backend = "vllm" if self.llm else GUTENOCR_QUANTIZATION
+        print(f"✅ GutenOCR {self.model_size.upper()} initialized ({backend})")
 
     @modal.method()
-    def process(self, image_bytes: bytes, output_format: str = "TEXT") -> dict:
-        import io
+    def process_surya(self, image_bytes: bytes | str) -> dict:
+        from docling.datamodel.base_models import DocumentStream
+
+        image_bytes = load_payload(image_bytes)
+        key = content_key(image_bytes)
+        cached = result_cache.get((key, "surya"))
+        if cached is not None:
+            return cached
+
+        # Docling reads from memory: no temp file round-trip
+        name = "document.pdf" if image_bytes[:4] == b"%PDF" else "page.png"
+        stream = DocumentStream(name=name, stream=io.BytesIO(image_bytes))
+
+        with self.surya_lock:
+            result = self.converter.convert(stream)
+        markdown = result.document.export_to_markdown()
+        doc_dict = result.document.export_to_dict()
+
+        return cache_result((key, "surya"), {
+            "text": markdown,
+            "blocks": [],
+            "confidence": 0.95,
+            "engine": "surya",
+            "layout": doc_dict,
+        })
+
+    def _generate(self, images: list, output_formats: list) -> list:
+        """Un seul forward/generate pour tout le batch."""
         import torch
-        from PIL import Image
 
-        image = Image.open(io.BytesIO(image_bytes))
-        if image.mode != "RGB":
-            image = image.convert("RGB")
+        text_prompts = [self._chat_template(output_format) for output_format in output_formats]
 
-        # Build prompt based on format
-        prompts = {
-            "TEXT": "Extract all text from this image.",
-            "LINES": "Extract text from this image line by line.",
-            "WORDS": "Extract all words from this image with their positions.",
-            "LATEX": "Extract mathematical expressions in LaTeX format.",
-        }
-        prompt = prompts.get(output_format.upper(), prompts["TEXT"])
+        if self.llm is not None:
+            # vLLM schedules the whole batch itself (paged KV cache, continuous batching)
+            outputs = self.llm.generate(
+                [
+                    {"prompt": text_prompt, "multi_modal_data": {"image": image}}
+                    for text_prompt, image in zip(text_prompts, images)
+                ],
+                self.sampling_params,
+                use_tqdm=False,
+            )
+            texts = [output.outputs[0].text for output in outputs]
+        else:
+            inputs = self.processor(
+                text=text_prompts,
+                images=images,
+                padding=True,
+                return_tensors="pt",
+            )
 
-        conversation = [
+            inputs = self._to_device(inputs)
+
+            with torch.no_grad():
+                output_ids = self.model.generate(
+                    **inputs,
+                    max_new_tokens=4096,
+                    do_sample=False,
+                )
+
+            generated_ids = output_ids[:, inputs["input_ids"].shape[1]:]
+            texts = self.processor.batch_decode(
+                generated_ids,
+                skip_special_tokens=True,
+            )
+
+        return [
             {
-                "role": "user",
-                "content": [
-                    {"type": "image", "image": image},
-                    {"type": "text", "text": prompt},
-                ],
+                "text": text,
+                "blocks": [],
+                "confidence": 0.90,
+                "engine": f"gutenocr-{self.model_size}",
+                "layout": {"width": image.width, "height": image.height},
             }
+            for image, text in zip(images, texts)
         ]
 
-        text_prompt = self.processor.apply_chat_template(
-            conversation,
-            add_generation_prompt=True,
-        )
+    def _chat_template(self, output_format: str) -> str:
+        """
+        Prompt texte formaté pour un format de sortie, calculé une seule fois.
+
+        Le template ne dépend pas du contenu de l'image : le processor remplace
+        le marqueur d'image par les tokens visuels au moment de l'encodage.
+        """
+        output_format = output_format.upper()
+        if output_format not in GUTENOCR_PROMPTS:
+            output_format = "TEXT"
+        template = self.chat_templates.get(output_format)
+        if template is None:
+            conversation = [
+                {
+                    "role": "user",
+                    "content": [
+                        {"type": "image"},
+                        {"type": "text", "text": GUTENOCR_PROMPTS[output_format]},
+                    ],
+                }
+            ]
+            template = self.processor.apply_chat_template(
+                conversation,
+                add_generation_prompt=True,
+            )
+            self.chat_templates[output_format] = template
+        return template
 
-        inputs = self.processor(
-            text=[text_prompt],
-            images=[image],
-            padding=True,
-            return_tensors="pt",
-        )
+    def _to_device(self, inputs) -> dict:
+        """
+        Copie les tenseurs vers le GPU depuis des tampons page-locked réutilisés.
 
-        inputs = {k: v.cuda() if hasattr(v, 'cuda') else v for k, v in inputs.items()}
+        Les tampons ne sont alloués qu'à la première entrée plus grande que
+        les précédentes. Les copies non bloquantes partent sur un stream dédié ;
+        le stream par défaut attend leur fin avant generate().
+        """
+        import torch
 
-        with torch.no_grad():
-            output_ids = self.model.generate(
-                **inputs,
-                max_new_tokens=4096,
-                do_sample=False,
-            )
+        # The previous batch's copies must be done before its staging buffers are overwritten
+        self.copy_stream.synchronize()
+        current = torch.cuda.current_stream()
+        moved = {}
+        with torch.cuda.stream(self.copy_stream):
+            for k, v in inputs.items():
+                if torch.is_tensor(v):
+                    v = self._stage(k, v).to("cuda", non_blocking=True)
+                    # Allocated on the copy stream, consumed on the default one
+                    v.record_stream(current)
+                moved[k] = v
+        current.wait_stream(self.copy_stream)
+        return moved
+
+    def _stage(self, key: str, tensor):
+        """Copie un tenseur dans le tampon page-locked de sa clé, agrandi au besoin."""
+        import torch
 
-        generated_ids = output_ids[:, inputs["input_ids"].shape[1]:]
-        text = self.processor.batch_decode(
-            generated_ids,
-            skip_special_tokens=True,
-        )[0]
+        buffer = self.pinned.get(key)
+        if buffer is None or buffer.dtype != tensor.dtype or buffer.numel() < tensor.numel():
+            buffer = torch.empty(tensor.numel(), dtype=tensor.dtype, pin_memory=True)
+            self.pinned[key] = buffer
+        staged = buffer[:tensor.numel()].view(tensor.shape)
+        staged.copy_(tensor)
+        return staged
 
-        return {
-            "text": text,
-            "blocks": [],
-            "confidence": 0.90,
-            "engine": f"gutenocr-{self.model_size}",
-            "layout": {"width": image.width, "height": image.height},
-        }
+    @staticmethod
+    def _load_image(image_bytes: bytes):
+        image = Image.open(io.BytesIO(image_bytes))
+        if image.mode != "RGB":
+            image = image.convert("RGB")
+        return image
+
+    @modal.method()
+    async def process_gutenocr(self, image_bytes: bytes | str, output_format: str = "TEXT") -> dict:
+        image_bytes = await asyncio.to_thread(load_payload, image_bytes)
+        cache_key = (content_key(image_bytes), f"gutenocr-{self.model_size}", output_format.upper())
+        cached = result_cache.get(cache_key)
+        if cached is not None:
+            return cached
+
+        # Routed through the batch queue: concurrent calls share one generate()
+        image = await asyncio.to_thread(self._load_image, image_bytes)
+        return cache_result(cache_key, await self.batcher.submit((image, output_format)))
+
+    @modal.method()
+    async def process_gutenocr_batch(self, images_bytes: list, output_format: str = "TEXT") -> list:
+        """
+        Traite une liste d'images via la file de batch.
+
+        generate() n'est jamais appelé en dehors de la file : un lot et des
+        appels process_gutenocr concurrents ne se partagent pas le modèle
+        (ni les tampons page-locked) sur deux threads.
+        """
+        images = await asyncio.to_thread(lambda: [self._load_image(b) for b in images_bytes])
+        return list(await asyncio.gather(
+            *(self.batcher.submit((image, output_format)) for image in images)
+        ))
 
 
 # =============================================================================
 # Mistral OCR Service (API-based)
 # =============================================================================
 
+# Appels API : concurrence bornée, débit plafonné, retry exponentiel sur 429/5xx transitoires
+MISTRAL_CONCURRENCY = int(os.getenv("MISTRAL_CONCURRENCY", "8"))
+MISTRAL_RPS = float(os.getenv("MISTRAL_RPS", "5"))
+MISTRAL_MAX_ATTEMPTS = 3
+MISTRAL_RETRY_STATUSES = (429, 502, 503, 504)
+
+
+class RateLimiter:
+    """Espace les appels pour ne pas dépasser `rate` requêtes par seconde."""
+
+    def __init__(self, rate: float):
+        self.min_interval = 1.0 / rate if rate > 0 else 0.0
+        self._next_slot = 0.0
+
+    async def wait(self):
+        # Slot reserved before awaiting: concurrent callers queue up behind it
+        now = time.monotonic()
+        delay = self._next_slot - now
+        self._next_slot = max(now, self._next_slot) + self.min_interval
+        if delay > 0:
+            await asyncio.sleep(delay)
+
+
 @app.cls(
     image=mistral_image,
     secrets=[modal.Secret.from_name("mistral-api-key", required=False)],
+    volumes={UPLOADS_DIR: uploads_volume},
     cpu=1,
     memory=512,
     timeout=120,
     container_idle_timeout=60,
+    allow_concurrent_inputs=MISTRAL_CONCURRENCY,
+    enable_memory_snapshot=True,
 )
 class MistralOCRService:
     """Service OCR avec Mistral AI API."""
 
     def __init__(self):
         self.client = None
+        self.semaphore = None
+        self.rate_limiter = RateLimiter(MISTRAL_RPS)
 
-    @modal.enter()
+    @modal.enter(snap=True)
     def setup(self):
         from mistralai import Mistral
 
@@ -430,11 +1346,34 @@ class MistralOCRService:
         else:
             print("⚠️ MISTRAL_API_KEY not set, Mistral OCR unavailable")
 
+    async def _ocr_with_retry(self, document: dict):
+        """Appel OCR borné par le sémaphore et le limiteur, retry sur 429/5xx transitoires."""
+        if self.semaphore is None:
+            self.semaphore = asyncio.Semaphore(MISTRAL_CONCURRENCY)
+
+        for attempt in range(MISTRAL_MAX_ATTEMPTS):
+            async with self.semaphore:
+                await self.rate_limiter.wait()
+                try:
+                    if hasattr(self.client.ocr, "process_async"):
+                        return await self.client.ocr.process_async(model="mistral-ocr-2512", document=document)
+                    return await asyncio.to_thread(
+                        self.client.ocr.process, model="mistral-ocr-2512", document=document
+                    )
+                except Exception as e:
+                    status = getattr(e, "status_code", None) or getattr(getattr(e, "response", None), "status_code", None)
+                    if status not in MISTRAL_RETRY_STATUSES or attempt == MISTRAL_MAX_ATTEMPTS - 1:
+                        raise
+            # Backoff outside the semaphore so other requests can proceed
+            await asyncio.sleep(min(8, 0.5 * 2 ** attempt) + random.random() * 0.2)
+
     @modal.method()
-    def process(self, image_bytes: bytes, extract_tables: bool = True) -> dict:
-        import base64
-        import io
-        from PIL import Image
+    async def process(self, image_bytes: bytes | str, extract_tables: bool = True) -> dict:
+        image_bytes = await asyncio.to_thread(load_payload, image_bytes)
+        cache_key = (content_key(image_bytes), "mistral_ocr", extract_tables)
+        cached = result_cache.get(cache_key)
+        if cached is not None:
+            return cached
 
         if not self.client:
             return {
@@ -445,11 +1384,17 @@ class MistralOCRService:
                 "error": "Mistral API key not configured",
             }
 
-        # Get image dimensions
-        image = Image.open(io.BytesIO(image_bytes))
+        # Dimensions from the file header; PIL only for formats it doesn't cover (TIFF...)
+        dims = peek_dims(image_bytes)
+        if dims is None:
+            try:
+                dims = Image.open(io.BytesIO(image_bytes)).size
+            except Exception:
+                dims = (0, 0)
+        width, height = dims
 
-        # Convert to base64
-        image_base64 = base64.b64encode(image_bytes).decode("utf-8")
+        # Convert to base64 (SIMD codec)
+        image_base64 = pybase64.b64encode_as_string(image_bytes)
         mime_type = "image/png"
 
         # Determine mime type
@@ -460,13 +1405,10 @@ class MistralOCRService:
 
         # Call Mistral OCR API
         try:
-            response = self.client.ocr.process(
-                model="mistral-ocr-2512",
-                document={
-                    "type": "image_url",
-                    "image_url": f"data:{mime_type};base64,{image_base64}",
-                },
-            )
+            response = await self._ocr_with_retry({
+                "type": "image_url",
+                "image_url": f"data:{mime_type};base64,{image_base64}",
+            })
 
             # Extract text from response
             text_parts = []
@@ -479,13 +1421,13 @@ class MistralOCRService:
 
             text = "\n".join(text_parts) if text_parts else str(response)
 
-            return {
+            return cache_result(cache_key, {
                 "text": text,
                 "blocks": blocks,
                 "confidence": 0.95,
                 "engine": "mistral_ocr",
-                "layout": {"width": image.width, "height": image.height},
-            }
+                "layout": {"width": width, "height": height},
+            })
 
         except Exception as e:
             return {
@@ -503,35 +1445,23 @@ class MistralOCRService:
 
 # OCR-01: Use cached service instances instead of creating new ones
 # These are module-level singletons that persist across requests
-_paddle_service = None
-_surya_service = None
-_easyocr_service = None
-_gutenocr_service = None
+_cpu_service = None
+_gpu_service = None
 _mistral_service = None
 
-def get_paddle_service():
-    global _paddle_service
-    if _paddle_service is None:
-        _paddle_service = PaddleOCRService()
-    return _paddle_service
-
-def get_surya_service():
-    global _surya_service
-    if _surya_service is None:
-        _surya_service = SuryaOCRService()
-    return _surya_service
-
-def get_easyocr_service():
-    global _easyocr_service
-    if _easyocr_service is None:
-        _easyocr_service = EasyOCRService()
-    return _easyocr_service
-
-def get_gutenocr_service():
-    global _gutenocr_service
-    if _gutenocr_service is None:
-        _gutenocr_service = GutenOCRService()
-    return _gutenocr_service
+def get_cpu_service():
+    """PaddleOCR + EasyOCR."""
+    global _cpu_service
+    if _cpu_service is None:
+        _cpu_service = CPUOCRService()
+    return _cpu_service
+
+def get_gpu_service():
+    """SuryaOCR + GutenOCR."""
+    global _gpu_service
+    if _gpu_service is None:
+        _gpu_service = GPUOCRService()
+    return _gpu_service
 
 def get_mistral_service():
     global _mistral_service
@@ -542,87 +1472,568 @@ def get_mistral_service():
 # Default engine for fallback
 DEFAULT_ENGINE = "gutenocr"
 
-@app.function(image=paddleocr_image, volumes={"/root/.paddleocr": model_cache}, cpu=2, memory=4096)
+GUTENOCR_ENGINES = frozenset({"gutenocr", "gutenocr-3b", "gutenocr-7b"})
+MISTRAL_ENGINES = frozenset({"mistral", "mistral_ocr"})
+VALID_ENGINES = frozenset({"paddleocr", "surya", "easyocr"}) | GUTENOCR_ENGINES | MISTRAL_ENGINES
+
+# Plus grand côté envoyé aux moteurs GPU : leur préprocesseur réduirait de toute façon
+GPU_ENGINE_MAX_EDGE = {
+    "surya": 1920,
+    "gutenocr": 2048,
+    "gutenocr-3b": 2048,
+    "gutenocr-7b": 2048,
+}
+
+
+def downscale_image(image_bytes: bytes, max_edge: int) -> bytes:
+    """
+    Réduit l'image à max_edge pixels sur son plus grand côté (JPEG q92).
+
+    Les images déjà assez petites, les PDF et les formats non décodables
+    sont renvoyés tels quels.
+    """
+    dims = peek_dims(image_bytes)
+    if image_bytes[:4] == b"%PDF" or (dims is not None and max(dims) <= max_edge):
+        return image_bytes
+
+    bgr = cv2.imdecode(np.frombuffer(image_bytes, np.uint8), cv2.IMREAD_COLOR)
+    if bgr is None:
+        return image_bytes
+    height, width = bgr.shape[:2]
+    longest = max(height, width)
+    if longest <= max_edge:
+        return image_bytes
+
+    scale = max_edge / longest
+    bgr = cv2.resize(bgr, (int(width * scale), int(height * scale)), interpolation=cv2.INTER_AREA)
+    ok, encoded = cv2.imencode(".jpg", bgr, [cv2.IMWRITE_JPEG_QUALITY, 92])
+    return encoded.tobytes() if ok else image_bytes
+
+
+# PDF multi-pages : rendus page par page sur le routeur pour les moteurs qui ne
+# lisent que des images, puis répartis par paquets sur plusieurs conteneurs
+PDF_NATIVE_ENGINES = frozenset({"surya"}) | MISTRAL_ENGINES
+PDF_RENDER_DPI = 200
+PDF_PAGE_CHUNK = 16
+MAX_PDF_PAGES = 512
+
+
+def render_pdf_pages(pdf_bytes: bytes, dpi: int = PDF_RENDER_DPI) -> list:
+    """Rend chaque page d'un PDF en JPEG (bitmap BGR de pdfium, encodé par OpenCV)."""
+    import pypdfium2 as pdfium
+
+    pdf = pdfium.PdfDocument(bytes(pdf_bytes))
+    try:
+        if len(pdf) > MAX_PDF_PAGES:
+            raise ValueError(f"PDF has {len(pdf)} pages (max {MAX_PDF_PAGES})")
+        pages = []
+        for page in pdf:
+            bgr = page.render(scale=dpi / 72).to_numpy()
+            ok, encoded = cv2.imencode(".jpg", bgr, [cv2.IMWRITE_JPEG_QUALITY, 92])
+            if not ok:
+                raise ValueError(f"failed to encode page {len(pages) + 1}")
+            pages.append(encoded.tobytes())
+        return pages
+    finally:
+        pdf.close()
+
+
+def json_response(result: dict) -> Response:
+    """
+    Sérialise la réponse avec orjson (pages à milliers de blocs).
+
+    Plus rapide que le json standard appliqué par FastAPI, sans chaîne
+    intermédiaire ; les scalaires numpy éventuels sont acceptés tels quels.
+    """
+    return Response(
+        content=orjson.dumps(result, option=orjson.OPT_SERIALIZE_NUMPY),
+        media_type="application/json",
+    )
+
+
+# Micro-batching côté routeur : les requêtes concurrentes vers un même moteur
+# (mêmes options) partent en un seul appel .map()
+ROUTER_CONCURRENCY = int(os.getenv("ROUTER_CONCURRENCY", "32"))
+ROUTER_BATCH_SIZE = int(os.getenv("ROUTER_BATCH_SIZE", "8"))
+# Court : un appel seul ne fait qu'attendre ; le GPU micro-batche de son côté
+ROUTER_BATCH_WAIT_MS = int(os.getenv("ROUTER_BATCH_WAIT_MS", "10"))
+
+_router_batchers = {}
+
+
+def _router_batcher(engine: str, with_layout: bool, output_format: str, extract_tables: bool) -> AsyncBatchQueue:
+    """File de batch du routeur pour un moteur et un jeu d'options."""
+    key = (engine, with_layout, output_format, extract_tables)
+    batcher = _router_batchers.get(key)
+    if batcher is None:
+        method, args = _engine_call(engine, with_layout, output_format, extract_tables)
+
+        async def run_batch(payloads: list) -> list:
+            constant_args = ([arg] * len(payloads) for arg in args)
+            # Async .map: batches in flight don't each hold a worker thread
+            return [
+                result
+                async for result in method.map.aio(payloads, *constant_args, return_exceptions=True)
+            ]
+
+        # Batches run concurrently: a slow .map() does not hold up the next requests
+        batcher = AsyncBatchQueue(
+            run_batch,
+            max_batch_size=ROUTER_BATCH_SIZE,
+            max_wait_ms=ROUTER_BATCH_WAIT_MS,
+            max_in_flight=ROUTER_CONCURRENCY,
+        )
+        _router_batchers[key] = batcher
+    return batcher
+
+
+@app.function(
+    image=base_image,
+    volumes={UPLOADS_DIR: uploads_volume},
+    cpu=2,
+    memory=4096,
+    allow_concurrent_inputs=ROUTER_CONCURRENCY,
+)
 @modal.web_endpoint(method="POST", docs=True)
-async def process_ocr(request: dict) -> dict:
+async def process_ocr(request: dict) -> Response:
     """
     Endpoint OCR unifié avec sélection du moteur.
 
     Body:
         image_url: URL de l'image (optionnel)
-        image_base64: Image en base64 (optionnel)
+        image_base64: Image en base64 (optionnel, déprécié : préférer POST /process_ocr_raw
+            avec les bytes bruts, sans surcoût d'encodage ni de décodage)
+        image_urls / image_base64_list: Plusieurs images (optionnel). EasyOCR (défaut)
+            les traite en batch, PaddleOCR en pipeline ; les autres moteurs reçoivent
+            un appel par image, lancés en parallèle
         engine: Moteur OCR (paddleocr, surya, easyocr) - défaut: paddleocr
         with_layout: Inclure les infos de layout (défaut: true)
+        preserve_resolution: Ne pas réduire l'image avant les moteurs GPU (défaut: false)
 
     Returns:
         Résultat OCR avec texte, blocs, et confiance
     """
-    import base64
-    import httpx
+    return json_response(await _process_ocr(request))
+
+
+async def _process_ocr(request: dict) -> dict:
+    """Traitement de /process_ocr, résultat sous forme de dict."""
+    options = (
+        request.get("with_layout", True),
+        request.get("output_format", "TEXT"),
+        request.get("extract_tables", False),
+        request.get("preserve_resolution", False),
+    )
+
+    # Multi-image payload
+    if "image_urls" in request or "image_base64_list" in request:
+        if "image_urls" in request:
+            return await _run_ocr_urls(request["image_urls"], request.get("engine", "easyocr"), *options)
+        try:
+            images_bytes = [pybase64.b64decode(b, validate=False) for b in request["image_base64_list"]]
+        except Exception as e:
+            return {"error": f"Invalid base64: {str(e)}", "success": False}
+        try:
+            return await _run_ocr_many(images_bytes, request.get("engine", "easyocr"), *options)
+        except Exception as e:
+            return {"error": str(e), "success": False}
 
     # Get image bytes
     if "image_url" in request:
         try:
-            async with httpx.AsyncClient(timeout=30.0) as client:
-                response = await client.get(request["image_url"])
-                response.raise_for_status()
-                image_bytes = response.content
+            image_bytes = await _fetch_image(_http_client(), request["image_url"])
         except Exception as e:
             return {"error": f"Failed to fetch image: {str(e)}", "success": False}
     elif "image_base64" in request:
         try:
-            image_bytes = base64.b64decode(request["image_base64"])
+            image_bytes = pybase64.b64decode(request["image_base64"], validate=False)
         except Exception as e:
             return {"error": f"Invalid base64: {str(e)}", "success": False}
     else:
         return {"error": "image_url or image_base64 required", "success": False}
 
-    # Select engine with fallback
-    engine = request.get("engine", DEFAULT_ENGINE)
-    with_layout = request.get("with_layout", True)
-    output_format = request.get("output_format", "TEXT")
-    extract_tables = request.get("extract_tables", False)
+    return await _run_ocr(image_bytes, request.get("engine", DEFAULT_ENGINE), *options)
+
+
+_http = None
+
+
+def _http_client():
+    """
+    Client httpx partagé par les requêtes du conteneur (HTTP/2, keep-alive).
+
+    Les connexions TLS vers les hôtes d'images sont réutilisées d'une requête
+    à l'autre ; le client vit aussi longtemps que le conteneur.
+    """
+    global _http
+
+    if _http is None:
+        _http = httpx.AsyncClient(
+            http2=True,
+            timeout=httpx.Timeout(FETCH_TIMEOUT, connect=FETCH_CONNECT_TIMEOUT),
+            limits=httpx.Limits(max_connections=HTTP_MAX_CONNECTIONS, max_keepalive_connections=HTTP_MAX_KEEPALIVE),
+        )
+    return _http
+
+
+async def _fetch_image(client, url: str) -> bytearray:
+    """
+    Télécharge une image en streaming dans un buffer borné (MAX_DOWNLOAD_BYTES).
+
+    Le bytearray est retourné tel quel, sans copie finale vers bytes : décodage,
+    hash et services acceptent tout objet buffer. Les erreurs transitoires
+    (429/502/503/504, coupure réseau, timeout) sont retentées avec un backoff
+    exponentiel.
+    """
+    for attempt in range(FETCH_MAX_ATTEMPTS):
+        try:
+            buffer = bytearray()
+            async with client.stream("GET", url) as response:
+                response.raise_for_status()
+                # Announced size: reject before downloading anything
+                if int(response.headers.get("content-length") or 0) > MAX_DOWNLOAD_BYTES:
+                    raise ValueError(f"image larger than {MAX_DOWNLOAD_BYTES // 1024 // 1024}MB")
+                async for chunk in response.aiter_bytes(DOWNLOAD_CHUNK_SIZE):
+                    buffer += chunk
+                    if len(buffer) > MAX_DOWNLOAD_BYTES:
+                        raise ValueError(f"image larger than {MAX_DOWNLOAD_BYTES // 1024 // 1024}MB")
+            return buffer
+        except (httpx.HTTPStatusError, httpx.TransportError) as e:
+            if isinstance(e, httpx.HTTPStatusError) and e.response.status_code not in FETCH_RETRY_STATUSES:
+                raise
+            if attempt == FETCH_MAX_ATTEMPTS - 1:
+                raise
+        await asyncio.sleep(min(8, 0.5 * 2 ** attempt) + random.random() * 0.2)
+
+
+@app.function(
+    image=base_image,
+    volumes={UPLOADS_DIR: uploads_volume},
+    cpu=2,
+    memory=4096,
+    allow_concurrent_inputs=ROUTER_CONCURRENCY,
+)
+@modal.web_endpoint(method="POST", docs=True)
+async def process_ocr_raw(request: Request) -> Response:
+    """
+    Endpoint OCR recevant l'image en bytes bruts (application/octet-stream).
+
+    Évite l'enveloppe JSON et le décodage base64 (~33% de payload en moins).
+    Les options passent en query params ou en headers :
+        engine / X-OCR-Engine: Moteur OCR - défaut: gutenocr
+        output_format / X-Output-Format: Format de sortie GutenOCR (défaut: TEXT)
+        with_layout: Inclure les infos de layout (défaut: true)
+        extract_tables: Extraire les tableaux (Mistral, défaut: false)
+        preserve_resolution: Ne pas réduire l'image avant les moteurs GPU (défaut: false)
+
+    Returns:
+        Résultat OCR avec texte, blocs, et confiance
+    """
+    return json_response(await _process_ocr_raw(request))
+
+
+async def _process_ocr_raw(request: Request) -> dict:
+    """Traitement de /process_ocr_raw, résultat sous forme de dict."""
+    image_bytes = await request.body()
+    if not image_bytes:
+        return {"error": "empty request body", "success": False}
+    if len(image_bytes) > MAX_DOWNLOAD_BYTES:
+        return {"error": f"image larger than {MAX_DOWNLOAD_BYTES // 1024 // 1024}MB", "success": False}
+
+    params = request.query_params
+    headers = request.headers
+    return await _run_ocr(
+        image_bytes,
+        params.get("engine") or headers.get("x-ocr-engine") or DEFAULT_ENGINE,
+        params.get("with_layout", "true").lower() != "false",
+        params.get("output_format") or headers.get("x-output-format") or "TEXT",
+        params.get("extract_tables", "false").lower() == "true",
+        params.get("preserve_resolution", "false").lower() == "true",
+    )
+
 
-    # OCR-02: Fallback to default engine if unknown engine specified
-    valid_engines = ["paddleocr", "surya", "easyocr", "gutenocr", "gutenocr-3b", "gutenocr-7b", "mistral", "mistral_ocr"]
-    if engine not in valid_engines:
+def _resolve_engine(engine: str) -> str:
+    """OCR-02: Fallback to default engine if unknown engine specified."""
+    if engine not in VALID_ENGINES:
         print(f"Unknown engine '{engine}', falling back to {DEFAULT_ENGINE}")
-        engine = DEFAULT_ENGINE
+        return DEFAULT_ENGINE
+    return engine
+
+
+async def _shared_cache_get(cache_key: str):
+    """Résultat du cache partagé, ou None s'il est absent ou expiré."""
+    entry = await shared_result_cache.get.aio(cache_key)
+    if entry is None:
+        return None
+    if entry["expires_at"] < time.time():
+        try:
+            await shared_result_cache.pop.aio(cache_key)
+        except KeyError:  # déjà retiré par un autre conteneur
+            pass
+        return None
+    return entry["result"]
+
+
+async def _shared_cache_put(cache_key: str, result: dict) -> None:
+    """Met un résultat en cache avec son expiration, si le cache n'est pas plein."""
+    if await shared_result_cache.len.aio() >= SHARED_CACHE_MAX_ENTRIES:
+        return
+    await shared_result_cache.put.aio(
+        cache_key, {"expires_at": time.time() + SHARED_CACHE_TTL, "result": result}
+    )
+
+
+def _prepare_payload(image_bytes: bytes, engine: str, preserve_resolution: bool):
+    """
+    Réduit l'image pour les moteurs GPU et stage les gros documents : (payload, clé stagée).
+
+    Bloquant (décodage, écriture et commit du volume) : appelé via asyncio.to_thread.
+    """
+    # Downscale on this cheap container rather than shipping full scans to the GPU
+    if engine in GPU_ENGINE_MAX_EDGE and not preserve_resolution:
+        image_bytes = downscale_image(image_bytes, GPU_ENGINE_MAX_EDGE[engine])
+
+    # Large documents go through the uploads volume: services receive a key, not bytes
+    staged_key = stage_upload(image_bytes) if len(image_bytes) > INLINE_MAX_BYTES else None
+    return staged_key or image_bytes, staged_key
+
+
+def _prepare_payloads(images_bytes: list, engine: str, preserve_resolution: bool) -> list:
+    """_prepare_payload pour chaque image, dans un seul thread : les commits du volume restent en série."""
+    return [_prepare_payload(b, engine, preserve_resolution) for b in images_bytes]
+
+
+def _engine_call(engine: str, with_layout: bool, output_format: str, extract_tables: bool):
+    """Méthode Modal du moteur et arguments qui suivent l'image."""
+    if engine == "paddleocr":
+        return get_cpu_service().process_paddle, (with_layout,)
+    if engine == "surya":
+        return get_gpu_service().process_surya, ()
+    if engine == "easyocr":
+        return get_cpu_service().process_easy, ()
+    if engine in MISTRAL_ENGINES:
+        return get_mistral_service().process, (extract_tables,)
+    # GUTENOCR_ENGINES
+    return get_gpu_service().process_gutenocr, (output_format,)
+
+
+async def _run_ocr(
+    image_bytes: bytes,
+    engine: str,
+    with_layout: bool,
+    output_format: str,
+    extract_tables: bool,
+    preserve_resolution: bool = False,
+) -> dict:
+    """
+    Valide le moteur, stage les gros documents sur le volume puis lance l'OCR.
+
+    L'appel passe par la file de batch du routeur, avec repli sur le moteur
+    par défaut en cas d'échec.
+    """
+    engine = _resolve_engine(engine)
+    if image_bytes[:4] == b"%PDF" and engine not in PDF_NATIVE_ENGINES:
+        return await _run_ocr_pdf(image_bytes, engine, with_layout, output_format, extract_tables, preserve_resolution)
+
+    cache_key = None
+    if SHARED_CACHE_ENABLED:
+        options = f"{with_layout:d}{extract_tables:d}{preserve_resolution:d}:{output_format.upper()}"
+        cache_key = f"{content_key(image_bytes).hex()}:{engine}:{options}"
+        cached = await _shared_cache_get(cache_key)
+        if cached is not None:
+            return {"success": True, **cached}
+
+    payload, staged_key = await asyncio.to_thread(
+        _prepare_payload, image_bytes, engine, preserve_resolution
+    )
+    try:
+        try:
+            batcher = _router_batcher(engine, with_layout, output_format, extract_tables)
+            result = await batcher.submit(payload)
+            if isinstance(result, Exception):
+                raise result
+            if cache_key and "error" not in result:
+                await _shared_cache_put(cache_key, result)
+            return {"success": True, **result}
+        except Exception as e:
+            return await asyncio.to_thread(_fallback_ocr, engine, payload, with_layout, e)
+    finally:
+        if staged_key:
+            await asyncio.to_thread(discard_upload, staged_key)
+
+
+async def _run_ocr_many(
+    images_bytes: list,
+    engine: str,
+    with_layout: bool,
+    output_format: str,
+    extract_tables: bool,
+    preserve_resolution: bool = False,
+) -> dict:
+    """
+    OCR de plusieurs images.
 
+    Les gros documents sont stagés sur le volume, puis les images partent en un
+    seul .map() que Modal répartit sur ses conteneurs : la durée totale suit
+    l'appel le plus lent, les résultats reviennent dans l'ordre des images.
+    EasyOCR et PaddleOCR ont un chemin batch dédié : le .map() porte sur des
+    lots d'au plus CLASSIC_OCR_MAX_BATCH images plutôt que sur chaque image.
+    """
+    engine = _resolve_engine(engine)
+    prepared = await asyncio.to_thread(_prepare_payloads, images_bytes, engine, preserve_resolution)
+    payloads = [payload for payload, _ in prepared]
     try:
-        if engine == "paddleocr":
-            service = get_paddle_service()
-            result = service.process.remote(image_bytes, with_layout)
-        elif engine == "surya":
-            service = get_surya_service()
-            result = service.process.remote(image_bytes)
-        elif engine == "easyocr":
-            service = get_easyocr_service()
-            result = service.process.remote(image_bytes)
-        elif engine in ["gutenocr", "gutenocr-3b", "gutenocr-7b"]:
-            service = get_gutenocr_service()
-            result = service.process.remote(image_bytes, output_format)
-        elif engine in ["mistral", "mistral_ocr"]:
-            service = get_mistral_service()
-            result = service.process.remote(image_bytes, extract_tables)
+        if engine in ("easyocr", "paddleocr"):
+            results = await _run_classic_batches(payloads, engine, with_layout)
         else:
-            # This shouldn't happen due to fallback above, but just in case
-            service = get_gutenocr_service()
-            result = service.process.remote(image_bytes, output_format)
-
-        return {"success": True, **result}
+            method, args = _engine_call(engine, with_layout, output_format, extract_tables)
+            constant_args = ([arg] * len(payloads) for arg in args)
+            outputs = [
+                output
+                async for output in method.map.aio(payloads, *constant_args, return_exceptions=True)
+            ]
+            results = [
+                {"error": str(output), "success": False} if isinstance(output, Exception) else {"success": True, **output}
+                for output in outputs
+            ]
+    finally:
+        staged_keys = [staged_key for _, staged_key in prepared if staged_key]
+        if staged_keys:
+            await asyncio.to_thread(discard_upload, *staged_keys)
+
+    return {"success": True, "engine": engine, "results": results}
+
+
+async def _run_classic_batches(payloads: list, engine: str, with_layout: bool) -> list:
+    """Lots d'au plus CLASSIC_OCR_MAX_BATCH images, répartis par .map() sur les conteneurs CPU."""
+    if engine == "easyocr":
+        method, args = get_cpu_service().process_easy_batch, ()
+    else:
+        method, args = get_cpu_service().process_paddle_many, (with_layout,)
+
+    chunks = [
+        payloads[start:start + CLASSIC_OCR_MAX_BATCH]
+        for start in range(0, len(payloads), CLASSIC_OCR_MAX_BATCH)
+    ]
+    constant_args = ([arg] * len(chunks) for arg in args)
+    results = []
+    chunk_outputs = method.map.aio(chunks, *constant_args, return_exceptions=True)
+    for chunk, output in zip(chunks, [output async for output in chunk_outputs]):
+        if isinstance(output, Exception):
+            results.extend({"error": str(output), "success": False} for _ in chunk)
+        else:
+            results.extend(output)
+    return results
+
+
+async def _run_ocr_pdf(
+    pdf_bytes: bytes,
+    engine: str,
+    with_layout: bool,
+    output_format: str,
+    extract_tables: bool,
+    preserve_resolution: bool = False,
+) -> dict:
+    """
+    OCR d'un PDF pour les moteurs qui ne lisent que des images.
 
+    Les pages sont rendues ici, puis envoyées par paquets de PDF_PAGE_CHUNK en
+    appels parallèles : un long document occupe plusieurs conteneurs au lieu
+    d'un seul. Un résultat par page, dans l'ordre du document.
+    """
+    try:
+        pages = await asyncio.to_thread(render_pdf_pages, pdf_bytes)
     except Exception as e:
-        # OCR-02: If primary engine fails, try fallback
-        if engine != DEFAULT_ENGINE:
-            print(f"Engine {engine} failed, falling back to {DEFAULT_ENGINE}: {str(e)}")
+        return {"error": f"Invalid PDF: {str(e)}", "success": False}
+
+    chunks = [pages[i:i + PDF_PAGE_CHUNK] for i in range(0, len(pages), PDF_PAGE_CHUNK)]
+    outputs = await asyncio.gather(
+        *(
+            _run_ocr_many(chunk, engine, with_layout, output_format, extract_tables, preserve_resolution)
+            for chunk in chunks
+        ),
+        return_exceptions=True,
+    )
+
+    results = []
+    for chunk, output in zip(chunks, outputs):
+        if isinstance(output, Exception):
+            results.extend({"error": str(output), "success": False} for _ in chunk)
+        else:
+            results.extend(output["results"])
+    return {"success": True, "engine": engine, "page_count": len(pages), "results": results}
+
+
+async def _run_ocr_urls(
+    urls: list,
+    engine: str,
+    with_layout: bool,
+    output_format: str,
+    extract_tables: bool,
+    preserve_resolution: bool = False,
+) -> dict:
+    """
+    OCR d'une liste d'URLs en pipeline : téléchargements et OCR se recouvrent.
+
+    Les images téléchargées passent par une file bornée ; l'OCR part par paquets
+    (au plus URL_PIPELINE_CHUNK images) dès que la file se vide, sans attendre
+    la dernière URL. Un échec de téléchargement n'affecte que son image.
+    """
+    engine = _resolve_engine(engine)
+    results = [None] * len(urls)
+    queue = asyncio.Queue(maxsize=URL_PIPELINE_DEPTH)
+    semaphore = asyncio.Semaphore(MAX_CONCURRENT_FETCHES)
+
+    async def download(client, index, url):
+        async with semaphore:
             try:
-                service = get_paddle_service()
-                result = service.process.remote(image_bytes, with_layout)
-                return {"success": True, "fallback_used": True, "original_engine": engine, **result}
-            except Exception as fallback_error:
-                return {"error": f"All engines failed. Primary: {str(e)}, Fallback: {str(fallback_error)}", "success": False}
-        return {"error": str(e), "success": False}
+                image_bytes = await _fetch_image(client, url)
+            except Exception as e:
+                results[index] = {"error": f"Failed to fetch image: {str(e)}", "success": False}
+                return
+        await queue.put((index, image_bytes))
+
+    async def run_chunk(chunk):
+        try:
+            outputs = (await _run_ocr_many(
+                [image_bytes for _, image_bytes in chunk],
+                engine, with_layout, output_format, extract_tables, preserve_resolution,
+            ))["results"]
+        except Exception as e:
+            outputs = [{"error": str(e), "success": False}] * len(chunk)
+        for (index, _), output in zip(chunk, outputs):
+            results[index] = output
+
+    async def dispatch():
+        pending, chunk = [], []
+        while (item := await queue.get()) is not None:
+            chunk.append(item)
+            if len(chunk) >= URL_PIPELINE_CHUNK or queue.empty():
+                pending.append(asyncio.create_task(run_chunk(chunk)))
+                chunk = []
+        if chunk:
+            pending.append(asyncio.create_task(run_chunk(chunk)))
+        await asyncio.gather(*pending)
+
+    client = _http_client()
+    consumer = asyncio.create_task(dispatch())
+    await asyncio.gather(*(download(client, i, url) for i, url in enumerate(urls)))
+    await queue.put(None)
+    await consumer
+
+    return {"success": True, "engine": engine, "results": results}
+
+
+def _fallback_ocr(engine: str, image_bytes, with_layout: bool, error: Exception) -> dict:
+    """OCR-02: If primary engine fails, try fallback."""
+    if engine != DEFAULT_ENGINE:
+        print(f"Engine {engine} failed, falling back to {DEFAULT_ENGINE}: {str(error)}")
+        try:
+            result = get_cpu_service().process_paddle.remote(image_bytes, with_layout)
+            return {"success": True, "fallback_used": True, "original_engine": engine, **result}
+        except Exception as fallback_error:
+            return {"error": f"All engines failed. Primary: {str(error)}, Fallback: {str(fallback_error)}", "success": False}
+    return {"error": str(error), "success": False}
 
 
 @app.function()
@@ -724,6 +2135,7 @@ def main():
     print("    - easyocr      : EasyOCR (simple)")
     print("\nEndpoints:")
     print("  - POST /process_ocr  - OCR avec sélection moteur")
+    print("  - POST /process_ocr_raw - OCR sur bytes bruts (sans base64)")
     print("  - GET  /health       - Health check")
     print("  - GET  /list_engines - Liste des moteurs")
     print("\nStandalone API:")
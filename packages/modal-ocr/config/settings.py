@@ -1,6 +1,8 @@
 """Configuration loading utilities."""
 
+import copy
 import os
+from functools import lru_cache
 from pathlib import Path
 from typing import Any, Dict, Optional
 
@@ -26,8 +28,9 @@ def load_config(config_path: Optional[str] = None) -> Dict[str, Any]:
     if not config_path.exists():
         raise FileNotFoundError(f"Configuration file not found: {config_path}")
 
-    with open(config_path, "r", encoding="utf-8") as f:
-        config = yaml.safe_load(f)
+    # Parsed YAML is cached per file version; callers get their own copy to mutate
+    mtime_ns = config_path.stat().st_mtime_ns
+    config = copy.deepcopy(_parse_config(str(config_path.resolve()), mtime_ns))
 
     # Apply environment variable overrides
     config = _apply_env_overrides(config)
@@ -35,6 +38,13 @@ def load_config(config_path: Optional[str] = None) -> Dict[str, Any]:
     return config
 
 
+@lru_cache(maxsize=8)
+def _parse_config(path: str, mtime_ns: int) -> Dict[str, Any]:
+    """Parse a YAML config file; mtime_ns is part of the cache key so edits are picked up."""
+    with open(path, "r", encoding="utf-8") as f:
+        return yaml.safe_load(f)
+
+
 def get_engine_config(config: Dict[str, Any], engine_name: str) -> Dict[str, Any]:
     """
     Get configuration for a specific OCR engine.
@@ -81,4 +91,10 @@ def _apply_env_overrides(config: Dict[str, Any]) -> Dict[str, Any]:
             if "device" in config["ocr"]["engines"][engine_name]:
                 config["ocr"]["engines"][engine_name]["device"] = env_device
 
+    # Override PaddleOCR recognition batch size
+    if env_rec_batch := os.environ.get("OCR_REC_BATCH_NUM"):
+        paddle_config = config.get("ocr", {}).get("engines", {}).get("paddleocr")
+        if paddle_config is not None:
+            paddle_config["rec_batch_num"] = int(env_rec_batch)
+
     return config
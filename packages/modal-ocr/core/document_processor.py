@@ -1,12 +1,14 @@
 """Document Processor - Main pipeline for document processing."""
 
-import json
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
 from pathlib import Path
 from typing import Any, Dict, List, Optional
 
 from .ocr_factory import OCREngineFactory
-from .ocr_strategy import OCRResult
+from .ocr_strategy import OCRResult, is_out_of_memory
 
 
 class DocumentProcessor:
@@ -93,8 +95,9 @@ class DocumentProcessor:
             output_formats = output_formats or self.config["ocr"]["output"]["formats"]
             outputs = self._save_results(file_path, result, output_formats)
 
-            # Nettoyage
-            engine.cleanup()
+            # Nettoyage (memory_cleanup) : vider le cache GPU à chaque document coûte une synchronisation
+            if engine.config.get("memory_cleanup", False):
+                engine.cleanup()
 
             return {
                 "success": True,
@@ -106,6 +109,8 @@ class DocumentProcessor:
             }
 
         except Exception as e:
+            if is_out_of_memory(e):
+                engine.cleanup()
             return {
                 "success": False,
                 "error": str(e),
@@ -165,18 +170,24 @@ class DocumentProcessor:
         engine_name: Optional[str] = None,
         recursive: bool = True,
         output_formats: Optional[List[str]] = None,
+        max_workers: Optional[int] = None,
     ) -> List[Dict[str, Any]]:
         """
         Traite tous les documents d'un répertoire.
 
+        Les documents sont traités en parallèle sur un pool de threads
+        (OCR_CONCURRENCY, défaut : nombre de CPU) ; un moteur non thread-safe
+        traite ses documents un par un.
+
         Args:
             input_dir: Répertoire contenant les documents
             engine_name: Nom du moteur à utiliser
             recursive: Parcourir les sous-dossiers
             output_formats: Formats de sortie
+            max_workers: Nombre de documents traités en parallèle
 
         Returns:
-            Liste des résultats de traitement
+            Liste des résultats de traitement, dans l'ordre des fichiers
         """
         input_dir = Path(input_dir)
 
@@ -196,15 +207,29 @@ class DocumentProcessor:
         if not files:
             return [{"success": False, "error": "No supported files found"}]
 
-        print(f"📁 Found {len(files)} documents to process")
+        # Create the engine once, before the workers share it
+        engine_name = engine_name or self.default_engine
+        engine = self._get_engine(engine_name)
+        if max_workers is None:
+            max_workers = int(os.environ.get("OCR_CONCURRENCY", 0)) or os.cpu_count() or 1
+        if engine is not None and not engine.thread_safe:
+            max_workers = 1
+
+        print(f"📁 Found {len(files)} documents to process ({max_workers} in parallel)")
+
+        done = 0
+        progress_lock = threading.Lock()
 
-        results = []
-        for i, file_path in enumerate(files, 1):
-            print(f"[{i}/{len(files)}] ", end="")
+        def process(file_path: Path) -> Dict[str, Any]:
+            nonlocal done
             result = self.process_document(file_path, engine_name, output_formats)
-            results.append(result)
+            with progress_lock:
+                done += 1
+                print(f"[{done}/{len(files)}] {file_path.name}: {'✅' if result['success'] else '❌'}")
+            return result
 
-        return results
+        with ThreadPoolExecutor(max_workers=min(max_workers, len(files))) as executor:
+            return list(executor.map(process, files))
 
     def _get_engine(self, engine_name: str):
         """Get or create an engine instance."""
@@ -245,8 +270,8 @@ class DocumentProcessor:
 
         if "json" in formats:
             json_path = self.output_dir / f"{base_name}.json"
-            with open(json_path, "w", encoding="utf-8") as f:
-                json.dump(result.to_json(), f, indent=2, ensure_ascii=False)
+            with open(json_path, "wb") as f:
+                f.write(result.to_json_bytes(indent=True))
             outputs["json"] = str(json_path)
             print(f"   📄 Saved: {json_path.name}")
 
@@ -1,10 +1,19 @@
 """OCR Engine Factory - Creates instances of OCR engines."""
 
+import importlib
+import importlib.util
 import logging
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import nullcontext
 from enum import Enum
-from typing import Any, Dict, List, Optional, Type
+from functools import lru_cache
+from importlib.metadata import entry_points
+from types import MappingProxyType
+from typing import Any, Dict, Hashable, List, Optional, Tuple, Type
 
-from .ocr_strategy import OCRStrategy
+from .ocr_strategy import OCRStrategy, detect_accelerator
 
 logger = logging.getLogger(__name__)
 
@@ -12,6 +21,153 @@ logger = logging.getLogger(__name__)
 DEFAULT_ENGINE = "paddleocr"
 FALLBACK_CHAIN = ["paddleocr", "tesseract", "easyocr"]
 
+# OCR-01: Cached engine instances kept at most; the least recently used is released
+MAX_CACHED_INSTANCES = 8
+
+# compare_engines: one CUDA engine runs at a time, two VLMs loaded together can exhaust GPU memory
+_GPU_SEMAPHORE = threading.BoundedSemaphore(1)
+
+# Built-in engines: (module, class, registered names, key dependencies - any one suffices)
+BUILTIN_ENGINES = (
+    ("engines.paddleocr_engine", "PaddleOCREngine", ("paddleocr",), ("paddleocr",)),
+    ("engines.surya_engine", "SuryaEngine", ("surya",), ("docling_surya",)),
+    ("engines.hunyuan_engine", "HunyuanEngine", ("hunyuan",), ("hunyuan_ocr", "transformers")),
+    ("engines.tesseract_engine", "TesseractEngine", ("tesseract",), ("pytesseract",)),
+    ("engines.easyocr_engine", "EasyOCREngine", ("easyocr",), ("easyocr",)),
+    (
+        "engines.gutenocr_engine", "GutenOCREngine",
+        ("gutenocr", "gutenocr-3b", "gutenocr-7b"), ("transformers",),
+    ),
+    (
+        "engines.mistral_ocr_engine", "MistralOCREngine",
+        ("mistral_ocr", "mistral"), ("httpx", "requests"),
+    ),
+)
+
+# Installed packages expose extra engines under this entry-point group
+ENTRY_POINT_GROUP = "modal_ocr.engines"
+
+# Static engine metadata reported by get_engine_info
+_ENGINE_INFO = MappingProxyType({
+    "gutenocr": {
+        "name": "GutenOCR",
+        "type": "vlm",
+        "variants": ["gutenocr-3b", "gutenocr-7b"],
+        "requires_gpu": False,
+        "gpu_recommended": True,
+        "cost": "free",
+        "strengths": ["manuscripts", "multilingual", "layout"],
+        "min_ram_gb": {"3b": 8, "7b": 16},
+    },
+    "mistral_ocr": {
+        "name": "Mistral OCR",
+        "type": "api",
+        "variants": ["mistral_ocr"],
+        "requires_gpu": False,
+        "gpu_recommended": False,
+        "cost": "$2/1000 pages",
+        "strengths": ["structured_data", "tables", "forms"],
+        "requires_api_key": True,
+    },
+    "surya": {
+        "name": "Surya OCR",
+        "type": "vlm",
+        "variants": ["surya"],
+        "requires_gpu": False,
+        "gpu_recommended": True,
+        "cost": "free",
+        "strengths": ["layout", "reading_order"],
+    },
+    "hunyuan": {
+        "name": "HunyuanOCR",
+        "type": "vlm",
+        "variants": ["hunyuan"],
+        "requires_gpu": True,
+        "cost": "free",
+        "strengths": ["multilingual", "layout"],
+    },
+    "paddleocr": {
+        "name": "PaddleOCR",
+        "type": "traditional",
+        "variants": ["paddleocr"],
+        "requires_gpu": False,
+        "cost": "free",
+        "strengths": ["speed", "chinese"],
+    },
+    "tesseract": {
+        "name": "Tesseract",
+        "type": "traditional",
+        "variants": ["tesseract"],
+        "requires_gpu": False,
+        "cost": "free",
+        "strengths": ["simple_docs", "many_languages"],
+    },
+    "easyocr": {
+        "name": "EasyOCR",
+        "type": "traditional",
+        "variants": ["easyocr"],
+        "requires_gpu": False,
+        "cost": "free",
+        "strengths": ["handwriting", "scene_text"],
+    },
+})
+
+# Document type hints that change the auto-selection, grouped by class
+MANUSCRIPT_DOCUMENT_TYPES = frozenset({"manuscript", "historical", "handwriting"})
+STRUCTURED_DOCUMENT_TYPES = frozenset({"form", "invoice", "technical", "structured"})
+TABLE_DOCUMENT_TYPES = frozenset({"table", "spreadsheet"})
+
+
+def _doc_class(document_type: Optional[str]) -> Optional[str]:
+    """Reduce a document type hint to the classes auto-selection cares about."""
+    if document_type in MANUSCRIPT_DOCUMENT_TYPES:
+        return "manuscript"
+    if document_type in STRUCTURED_DOCUMENT_TYPES:
+        return "structured"
+    if document_type in TABLE_DOCUMENT_TYPES:
+        return "table"
+    return None
+
+
+@lru_cache(maxsize=None)
+def _module_available(module_name: str) -> bool:
+    """Check a module can be imported, without importing it."""
+    try:
+        return importlib.util.find_spec(module_name) is not None
+    except (ImportError, ValueError):
+        # ValueError: already in sys.modules without a __spec__ (e.g. test stubs)
+        return False
+
+
+def _freeze(obj: Any) -> Hashable:
+    """Hashable, order-independent view of a config value (dicts, lists, sets)."""
+    if isinstance(obj, dict):
+        return frozenset((key, _freeze(value)) for key, value in obj.items())
+    if isinstance(obj, (list, tuple)):
+        return tuple(_freeze(item) for item in obj)
+    if isinstance(obj, (set, frozenset)):
+        return frozenset(_freeze(item) for item in obj)
+    return obj
+
+
+class _LazyEngine:
+    """Engine class stand-in that imports its module on first instantiation."""
+
+    def __init__(self, module_name: str, class_name: str):
+        self.module_name = module_name
+        self.class_name = class_name
+        self._engine_class: Optional[Type[OCRStrategy]] = None
+
+    def resolve(self) -> Type[OCRStrategy]:
+        """Import the engine module and return the engine class."""
+        if self._engine_class is None:
+            module = importlib.import_module(self.module_name)
+            self._engine_class = getattr(module, self.class_name)
+        return self._engine_class
+
+    def __call__(self, config: Dict[str, Any]) -> OCRStrategy:
+        return self.resolve()(config)
+
 
 class SelectionPriority(Enum):
     """Priority for automatic engine selection."""
@@ -32,7 +188,12 @@ class OCREngineFactory:
     """Factory pour créer les instances de moteurs OCR."""
 
     _engines: Dict[str, Type[OCRStrategy]] = {}
-    _instances: Dict[str, OCRStrategy] = {}  # OCR-01: Cache instances
+    _instances: Dict[Tuple[str, Hashable], OCRStrategy] = OrderedDict()  # OCR-01: Cache instances
+    _builtins_registered = False
+    # Engine name -> key dependencies probed by is_available (built-ins only)
+    _requirements: Dict[str, Tuple[str, ...]] = {}
+    # (priority, document class, complexity, has_gpu) -> engine, reset when engines change
+    _selection_table: Dict[tuple, str] = {}
 
     @classmethod
     def register_engine(cls, name: str, engine_class: Type[OCRStrategy]) -> None:
@@ -44,6 +205,8 @@ class OCREngineFactory:
             engine_class: Classe du moteur
         """
         cls._engines[name] = engine_class
+        cls._requirements.pop(name, None)
+        cls._selection_table.clear()
 
     @classmethod
     def create_engine(
@@ -72,15 +235,16 @@ class OCREngineFactory:
         cls._ensure_engines_registered()
 
         # OCR-01: Return cached instance if available
-        cache_key = f"{engine_name}:{hash(str(config))}"
+        cache_key = (engine_name, _freeze(config))
         if cache_instance and cache_key in cls._instances:
+            cls._instances.move_to_end(cache_key)
             return cls._instances[cache_key]
 
         # OCR-02: Fallback if engine not found
         if engine_name not in cls._engines:
             if use_fallback:
                 logger.warning(
-                    f"Moteur '{engine_name}' inconnu, fallback vers {DEFAULT_ENGINE}"
+                    "Moteur '%s' inconnu, fallback vers %s", engine_name, DEFAULT_ENGINE
                 )
                 return cls._create_with_fallback(config, cache_key, cache_instance)
             available = list(cls._engines.keys())
@@ -91,7 +255,7 @@ class OCREngineFactory:
         if not config.get("enabled", True):
             if use_fallback:
                 logger.warning(
-                    f"Moteur '{engine_name}' désactivé, fallback vers {DEFAULT_ENGINE}"
+                    "Moteur '%s' désactivé, fallback vers %s", engine_name, DEFAULT_ENGINE
                 )
                 return cls._create_with_fallback(config, cache_key, cache_instance)
             raise ValueError(f"Moteur '{engine_name}' désactivé dans la configuration")
@@ -102,14 +266,14 @@ class OCREngineFactory:
 
             # OCR-01: Cache the instance
             if cache_instance:
-                cls._instances[cache_key] = instance
+                cls._cache_instance(cache_key, instance)
 
             return instance
 
         except Exception as e:
             if use_fallback:
                 logger.warning(
-                    f"Erreur création moteur '{engine_name}': {e}, fallback"
+                    "Erreur création moteur '%s': %s, fallback", engine_name, e
                 )
                 return cls._create_with_fallback(config, cache_key, cache_instance)
             raise
@@ -118,7 +282,7 @@ class OCREngineFactory:
     def _create_with_fallback(
         cls,
         config: Dict[str, Any],
-        cache_key: str,
+        cache_key: Tuple[str, Hashable],
         cache_instance: bool,
     ) -> OCRStrategy:
         """
@@ -127,7 +291,7 @@ class OCREngineFactory:
         errors = []
 
         for fallback_engine in FALLBACK_CHAIN:
-            if fallback_engine not in cls._engines:
+            if not cls.is_available(fallback_engine):
                 continue
 
             try:
@@ -135,9 +299,9 @@ class OCREngineFactory:
                 instance = engine_class(config)
 
                 if cache_instance:
-                    cls._instances[cache_key] = instance
+                    cls._cache_instance(cache_key, instance)
 
-                logger.info(f"Using fallback engine: {fallback_engine}")
+                logger.info("Using fallback engine: %s", fallback_engine)
                 return instance
 
             except Exception as e:
@@ -148,6 +312,17 @@ class OCREngineFactory:
             f"Aucun moteur disponible. Erreurs: {'; '.join(errors)}"
         )
 
+    @classmethod
+    def _cache_instance(cls, cache_key: Tuple[str, Hashable], instance: OCRStrategy) -> None:
+        """OCR-01: Cache an instance, releasing the least recently used beyond the limit."""
+        cls._instances[cache_key] = instance
+        while len(cls._instances) > MAX_CACHED_INSTANCES:
+            _, evicted = cls._instances.popitem(last=False)
+            try:
+                evicted.cleanup()
+            except Exception:
+                pass
+
     @classmethod
     def clear_cache(cls) -> None:
         """Clear cached engine instances."""
@@ -162,66 +337,48 @@ class OCREngineFactory:
     def get_available_engines(cls) -> list:
         """Return list of available engine names."""
         cls._ensure_engines_registered()
-        return list(cls._engines.keys())
+        return [name for name in cls._engines if cls.is_available(name)]
 
     @classmethod
-    def _ensure_engines_registered(cls) -> None:
-        """Ensure all engines are registered."""
-        if cls._engines:
-            return
-
-        # Import and register engines
-        try:
-            from engines.paddleocr_engine import PaddleOCREngine
-
-            cls._engines["paddleocr"] = PaddleOCREngine
-        except ImportError:
-            pass
-
-        try:
-            from engines.surya_engine import SuryaEngine
-
-            cls._engines["surya"] = SuryaEngine
-        except ImportError:
-            pass
-
-        try:
-            from engines.hunyuan_engine import HunyuanEngine
-
-            cls._engines["hunyuan"] = HunyuanEngine
-        except ImportError:
-            pass
-
-        try:
-            from engines.tesseract_engine import TesseractEngine
-
-            cls._engines["tesseract"] = TesseractEngine
-        except ImportError:
-            pass
-
-        try:
-            from engines.easyocr_engine import EasyOCREngine
-
-            cls._engines["easyocr"] = EasyOCREngine
-        except ImportError:
-            pass
+    def is_available(cls, name: str) -> bool:
+        """
+        Whether an engine is registered and its key dependency is installed.
 
-        try:
-            from engines.gutenocr_engine import GutenOCREngine
+        The dependency is located with importlib.util.find_spec, not imported:
+        only instantiation loads the engine module and its model stack.
+        """
+        cls._ensure_engines_registered()
+        if name not in cls._engines:
+            return False
+        requirements = cls._requirements.get(name)
+        return not requirements or any(_module_available(module) for module in requirements)
 
-            cls._engines["gutenocr"] = GutenOCREngine
-            cls._engines["gutenocr-3b"] = GutenOCREngine
-            cls._engines["gutenocr-7b"] = GutenOCREngine
-        except ImportError:
-            pass
+    @classmethod
+    def _ensure_engines_registered(cls) -> None:
+        """
+        Register the built-in and entry-point engines, once per process.
+
+        Each engine is registered as a _LazyEngine: its module is imported on
+        first instantiation, so only the engines actually created are loaded.
+        Built-ins also record their key dependencies, so listing and
+        auto-selection (is_available) skip engines that are not installed.
+        Engines added with register_engine keep precedence, then built-ins,
+        then those declared by installed packages in ENTRY_POINT_GROUP.
+        """
+        if cls._builtins_registered:
+            return
+        cls._builtins_registered = True
 
-        try:
-            from engines.mistral_ocr_engine import MistralOCREngine
+        for module_name, class_name, names, requirements in BUILTIN_ENGINES:
+            engine_class = _LazyEngine(module_name, class_name)
+            for name in names:
+                if cls._engines.setdefault(name, engine_class) is engine_class:
+                    cls._requirements[name] = requirements
 
-            cls._engines["mistral_ocr"] = MistralOCREngine
-            cls._engines["mistral"] = MistralOCREngine
-        except ImportError:
-            pass
+        # One metadata scan; the entry points are not loaded until first use
+        for entry_point in entry_points(group=ENTRY_POINT_GROUP):
+            engine_class = _LazyEngine(entry_point.module, entry_point.attr)
+            cls._engines.setdefault(entry_point.name, engine_class)
 
     @classmethod
     def auto_select_engine(
@@ -251,73 +408,86 @@ class OCREngineFactory:
         if has_gpu is None:
             has_gpu = cls._detect_gpu()
 
+        key = (priority, _doc_class(document_type), complexity, has_gpu)
+        engine = cls._selection_table.get(key)
+        if engine is None:
+            engine = cls._selection_table[key] = cls._select_engine(*key)
+        return engine
+
+    @classmethod
+    def _select_engine(
+        cls,
+        priority: SelectionPriority,
+        doc_class: Optional[str],
+        complexity: DocumentComplexity,
+        has_gpu: bool,
+    ) -> str:
+        """Selection rules behind auto_select_engine and _selection_table."""
+        available = cls.is_available
+
         # Cost priority: use free engines
         if priority == SelectionPriority.COST:
-            if "tesseract" in cls._engines:
+            if available("tesseract"):
                 return "tesseract"
-            if "easyocr" in cls._engines:
+            if available("easyocr"):
                 return "easyocr"
             return "paddleocr"
 
         # Speed priority
         if priority == SelectionPriority.SPEED:
             if complexity == DocumentComplexity.LOW:
-                return "tesseract" if "tesseract" in cls._engines else "paddleocr"
+                return "tesseract" if available("tesseract") else "paddleocr"
             else:
-                return "gutenocr-3b" if "gutenocr" in cls._engines else "surya"
+                return "gutenocr-3b" if available("gutenocr") else "surya"
 
         # Accuracy priority
         if priority == SelectionPriority.ACCURACY:
-            if document_type in ["manuscript", "historical", "handwriting"]:
+            if doc_class == "manuscript":
                 # GutenOCR 7B is best for manuscripts
-                if "gutenocr" in cls._engines and has_gpu:
+                if available("gutenocr") and has_gpu:
                     return "gutenocr-7b"
-                return "gutenocr-3b" if "gutenocr" in cls._engines else "hunyuan"
+                return "gutenocr-3b" if available("gutenocr") else "hunyuan"
 
-            elif document_type in ["form", "invoice", "technical", "structured"]:
+            elif doc_class == "structured":
                 # Mistral OCR is best for structured documents
-                if "mistral_ocr" in cls._engines:
+                if available("mistral_ocr"):
                     return "mistral_ocr"
-                return "gutenocr-3b" if "gutenocr" in cls._engines else "surya"
+                return "gutenocr-3b" if available("gutenocr") else "surya"
 
-            elif document_type in ["table", "spreadsheet"]:
+            elif doc_class == "table":
                 # Mistral OCR excels at tables
-                if "mistral_ocr" in cls._engines:
+                if available("mistral_ocr"):
                     return "mistral_ocr"
-                return "surya" if "surya" in cls._engines else "paddleocr"
+                return "surya" if available("surya") else "paddleocr"
 
             else:
                 # Default accuracy: GutenOCR 3B (good balance)
-                if "gutenocr" in cls._engines:
+                if available("gutenocr"):
                     return "gutenocr-3b"
-                return "surya" if "surya" in cls._engines else "paddleocr"
+                return "surya" if available("surya") else "paddleocr"
 
         # Balanced priority (default)
         if complexity == DocumentComplexity.HIGH:
-            if has_gpu and "gutenocr" in cls._engines:
+            if has_gpu and available("gutenocr"):
                 return "gutenocr-7b"
-            if "mistral_ocr" in cls._engines:
+            if available("mistral_ocr"):
                 return "mistral_ocr"
-            return "gutenocr-3b" if "gutenocr" in cls._engines else "surya"
+            return "gutenocr-3b" if available("gutenocr") else "surya"
 
         elif complexity == DocumentComplexity.MEDIUM:
-            if "gutenocr" in cls._engines:
+            if available("gutenocr"):
                 return "gutenocr-3b"
-            return "surya" if "surya" in cls._engines else "paddleocr"
+            return "surya" if available("surya") else "paddleocr"
 
         else:  # LOW complexity
-            if "surya" in cls._engines:
+            if available("surya"):
                 return "surya"
-            return "paddleocr" if "paddleocr" in cls._engines else "tesseract"
+            return "paddleocr" if available("paddleocr") else "tesseract"
 
     @classmethod
     def _detect_gpu(cls) -> bool:
-        """Detect if GPU is available."""
-        try:
-            import torch
-            return torch.cuda.is_available() or torch.backends.mps.is_available()
-        except ImportError:
-            return False
+        """Detect if GPU is available (CUDA or MPS, probed once per process)."""
+        return detect_accelerator() != "cpu"
 
     @classmethod
     def compare_engines(
@@ -345,14 +515,16 @@ class OCREngineFactory:
         if engines is None:
             # Use a subset of engines for comparison
             engines = ["gutenocr-3b", "mistral_ocr", "surya", "paddleocr"]
-            engines = [e for e in engines if e in cls._engines]
+            engines = [e for e in engines if cls.is_available(e)]
 
         config = config or {}
         results = {}
         file_path = Path(image_path)
 
+        # Engines are created here, then run side by side: wall time follows the slowest
+        instances = {}
         for engine_name in engines:
-            if engine_name not in cls._engines:
+            if not cls.is_available(engine_name):
                 results[engine_name] = {
                     "error": f"Engine '{engine_name}' not available",
                     "success": False,
@@ -360,32 +532,45 @@ class OCREngineFactory:
                 continue
 
             try:
-                engine = cls.create_engine(engine_name, config, use_fallback=False)
-
-                start_time = time.time()
-                result = engine.process(file_path)
-                elapsed_time = time.time() - start_time
-
-                results[engine_name] = {
-                    "success": True,
-                    "text_length": len(result.text),
-                    "confidence": result.confidence,
-                    "block_count": len(result.blocks),
-                    "processing_time_ms": round(elapsed_time * 1000, 2),
-                    "has_layout": bool(result.layout),
-                    "text_preview": result.text[:200] if result.text else "",
-                }
-
+                instances[engine_name] = cls.create_engine(engine_name, config, use_fallback=False)
             except Exception as e:
                 results[engine_name] = {
                     "success": False,
                     "error": str(e),
                 }
 
+        def run(engine: OCRStrategy) -> Dict[str, Any]:
+            with _GPU_SEMAPHORE if engine.device == "cuda" else nullcontext():
+                start_time = time.perf_counter()
+                result = engine.process(file_path)
+                elapsed_time = time.perf_counter() - start_time
+
+            return {
+                "success": True,
+                "text_length": len(result.text),
+                "confidence": result.confidence,
+                "block_count": len(result.blocks),
+                "processing_time_ms": round(elapsed_time * 1000, 2),
+                "has_layout": bool(result.layout),
+                "text_preview": result.text[:200] if result.text else "",
+            }
+
+        if instances:
+            with ThreadPoolExecutor(max_workers=len(instances)) as executor:
+                futures = {name: executor.submit(run, engine) for name, engine in instances.items()}
+                for engine_name, future in futures.items():
+                    try:
+                        results[engine_name] = future.result()
+                    except Exception as e:
+                        results[engine_name] = {
+                            "success": False,
+                            "error": str(e),
+                        }
+
         return {
             "image_path": image_path,
             "engines_compared": engines,
-            "results": results,
+            "results": {engine_name: results[engine_name] for engine_name in engines},
         }
 
     @classmethod
@@ -398,75 +583,9 @@ class OCREngineFactory:
         """
         cls._ensure_engines_registered()
 
-        engine_info = {
-            "gutenocr": {
-                "name": "GutenOCR",
-                "type": "vlm",
-                "variants": ["gutenocr-3b", "gutenocr-7b"],
-                "requires_gpu": False,
-                "gpu_recommended": True,
-                "cost": "free",
-                "strengths": ["manuscripts", "multilingual", "layout"],
-                "min_ram_gb": {"3b": 8, "7b": 16},
-            },
-            "mistral_ocr": {
-                "name": "Mistral OCR",
-                "type": "api",
-                "variants": ["mistral_ocr"],
-                "requires_gpu": False,
-                "gpu_recommended": False,
-                "cost": "$2/1000 pages",
-                "strengths": ["structured_data", "tables", "forms"],
-                "requires_api_key": True,
-            },
-            "surya": {
-                "name": "Surya OCR",
-                "type": "vlm",
-                "variants": ["surya"],
-                "requires_gpu": False,
-                "gpu_recommended": True,
-                "cost": "free",
-                "strengths": ["layout", "reading_order"],
-            },
-            "hunyuan": {
-                "name": "HunyuanOCR",
-                "type": "vlm",
-                "variants": ["hunyuan"],
-                "requires_gpu": True,
-                "cost": "free",
-                "strengths": ["multilingual", "layout"],
-            },
-            "paddleocr": {
-                "name": "PaddleOCR",
-                "type": "traditional",
-                "variants": ["paddleocr"],
-                "requires_gpu": False,
-                "cost": "free",
-                "strengths": ["speed", "chinese"],
-            },
-            "tesseract": {
-                "name": "Tesseract",
-                "type": "traditional",
-                "variants": ["tesseract"],
-                "requires_gpu": False,
-                "cost": "free",
-                "strengths": ["simple_docs", "many_languages"],
-            },
-            "easyocr": {
-                "name": "EasyOCR",
-                "type": "traditional",
-                "variants": ["easyocr"],
-                "requires_gpu": False,
-                "cost": "free",
-                "strengths": ["handwriting", "scene_text"],
-            },
+        # Filter to only available engines; each entry is a copy, _ENGINE_INFO stays untouched
+        return {
+            key: {**info, "available": True}
+            for key, info in _ENGINE_INFO.items()
+            if any(cls.is_available(v) for v in info.get("variants", [key]))
         }
-
-        # Filter to only available engines
-        available = {}
-        for key, info in engine_info.items():
-            if any(v in cls._engines for v in info.get("variants", [key])):
-                available[key] = info
-                available[key]["available"] = True
-
-        return available
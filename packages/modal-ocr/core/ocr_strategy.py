@@ -1,12 +1,19 @@
 """OCR Strategy interface - Abstract base class for all OCR engines."""
 
+import json
 from abc import ABC, abstractmethod
 from dataclasses import dataclass, field
+from functools import lru_cache
 from pathlib import Path
 from typing import Any, Dict, List, Optional
 
+try:
+    import orjson
+except ImportError:  # orjson is optional: to_json_bytes falls back to stdlib json
+    orjson = None
 
-@dataclass
+
+@dataclass(slots=True)
 class OCRResult:
     """Résultat standardisé pour tous les moteurs OCR."""
 
@@ -36,10 +43,63 @@ class OCRResult:
         """Alias for to_json."""
         return self.to_json()
 
+    def to_json_bytes(self, indent: bool = False) -> bytes:
+        """
+        Sérialisation JSON UTF-8 directe (export disque/réseau).
+
+        Avec orjson, sans dict intermédiaire.
+        """
+        if orjson is not None:
+            option = orjson.OPT_NON_STR_KEYS | orjson.OPT_SERIALIZE_NUMPY
+            if indent:
+                option |= orjson.OPT_INDENT_2
+            return orjson.dumps(self, option=option)
+        return json.dumps(
+            self.to_json(), indent=2 if indent else None, ensure_ascii=False
+        ).encode("utf-8")
+
+
+@lru_cache(maxsize=1)
+def detect_accelerator() -> str:
+    """
+    Best torch device ("cuda", "mps" or "cpu").
+
+    Probed once (torch import, CUDA init), then cached.
+    """
+    try:
+        import torch
+
+        if torch.cuda.is_available():
+            return "cuda"
+        elif torch.backends.mps.is_available():
+            return "mps"
+    except ImportError:
+        pass
+
+    return "cpu"
+
+
+def is_out_of_memory(error: BaseException) -> bool:
+    """
+    Whether an error is a host or GPU out-of-memory.
+
+    Matches torch.cuda.OutOfMemoryError by name, without importing torch.
+    """
+    return isinstance(error, MemoryError) or type(error).__name__ == "OutOfMemoryError"
+
+
+def reset_device_cache() -> None:
+    """Forget the probed device, e.g. in tests that patch torch."""
+    detect_accelerator.cache_clear()
+
 
 class OCRStrategy(ABC):
     """Interface abstraite pour tous les moteurs OCR."""
 
+    # Whether one instance may process several documents concurrently; engines opt in
+    # once verified reentrant (a shared VLM/GPU model is not)
+    thread_safe: bool = False
+
     def __init__(self, config: Dict[str, Any]):
         """
         Initialize the OCR strategy.
@@ -95,37 +155,63 @@ class OCRStrategy(ABC):
         """
         Traite plusieurs documents en batch.
 
+        Les documents sont traités par paquets de config["batch_size"] (8 par
+        défaut) via _process_batch. Le cache GPU n'est vidé qu'après un manque
+        de mémoire, ou après chaque paquet si config["memory_cleanup"] est activé
+        (sessions interactives longues) : vider le cache force une synchronisation
+        et l'allocateur doit ensuite redemander la mémoire au driver.
+
         Args:
             file_paths: Liste des chemins de fichiers
 
         Returns:
             List[OCRResult]: Liste des résultats
         """
+        batch_size = max(1, int(self.config.get("batch_size", 8)))
         results = []
-        for file_path in file_paths:
-            try:
-                result = self.process(file_path)
-                results.append(result)
-            except Exception as e:
-                # Create error result
-                results.append(
-                    OCRResult(
-                        text="",
-                        confidence=0.0,
-                        metadata={
-                            "error": str(e),
-                            "file": str(file_path),
-                            "engine": self.name,
-                        },
-                    )
-                )
-
-            # Memory cleanup after each document if configured
-            if self.config.get("memory_cleanup", True):
+        for start in range(0, len(file_paths), batch_size):
+            chunk = file_paths[start:start + batch_size]
+            chunk_results = self._process_batch(chunk)
+            if chunk_results is NotImplemented:
+                chunk_results = [self._process_or_error(file_path) for file_path in chunk]
+            results.extend(chunk_results)
+
+            # Memory cleanup after each batch if configured
+            if self.config.get("memory_cleanup", False):
                 self.cleanup()
 
         return results
 
+    def _process_batch(self, file_paths: List[Path]) -> List[OCRResult]:
+        """
+        Traite un paquet de documents en un seul passage du modèle.
+
+        À surcharger par les moteurs capables de batcher (un résultat par
+        fichier, dans l'ordre) ; NotImplemented = traitement fichier par fichier.
+        """
+        return NotImplemented
+
+    def _process_or_error(self, file_path: Path) -> OCRResult:
+        """Process one document, turning a failure into an error result."""
+        try:
+            return self.process(file_path)
+        except Exception as e:
+            if is_out_of_memory(e):
+                self.cleanup()
+            return self._error_result(file_path, e)
+
+    def _error_result(self, file_path: Path, error: Exception) -> OCRResult:
+        """Empty result recording why a document could not be processed."""
+        return OCRResult(
+            text="",
+            confidence=0.0,
+            metadata={
+                "error": str(error),
+                "file": str(file_path),
+                "engine": self.name,
+            },
+        )
+
     def cleanup(self) -> None:
         """Libère les ressources (GPU cache, etc.)."""
         import gc
@@ -149,17 +235,7 @@ class OCRStrategy(ABC):
         if device_config != "auto":
             return device_config
 
-        try:
-            import torch
-
-            if torch.cuda.is_available():
-                return "cuda"
-            elif torch.backends.mps.is_available():
-                return "mps"
-        except ImportError:
-            pass
-
-        return "cpu"
+        return detect_accelerator()
 
     def _ensure_initialized(self) -> None:
         """Ensure model is initialized before use."""
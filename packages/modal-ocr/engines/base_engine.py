@@ -4,10 +4,13 @@ import io
 from pathlib import Path
 from typing import Any, Dict, List, Union
 
+import numpy as np
 from PIL import Image
 
 from core.ocr_strategy import OCRResult, OCRStrategy
 
+from .layout import region_tags, regions_from_tags
+
 
 class BaseEngine(OCRStrategy):
     """Base class with common functionality for all OCR engines."""
@@ -31,6 +34,63 @@ class BaseEngine(OCRStrategy):
         else:
             return Image.open(source)
 
+    def load_array(self, source: Union[Path, bytes]) -> np.ndarray:
+        """
+        Decode an image from file path or bytes straight to an RGB uint8 array.
+
+        OpenCV decodes and converts in place without an intermediate PIL image;
+        PIL remains the fallback for formats OpenCV cannot read.
+
+        Args:
+            source: Path to image file or image bytes
+
+        Returns:
+            Array of shape (height, width, 3)
+        """
+        try:
+            import cv2
+        except ImportError:
+            cv2 = None
+
+        if cv2 is not None:
+            if isinstance(source, bytes):
+                data = np.frombuffer(source, np.uint8)
+            else:
+                data = np.fromfile(str(source), np.uint8)
+            bgr = cv2.imdecode(data, cv2.IMREAD_COLOR)
+            if bgr is not None:
+                return cv2.cvtColor(bgr, cv2.COLOR_BGR2RGB, dst=bgr)
+
+        return self.rgb_array(self.load_image(source))
+
+    @staticmethod
+    def rgb_array(image: Image.Image) -> np.ndarray:
+        """
+        Convert a PIL image to an RGB uint8 array.
+
+        Grayscale, RGBA and palette images are expanded with a single array
+        pass instead of Image.convert("RGB") followed by a copy into NumPy.
+
+        Args:
+            image: PIL image in any mode
+
+        Returns:
+            Array of shape (height, width, 3)
+        """
+        if image.mode == "RGB":
+            return np.asarray(image)
+        if image.mode == "L":
+            return np.repeat(np.asarray(image)[:, :, None], 3, axis=2)
+        if image.mode == "RGBA":
+            # Same as convert("RGB"): alpha is dropped, not composited
+            return np.ascontiguousarray(np.asarray(image)[:, :, :3])
+        if image.mode == "P" and image.palette is not None and image.palette.mode == "RGB":
+            palette = np.zeros((256, 3), np.uint8)
+            colors = np.asarray(image.getpalette(), np.uint8).reshape(-1, 3)[:256]
+            palette[: len(colors)] = colors
+            return palette[np.asarray(image)]
+        return np.asarray(image.convert("RGB"))
+
     def ensure_rgb(self, image: Image.Image) -> Image.Image:
         """Ensure image is in RGB mode."""
         if image.mode != "RGB":
@@ -59,47 +119,10 @@ class BaseEngine(OCRStrategy):
         if not blocks:
             return []
 
-        header_threshold = image_height * 0.15
-        footer_threshold = image_height * 0.85
-
-        header_blocks = [b for b in blocks if b.get("bbox", {}).get("y1", 0) < header_threshold]
-        footer_blocks = [b for b in blocks if b.get("bbox", {}).get("y1", 0) > footer_threshold]
-        body_blocks = [
-            b
-            for b in blocks
-            if header_threshold <= b.get("bbox", {}).get("y1", 0) <= footer_threshold
-        ]
-
-        regions = []
-        if header_blocks:
-            regions.append(
-                {
-                    "type": "header",
-                    "y_start": 0,
-                    "y_end": int(header_threshold),
-                    "block_count": len(header_blocks),
-                }
-            )
-        if body_blocks:
-            regions.append(
-                {
-                    "type": "body",
-                    "y_start": int(header_threshold),
-                    "y_end": int(footer_threshold),
-                    "block_count": len(body_blocks),
-                }
-            )
-        if footer_blocks:
-            regions.append(
-                {
-                    "type": "footer",
-                    "y_start": int(footer_threshold),
-                    "y_end": image_height,
-                    "block_count": len(footer_blocks),
-                }
-            )
-
-        return regions
+        y1 = np.fromiter(
+            (b.get("bbox", {}).get("y1", 0) for b in blocks), dtype=np.float64, count=len(blocks)
+        )
+        return regions_from_tags(region_tags(y1, image_height), image_height)
 
     def create_metadata(self, **kwargs) -> Dict[str, Any]:
         """Create standard metadata dictionary."""
@@ -1,7 +1,7 @@
 """EasyOCR Engine - OCR using EasyOCR."""
 
 from pathlib import Path
-from typing import Any, Dict, List
+from typing import Any, Dict
 
 import numpy as np
 from PIL import Image
@@ -9,6 +9,7 @@ from PIL import Image
 from core.ocr_strategy import OCRResult
 
 from .base_engine import BaseEngine
+from .layout import bucket_and_partition, group_lines, regions_from_tags
 
 
 class EasyOCREngine(BaseEngine):
@@ -17,6 +18,8 @@ class EasyOCREngine(BaseEngine):
     def __init__(self, config: Dict[str, Any]):
         super().__init__(config)
         self.gpu = config.get("gpu", True) and self.device in ["cuda", "mps"]
+        # The CPU reader is reentrant; on GPU, concurrent calls contend for one device
+        self.thread_safe = not self.gpu
 
     def initialize(self) -> None:
         """Initialize EasyOCR Reader."""
@@ -37,10 +40,23 @@ class EasyOCREngine(BaseEngine):
                 "Install with: pip install easyocr"
             )
 
+    def process(self, file_path: Path) -> OCRResult:
+        """Process a document file."""
+        self._ensure_initialized()
+        return self._process_array(self.load_array(file_path), str(file_path))
+
+    def process_bytes(self, image_bytes: bytes) -> OCRResult:
+        """Process image bytes."""
+        self._ensure_initialized()
+        return self._process_array(self.load_array(image_bytes), "bytes")
+
     def _process_image(self, image: Image.Image, source: str) -> OCRResult:
-        """Process image with EasyOCR."""
-        image = self.ensure_rgb(image)
-        img_array = np.array(image)
+        """Process a PIL image with EasyOCR."""
+        return self._process_array(np.asarray(self.ensure_rgb(image)), source)
+
+    def _process_array(self, img_array: np.ndarray, source: str) -> OCRResult:
+        """Process an RGB uint8 array with EasyOCR."""
+        height, width = img_array.shape[:2]
 
         # Run OCR
         results = self._model.readtext(img_array)
@@ -50,60 +66,44 @@ class EasyOCREngine(BaseEngine):
                 text="",
                 confidence=0.0,
                 blocks=[],
-                layout={"width": image.width, "height": image.height, "regions": []},
+                layout={"width": width, "height": height, "regions": []},
                 metadata=self.create_metadata(source=source),
             )
 
-        # Parse results
-        blocks = []
-        texts = []
-        confidences = []
-        lines_by_y: Dict[int, List[Dict]] = {}
-
-        for bbox, text, confidence in results:
-            # bbox is [[x1,y1], [x2,y1], [x2,y2], [x1,y2]]
-            x1 = int(min(p[0] for p in bbox))
-            y1 = int(min(p[1] for p in bbox))
-            x2 = int(max(p[0] for p in bbox))
-            y2 = int(max(p[1] for p in bbox))
+        # Parse results: all boxes in one array, bbox is [[x1,y1], [x2,y1], [x2,y2], [x1,y2]]
+        # zip(*results) transposes the (bbox, text, conf) tuples in one C-level pass
+        bbox_list, texts, scores = zip(*results)
+        quads = np.asarray(bbox_list, dtype=np.float64)
+        corners = np.concatenate([quads.min(axis=1), quads.max(axis=1)], axis=1).astype(np.int32)
+        centers = (corners[:, :2] + corners[:, 2:]) / 2
+        confidences = np.asarray(scores, dtype=np.float64)
 
-            y_center = (y1 + y2) / 2
-            x_center = (x1 + x2) / 2
-
-            block = {
+        blocks = [
+            {
                 "text": text,
-                "confidence": float(confidence),
+                "confidence": confidence,
                 "bbox": {"x1": x1, "y1": y1, "x2": x2, "y2": y2},
                 "center": {"x": x_center, "y": y_center},
             }
-            blocks.append(block)
-            texts.append(text)
-            confidences.append(confidence)
-
-            # Group by line (20px tolerance)
-            y_key = int(y_center / 20) * 20
-            if y_key not in lines_by_y:
-                lines_by_y[y_key] = []
-            lines_by_y[y_key].append(block)
-
-        # Reconstruct lines in reading order
-        sorted_lines = []
-        for y_key in sorted(lines_by_y.keys()):
-            line_blocks = sorted(lines_by_y[y_key], key=lambda b: b["center"]["x"])
-            sorted_lines.append(" ".join(b["text"] for b in line_blocks))
+            for text, confidence, (x1, y1, x2, y2), (x_center, y_center) in zip(
+                texts, confidences.tolist(), corners.tolist(), centers.tolist()
+            )
+        ]
 
-        # Detect regions
-        regions = self.detect_regions(blocks, image.height)
+        # Line buckets and header/body/footer tags in one scan
+        buckets, region_tags = bucket_and_partition(centers[:, 1], corners[:, 1], height)
+        sorted_lines = group_lines(texts, centers[:, 0], buckets)
+        regions = regions_from_tags(region_tags, height)
 
-        avg_confidence = sum(confidences) / len(confidences) if confidences else 0.0
+        avg_confidence = float(confidences.mean())
 
         return OCRResult(
             text="\n".join(sorted_lines),
             confidence=round(avg_confidence, 4),
             blocks=blocks,
             layout={
-                "width": image.width,
-                "height": image.height,
+                "width": width,
+                "height": height,
                 "regions": regions,
                 "structured_text": "\n".join(sorted_lines),
             },
@@ -19,13 +19,50 @@ from typing import Any, Dict, List, Optional
 
 from PIL import Image
 
-from core.ocr_strategy import OCRResult
+from core.ocr_strategy import OCRResult, is_out_of_memory
 
 from .base_engine import BaseEngine
 
+try:
+    import orjson as _json
+except ImportError:  # orjson is optional: stdlib json parses the same input, slower
+    import json as _json
+
+try:
+    import json_repair
+except ImportError:
+    json_repair = None
+
 logger = logging.getLogger(__name__)
 
 
+def loads_model_json(text: str) -> Any:
+    """
+    Parse JSON emitted by the model.
+
+    Valid JSON goes through orjson; malformed output (trailing commas, missing
+    quotes, truncated arrays) is repaired with json_repair when it is installed.
+
+    Args:
+        text: JSON text extracted from the model output
+
+    Returns:
+        Parsed JSON value
+
+    Raises:
+        ValueError: If the text cannot be parsed nor repaired
+    """
+    try:
+        return _json.loads(text)
+    except ValueError:
+        if json_repair is None:
+            raise
+    repaired = json_repair.loads(text)
+    if repaired == "":
+        raise ValueError("Model output is not valid JSON")
+    return repaired
+
+
 class GutenOCROutputFormat(Enum):
     """Output formats supported by GutenOCR."""
     TEXT = "TEXT"           # Plain text
@@ -60,6 +97,40 @@ class GutenOCREngine(BaseEngine):
 
     DEFAULT_MODEL = "3b"
 
+    # Prompts per output format (constant: chat templates are cached per prompt)
+    PROMPTS = {
+        GutenOCROutputFormat.TEXT: "Extract all text from this image.",
+        GutenOCROutputFormat.TEXT2D: (
+            "Extract all text from this image, preserving the 2D spatial layout. "
+            "Use spaces and newlines to maintain the original positioning."
+        ),
+        GutenOCROutputFormat.LINES: (
+            "Extract text from this image line by line. "
+            "Output each line on a separate line."
+        ),
+        GutenOCROutputFormat.WORDS: (
+            "Extract all words from this image. "
+            "For each word, provide: word, confidence, bounding_box (x, y, width, height). "
+            "Format as JSON array."
+        ),
+        GutenOCROutputFormat.PARAGRAPHS: (
+            "Extract text from this image organized by paragraphs. "
+            "Separate each paragraph with a blank line."
+        ),
+        GutenOCROutputFormat.LATEX: (
+            "Extract all mathematical expressions and formulas from this image. "
+            "Output in LaTeX format. For regular text, output as plain text."
+        ),
+    }
+
+    TABLE_PROMPT = (
+        "Extract all tables from this image. "
+        "For each table, provide the structure as a JSON object with: "
+        "- headers: list of column headers "
+        "- rows: list of rows (each row is a list of cell values) "
+        "- caption: table caption if present"
+    )
+
     def __init__(self, config: Dict[str, Any]):
         """
         Initialize GutenOCR Engine.
@@ -76,7 +147,7 @@ class GutenOCREngine(BaseEngine):
         # Model configuration
         self.model_size = config.get("model_size", self.DEFAULT_MODEL).lower()
         if self.model_size not in self.MODELS:
-            logger.warning(f"Unknown model size '{self.model_size}', using {self.DEFAULT_MODEL}")
+            logger.warning("Unknown model size '%s', using %s", self.model_size, self.DEFAULT_MODEL)
             self.model_size = self.DEFAULT_MODEL
 
         self.model_config = self.MODELS[self.model_size]
@@ -100,10 +171,11 @@ class GutenOCREngine(BaseEngine):
 
         # Model components (initialized lazily)
         self._processor = None
+        self._chat_templates: Dict[str, str] = {}
 
         logger.info(
-            f"GutenOCR Engine configured: model={self.model_name}, "
-            f"device={self.device}, format={self.output_format.value}"
+            "GutenOCR Engine configured: model=%s, device=%s, format=%s",
+            self.model_name, self.device, self.output_format.value,
         )
 
     def initialize(self) -> None:
@@ -112,7 +184,7 @@ class GutenOCREngine(BaseEngine):
             import torch
             from transformers import AutoProcessor, Qwen2VLForConditionalGeneration
 
-            logger.info(f"Loading GutenOCR model: {self.model_name}")
+            logger.info("Loading GutenOCR model: %s", self.model_name)
 
             # Determine dtype based on device
             if self.device == "cuda":
@@ -127,6 +199,8 @@ class GutenOCREngine(BaseEngine):
                 self.model_name,
                 trust_remote_code=True,
             )
+            # Decoder-only generation in batch (_process_batch): pad on the left
+            self._processor.tokenizer.padding_side = "left"
 
             # Load model with appropriate device mapping
             if self.device == "cuda":
@@ -145,7 +219,7 @@ class GutenOCREngine(BaseEngine):
                 if self.device == "mps":
                     self._model = self._model.to("mps")
 
-            logger.info(f"✅ GutenOCR {self.model_size.upper()} initialized on {self.device}")
+            logger.info("✅ GutenOCR %s initialized on %s", self.model_size.upper(), self.device)
 
         except ImportError as e:
             raise ImportError(
@@ -165,31 +239,38 @@ class GutenOCREngine(BaseEngine):
         Returns:
             Prompt string for the model
         """
-        prompts = {
-            GutenOCROutputFormat.TEXT: "Extract all text from this image.",
-            GutenOCROutputFormat.TEXT2D: (
-                "Extract all text from this image, preserving the 2D spatial layout. "
-                "Use spaces and newlines to maintain the original positioning."
-            ),
-            GutenOCROutputFormat.LINES: (
-                "Extract text from this image line by line. "
-                "Output each line on a separate line."
-            ),
-            GutenOCROutputFormat.WORDS: (
-                "Extract all words from this image. "
-                "For each word, provide: word, confidence, bounding_box (x, y, width, height). "
-                "Format as JSON array."
-            ),
-            GutenOCROutputFormat.PARAGRAPHS: (
-                "Extract text from this image organized by paragraphs. "
-                "Separate each paragraph with a blank line."
-            ),
-            GutenOCROutputFormat.LATEX: (
-                "Extract all mathematical expressions and formulas from this image. "
-                "Output in LaTeX format. For regular text, output as plain text."
-            ),
-        }
-        return prompts.get(output_format, prompts[GutenOCROutputFormat.TEXT])
+        return self.PROMPTS.get(output_format, self.PROMPTS[GutenOCROutputFormat.TEXT])
+
+    def _chat_template(self, prompt: str) -> str:
+        """
+        Render the Qwen2-VL chat template for a prompt, once per prompt.
+
+        The template only holds an image placeholder, so the rendered text does
+        not depend on the image and can be reused across calls.
+
+        Args:
+            prompt: Instruction text
+
+        Returns:
+            Templated prompt string
+        """
+        template = self._chat_templates.get(prompt)
+        if template is None:
+            conversation = [
+                {
+                    "role": "user",
+                    "content": [
+                        {"type": "image"},
+                        {"type": "text", "text": prompt},
+                    ],
+                }
+            ]
+            template = self._processor.apply_chat_template(
+                conversation,
+                add_generation_prompt=True,
+            )
+            self._chat_templates[prompt] = template
+        return template
 
     def _process_image(self, image: Image.Image, source: str) -> OCRResult:
         """
@@ -202,33 +283,68 @@ class GutenOCREngine(BaseEngine):
         Returns:
             OCRResult with extracted text and metadata
         """
-        import torch
-
         image = self.ensure_rgb(image)
+        text = self._generate([image])[0]
+        return self._build_result(image, text, source)
 
-        # Build conversation for Qwen2-VL
-        prompt = self._build_prompt(self.output_format)
-
-        conversation = [
-            {
-                "role": "user",
-                "content": [
-                    {"type": "image", "image": image},
-                    {"type": "text", "text": prompt},
-                ],
-            }
-        ]
-
-        # Apply chat template
-        text_prompt = self._processor.apply_chat_template(
-            conversation,
-            add_generation_prompt=True,
-        )
+    def _process_batch(self, file_paths: List[Path]) -> List[OCRResult]:
+        """
+        Process a chunk of documents with one padded generate() call.
+
+        Files that fail to load get an error result in place; if the batched
+        generate fails (e.g. out of memory), the chunk falls back to one file
+        at a time.
+
+        Args:
+            file_paths: Documents of one batch_process chunk
+
+        Returns:
+            One OCRResult per path, in order
+        """
+        if len(file_paths) < 2:
+            return NotImplemented
+        self._ensure_initialized()
+
+        results: List[Optional[OCRResult]] = [None] * len(file_paths)
+        images = []
+        for index, file_path in enumerate(file_paths):
+            try:
+                images.append((index, self.ensure_rgb(self.load_image(file_path))))
+            except Exception as e:
+                logger.error("Error loading %s: %s", file_path, e)
+                results[index] = self._error_result(file_path, e)
+
+        if images:
+            try:
+                texts = self._generate([image for _, image in images])
+            except Exception as e:
+                if is_out_of_memory(e):
+                    self.cleanup()
+                logger.warning("Batched generation failed (%s), processing files one by one", e)
+                return NotImplemented
+            for (index, image), text in zip(images, texts):
+                results[index] = self._build_result(image, text, str(file_paths[index]))
 
-        # Prepare inputs
+        return results
+
+    def _generate(self, images: List[Image.Image]) -> List[str]:
+        """
+        Run one generate() over a batch of RGB images, with the current output format.
+
+        Args:
+            images: RGB PIL Images
+
+        Returns:
+            Decoded model output per image
+        """
+        import torch
+
+        text_prompt = self._chat_template(self._build_prompt(self.output_format))
+
+        # Prepare inputs (padded to the longest prompt of the batch)
         inputs = self._processor(
-            text=[text_prompt],
-            images=[image],
+            text=[text_prompt] * len(images),
+            images=images,
             padding=True,
             return_tensors="pt",
         )
@@ -251,12 +367,14 @@ class GutenOCREngine(BaseEngine):
         # Decode output
         # Get only the generated tokens (skip input tokens)
         generated_ids = output_ids[:, inputs["input_ids"].shape[1]:]
-        text = self._processor.batch_decode(
+        return self._processor.batch_decode(
             generated_ids,
             skip_special_tokens=True,
             clean_up_tokenization_spaces=True,
-        )[0]
+        )
 
+    def _build_result(self, image: Image.Image, text: str, source: str) -> OCRResult:
+        """Parse a decoded output into an OCRResult."""
         # Parse output based on format
         blocks = self._parse_output(text)
         confidence = self._estimate_confidence(text, blocks)
@@ -294,12 +412,11 @@ class GutenOCREngine(BaseEngine):
         if self.output_format == GutenOCROutputFormat.WORDS:
             # Try to parse JSON output for WORDS format
             try:
-                import json
                 # Look for JSON array in the output
                 json_start = text.find('[')
                 json_end = text.rfind(']') + 1
                 if json_start >= 0 and json_end > json_start:
-                    words = json.loads(text[json_start:json_end])
+                    words = loads_model_json(text[json_start:json_end])
                     for word_data in words:
                         if isinstance(word_data, dict):
                             blocks.append({
@@ -314,7 +431,7 @@ class GutenOCREngine(BaseEngine):
                                 "confidence": 0.9,
                                 "type": "word",
                             })
-            except (json.JSONDecodeError, ValueError):
+            except ValueError:
                 # Fallback: split by whitespace
                 for word in text.split():
                     blocks.append({
@@ -450,26 +567,7 @@ class GutenOCREngine(BaseEngine):
         import torch
 
         # Use specialized table extraction prompt
-        conversation = [
-            {
-                "role": "user",
-                "content": [
-                    {"type": "image", "image": image},
-                    {"type": "text", "text": (
-                        "Extract all tables from this image. "
-                        "For each table, provide the structure as a JSON object with: "
-                        "- headers: list of column headers "
-                        "- rows: list of rows (each row is a list of cell values) "
-                        "- caption: table caption if present"
-                    )},
-                ],
-            }
-        ]
-
-        text_prompt = self._processor.apply_chat_template(
-            conversation,
-            add_generation_prompt=True,
-        )
+        text_prompt = self._chat_template(self.TABLE_PROMPT)
 
         inputs = self._processor(
             text=[text_prompt],
@@ -499,91 +597,18 @@ class GutenOCREngine(BaseEngine):
         # Parse tables from JSON
         tables = []
         try:
-            import json
             # Find JSON objects in output
             json_start = text.find('[')
             json_end = text.rfind(']') + 1
             if json_start >= 0 and json_end > json_start:
-                tables = json.loads(text[json_start:json_end])
+                tables = loads_model_json(text[json_start:json_end])
             elif '{' in text:
                 # Single table
                 json_start = text.find('{')
                 json_end = text.rfind('}') + 1
                 if json_start >= 0 and json_end > json_start:
-                    tables = [json.loads(text[json_start:json_end])]
-        except (json.JSONDecodeError, ValueError):
+                    tables = [loads_model_json(text[json_start:json_end])]
+        except ValueError:
             logger.warning("Could not parse table structure from output")
 
         return tables
-
-    def batch_process(self, file_paths: List[Path]) -> List[OCRResult]:
-        """
-        Process multiple documents efficiently.
-
-        GutenOCR can process images in batches for better throughput on GPU.
-
-        Args:
-            file_paths: List of file paths to process
-
-        Returns:
-            List of OCRResults
-        """
-        self._ensure_initialized()
-
-        # For CPU mode or small batches, use sequential processing
-        if self.device == "cpu" or len(file_paths) <= 2:
-            return super().batch_process(file_paths)
-
-        # GPU batch processing
-        import torch
-
-        results = []
-        batch_size = self.config.get("batch_size", 4)
-
-        for i in range(0, len(file_paths), batch_size):
-            batch_paths = file_paths[i:i + batch_size]
-            batch_images = []
-
-            for fp in batch_paths:
-                try:
-                    img = self.load_image(fp)
-                    img = self.ensure_rgb(img)
-                    batch_images.append(img)
-                except Exception as e:
-                    logger.error(f"Error loading {fp}: {e}")
-                    results.append(OCRResult(
-                        text="",
-                        confidence=0.0,
-                        metadata={
-                            "error": str(e),
-                            "file": str(fp),
-                            "engine": self.name,
-                        },
-                    ))
-                    batch_images.append(None)
-
-            # Process valid images in batch
-            valid_images = [(img, path) for img, path in zip(batch_images, batch_paths) if img is not None]
-
-            if valid_images:
-                for img, path in valid_images:
-                    try:
-                        result = self._process_image(img, str(path))
-                        results.append(result)
-                    except Exception as e:
-                        logger.error(f"Error processing {path}: {e}")
-                        results.append(OCRResult(
-                            text="",
-                            confidence=0.0,
-                            metadata={
-                                "error": str(e),
-                                "file": str(path),
-                                "engine": self.name,
-                            },
-                        ))
-
-            # Cleanup after each batch
-            if self.config.get("memory_cleanup", True):
-                self.cleanup()
-
-        return results
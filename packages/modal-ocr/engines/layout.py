@@ -0,0 +1,136 @@
+"""Layout helpers shared by the box-based engines (PaddleOCR, EasyOCR)."""
+
+from typing import Any, Dict, List, Sequence
+
+import numpy as np
+
+try:
+    from numba import njit
+except ImportError:  # numba is optional: the NumPy path below is used instead
+    njit = None
+
+# Blocks whose centers fall in the same 20px band form one line
+LINE_TOLERANCE = 20
+HEADER_RATIO = 0.15
+FOOTER_RATIO = 0.85
+
+# Region tags returned by bucket_and_partition
+HEADER, BODY, FOOTER = 0, 1, 2
+
+
+def _tags(y1, header_threshold, footer_threshold):
+    # Branchless: HEADER (0) below the header line, +1 past it, +1 more past the footer line
+    return (y1 >= header_threshold).astype(np.int8) + (y1 > footer_threshold).astype(np.int8)
+
+
+def _bucket_and_partition_numpy(y_centers, y1, header_threshold, footer_threshold, tolerance):
+    buckets = (y_centers / tolerance).astype(np.int32) * tolerance
+    return buckets, _tags(y1, header_threshold, footer_threshold)
+
+
+if njit is not None:
+
+    @njit(cache=True, nogil=True)
+    def _bucket_and_partition_jit(y_centers, y1, header_threshold, footer_threshold, tolerance):
+        n = y_centers.shape[0]
+        buckets = np.empty(n, np.int32)
+        regions = np.empty(n, np.int8)
+        for i in range(n):
+            buckets[i] = int(y_centers[i] / tolerance) * tolerance
+            regions[i] = (y1[i] >= header_threshold) + (y1[i] > footer_threshold)
+        return buckets, regions
+
+
+def bucket_and_partition(
+    y_centers: np.ndarray,
+    y1: np.ndarray,
+    image_height: int,
+    tolerance: int = LINE_TOLERANCE,
+):
+    """
+    Assign each block to a line bucket and to a page region in one scan.
+
+    Args:
+        y_centers: Vertical center of each block
+        y1: Top edge of each block
+        image_height: Height of the image
+        tolerance: Line band height in pixels
+
+    Returns:
+        (bucket ids as int32, region tags HEADER/BODY/FOOTER as int8)
+    """
+    y_centers = np.ascontiguousarray(y_centers, dtype=np.float64)
+    y1 = np.ascontiguousarray(y1, dtype=np.float64)
+    header_threshold = image_height * HEADER_RATIO
+    footer_threshold = image_height * FOOTER_RATIO
+
+    if njit is not None:
+        return _bucket_and_partition_jit(y_centers, y1, header_threshold, footer_threshold, tolerance)
+    return _bucket_and_partition_numpy(y_centers, y1, header_threshold, footer_threshold, tolerance)
+
+
+def region_tags(y1: np.ndarray, image_height: int) -> np.ndarray:
+    """
+    Tag each block HEADER/BODY/FOOTER from its top edge.
+
+    Args:
+        y1: Top edge of each block
+        image_height: Height of the image
+
+    Returns:
+        Region tags as int8
+    """
+    return _tags(np.asarray(y1), image_height * HEADER_RATIO, image_height * FOOTER_RATIO)
+
+
+def regions_from_tags(regions: np.ndarray, image_height: int) -> List[Dict[str, Any]]:
+    """
+    Build the header/body/footer region list from per-block region tags.
+
+    Args:
+        regions: Region tag of each block (see bucket_and_partition)
+        image_height: Height of the image
+
+    Returns:
+        List of region dictionaries, empty regions omitted
+    """
+    header_threshold = image_height * HEADER_RATIO
+    footer_threshold = image_height * FOOTER_RATIO
+    bounds = (
+        ("header", 0, int(header_threshold)),
+        ("body", int(header_threshold), int(footer_threshold)),
+        ("footer", int(footer_threshold), image_height),
+    )
+
+    counts = np.bincount(regions, minlength=len(bounds)).tolist()
+    return [
+        {"type": region_type, "y_start": y_start, "y_end": y_end, "block_count": count}
+        for (region_type, y_start, y_end), count in zip(bounds, counts)
+        if count
+    ]
+
+
+def group_lines(
+    texts: Sequence[str], x_centers: np.ndarray, buckets: np.ndarray
+) -> List[str]:
+    """
+    Rebuild reading-order lines from line buckets.
+
+    Args:
+        texts: Text of each block
+        x_centers: Horizontal center of each block
+        buckets: Line bucket of each block
+
+    Returns:
+        One string per line, top to bottom, blocks joined left to right
+    """
+    if len(texts) == 0:
+        return []
+
+    # One stable sort by (bucket, x); lines are the runs of equal buckets
+    order = np.lexsort((x_centers, buckets))
+    breaks = (np.flatnonzero(np.diff(buckets[order])) + 1).tolist()
+    order = order.tolist()
+    starts = [0] + breaks
+    ends = breaks + [len(order)]
+    return [" ".join([texts[i] for i in order[start:end]]) for start, end in zip(starts, ends)]
@@ -83,8 +83,7 @@ class MistralOCREngine(BaseEngine):
         self.device = "api"
 
         logger.info(
-            f"Mistral OCR Engine configured: model={self.model}, "
-            f"api_url={self.api_url}"
+            "Mistral OCR Engine configured: model=%s, api_url=%s", self.model, self.api_url
         )
 
     @property
@@ -117,7 +116,7 @@ class MistralOCREngine(BaseEngine):
             if response.status_code == 401:
                 raise ValueError("Invalid Mistral API key")
             elif response.status_code != 200:
-                logger.warning(f"API verification returned status {response.status_code}")
+                logger.warning("API verification returned status %s", response.status_code)
 
             logger.info("✅ Mistral OCR API initialized successfully")
 
@@ -226,15 +225,19 @@ class MistralOCREngine(BaseEngine):
                 if response.status_code == 429:
                     # Rate limited - wait and retry
                     retry_after = int(response.headers.get("Retry-After", backoff * 2))
-                    logger.warning(f"Rate limited, waiting {retry_after}s")
-                    time.sleep(retry_after)
+                    last_error = RuntimeError("API error 429: rate limited")
+                    if attempt + 1 < self.retry_attempts:
+                        logger.warning("Rate limited, waiting %ss", retry_after)
+                        time.sleep(retry_after)
                     backoff *= 2
                     continue
 
                 elif response.status_code >= 500:
                     # Server error - retry
-                    logger.warning(f"Server error {response.status_code}, retrying...")
-                    time.sleep(backoff)
+                    last_error = RuntimeError(f"API error {response.status_code}: server error")
+                    if attempt + 1 < self.retry_attempts:
+                        logger.warning("Server error %s, retrying...", response.status_code)
+                        time.sleep(backoff)
                     backoff *= 2
                     continue
 
@@ -247,7 +250,7 @@ class MistralOCREngine(BaseEngine):
 
             except (ConnectionError, TimeoutError) as e:
                 last_error = e
-                logger.warning(f"Connection error on attempt {attempt + 1}: {e}")
+                logger.warning("Connection error on attempt %d: %s", attempt + 1, e)
                 time.sleep(backoff)
                 backoff *= 2
                 continue
@@ -527,7 +530,7 @@ class MistralOCREngine(BaseEngine):
                 result = self.process(file_path)
                 results.append(result)
             except Exception as e:
-                logger.error(f"Error processing {file_path}: {e}")
+                logger.error("Error processing %s: %s", file_path, e)
                 results.append(OCRResult(
                     text="",
                     confidence=0.0,
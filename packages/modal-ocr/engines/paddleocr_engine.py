@@ -1,7 +1,7 @@
 """PaddleOCR Engine - OCR using PaddleOCR."""
 
 from pathlib import Path
-from typing import Any, Dict, List
+from typing import Any, Dict
 
 import numpy as np
 from PIL import Image
@@ -9,17 +9,23 @@ from PIL import Image
 from core.ocr_strategy import OCRResult
 
 from .base_engine import BaseEngine
+from .layout import bucket_and_partition, group_lines, regions_from_tags
 
 
 class PaddleOCREngine(BaseEngine):
     """Implémentation du moteur PaddleOCR."""
 
+    # The Paddle inference predictors keep per-run state: one document at a time
+    thread_safe = False
+
     def __init__(self, config: Dict[str, Any]):
         super().__init__(config)
         self.det_db_thresh = config.get("det_db_thresh", 0.3)
         self.det_db_box_thresh = config.get("det_db_box_thresh", 0.5)
         self.det_db_unclip_ratio = config.get("det_db_unclip_ratio", 1.6)
-        self.rec_batch_num = config.get("rec_batch_num", 6)
+        # On CPU the recognition batch runs crop by crop anyway, while Paddle's
+        # memory arena grows with it: 1 keeps the RSS low at no throughput cost
+        self.rec_batch_num = config.get("rec_batch_num") or (6 if self.device == "cuda" else 1)
 
     def initialize(self) -> None:
         """Initialize PaddleOCR model."""
@@ -63,10 +69,23 @@ class PaddleOCREngine(BaseEngine):
             return lang_map.get(first_lang, "fr")
         return "fr"
 
+    def process(self, file_path: Path) -> OCRResult:
+        """Process a document file."""
+        self._ensure_initialized()
+        return self._process_array(self.load_array(file_path), str(file_path))
+
+    def process_bytes(self, image_bytes: bytes) -> OCRResult:
+        """Process image bytes."""
+        self._ensure_initialized()
+        return self._process_array(self.load_array(image_bytes), "bytes")
+
     def _process_image(self, image: Image.Image, source: str) -> OCRResult:
-        """Process image with PaddleOCR."""
-        image = self.ensure_rgb(image)
-        img_array = np.array(image)
+        """Process a PIL image with PaddleOCR."""
+        return self._process_array(np.asarray(self.ensure_rgb(image)), source)
+
+    def _process_array(self, img_array: np.ndarray, source: str) -> OCRResult:
+        """Process an RGB uint8 array with PaddleOCR."""
+        height, width = img_array.shape[:2]
 
         # Run OCR
         result = self._model.ocr(img_array, cls=True)
@@ -76,60 +95,45 @@ class PaddleOCREngine(BaseEngine):
                 text="",
                 confidence=0.0,
                 blocks=[],
-                layout={"width": image.width, "height": image.height, "regions": []},
+                layout={"width": width, "height": height, "regions": []},
                 metadata=self.create_metadata(source=source, page_count=1),
             )
 
-        # Parse results
-        blocks = []
-        texts = []
-        confidences = []
-        lines_by_y: Dict[int, List[Dict]] = {}
-
-        for line in result[0]:
-            box, (text, confidence) = line
-            y_center = (box[0][1] + box[2][1]) / 2
-            x_center = (box[0][0] + box[2][0]) / 2
-
-            block = {
+        # Parse results: all boxes in one array, corners 0 (top-left) and 2 (bottom-right)
+        # zip(*...) transposes the (box, (text, conf)) pairs in C-level passes
+        box_list, recognitions = zip(*result[0])
+        texts, scores = zip(*recognitions)
+        boxes = np.asarray(box_list, dtype=np.float64)
+        corners = boxes[:, [0, 2], :].reshape(len(boxes), 4).astype(np.int32)
+        centers = (boxes[:, 0, :] + boxes[:, 2, :]) * 0.5
+        confidences = np.asarray(scores, dtype=np.float64)
+
+        blocks = [
+            {
                 "text": text,
-                "confidence": float(confidence),
-                "bbox": {
-                    "x1": int(box[0][0]),
-                    "y1": int(box[0][1]),
-                    "x2": int(box[2][0]),
-                    "y2": int(box[2][1]),
-                },
+                "confidence": confidence,
+                "bbox": {"x1": x1, "y1": y1, "x2": x2, "y2": y2},
                 "center": {"x": x_center, "y": y_center},
             }
-            blocks.append(block)
-            texts.append(text)
-            confidences.append(confidence)
-
-            # Group by line (20px tolerance)
-            y_key = int(y_center / 20) * 20
-            if y_key not in lines_by_y:
-                lines_by_y[y_key] = []
-            lines_by_y[y_key].append(block)
-
-        # Reconstruct lines in reading order
-        sorted_lines = []
-        for y_key in sorted(lines_by_y.keys()):
-            line_blocks = sorted(lines_by_y[y_key], key=lambda b: b["center"]["x"])
-            sorted_lines.append(" ".join(b["text"] for b in line_blocks))
+            for text, confidence, (x1, y1, x2, y2), (x_center, y_center) in zip(
+                texts, confidences.tolist(), corners.tolist(), centers.tolist()
+            )
+        ]
 
-        # Detect regions
-        regions = self.detect_regions(blocks, image.height)
+        # Line buckets and header/body/footer tags in one scan
+        buckets, region_tags = bucket_and_partition(centers[:, 1], corners[:, 1], height)
+        sorted_lines = group_lines(texts, centers[:, 0], buckets)
+        regions = regions_from_tags(region_tags, height)
 
-        avg_confidence = sum(confidences) / len(confidences) if confidences else 0.0
+        avg_confidence = float(confidences.mean())
 
         return OCRResult(
             text="\n".join(sorted_lines),
             confidence=round(avg_confidence, 4),
             blocks=blocks,
             layout={
-                "width": image.width,
-                "height": image.height,
+                "width": width,
+                "height": height,
                 "regions": regions,
                 "structured_text": "\n".join(sorted_lines),
             },
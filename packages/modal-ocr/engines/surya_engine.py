@@ -1,5 +1,6 @@
 """SuryaOCR Engine - OCR using SuryaOCR with Docling."""
 
+import io
 from pathlib import Path
 from typing import Any, Dict
 
@@ -65,8 +66,30 @@ class SuryaEngine(BaseEngine):
     def process(self, file_path: Path) -> OCRResult:
         """Process a document file with Docling."""
         self._ensure_initialized()
+        return self._convert(str(file_path), str(file_path))
 
-        result = self._model.convert(str(file_path))
+    def process_bytes(self, image_bytes: bytes) -> OCRResult:
+        """Process raw PDF/image bytes with Docling, without touching disk."""
+        self._ensure_initialized()
+        name = "document.pdf" if image_bytes[:4] == b"%PDF" else "page.png"
+        return self._convert(self._to_stream(name, image_bytes), "bytes")
+
+    def _process_image(self, image: Image.Image, source: str) -> OCRResult:
+        """Process PIL Image with Surya."""
+        self._ensure_initialized()
+        stream = self._to_stream("page.png", self.image_to_bytes(image, format="PNG"))
+        return self._convert(stream, source)
+
+    @staticmethod
+    def _to_stream(name: str, data: bytes):
+        """Wrap bytes in a Docling DocumentStream (in-memory source)."""
+        from docling.datamodel.base_models import DocumentStream
+
+        return DocumentStream(name=name, stream=io.BytesIO(data))
+
+    def _convert(self, source: Any, source_name: str) -> OCRResult:
+        """Run the Docling converter and build the OCRResult."""
+        result = self._model.convert(source)
 
         # Extract text and structure
         markdown_text = result.document.export_to_markdown()
@@ -87,31 +110,12 @@ class SuryaEngine(BaseEngine):
                 "document_structure": doc_dict,
             },
             metadata=self.create_metadata(
-                source=str(file_path),
+                source=source_name,
                 page_count=page_count,
                 format="docling",
             ),
         )
 
-    def _process_image(self, image: Image.Image, source: str) -> OCRResult:
-        """Process PIL Image with Surya."""
-        # For direct image processing, we need to save temporarily
-        # or use surya directly without docling
-        import tempfile
-
-        with tempfile.NamedTemporaryFile(suffix=".png", delete=False) as tmp:
-            image.save(tmp.name)
-            tmp_path = Path(tmp.name)
-
-        try:
-            result = self.process(tmp_path)
-            # Update source in metadata
-            if result.metadata:
-                result.metadata["source"] = source
-            return result
-        finally:
-            tmp_path.unlink()
-
     def _extract_blocks(self, doc_dict: Dict) -> list:
         """Extract text blocks from Docling document structure."""
         blocks = []
@@ -3,6 +3,7 @@
 from pathlib import Path
 from typing import Any, Dict
 
+import numpy as np
 from PIL import Image
 
 from core.ocr_strategy import OCRResult
@@ -13,6 +14,9 @@ from .base_engine import BaseEngine
 class TesseractEngine(BaseEngine):
     """Implémentation du moteur Tesseract OCR."""
 
+    # pytesseract runs one tesseract subprocess per call: nothing shared between calls
+    thread_safe = True
+
     def __init__(self, config: Dict[str, Any]):
         super().__init__(config)
         self.lang = config.get("lang", "fra+eng")
@@ -38,6 +42,7 @@ class TesseractEngine(BaseEngine):
     def _process_image(self, image: Image.Image, source: str) -> OCRResult:
         """Process image with Tesseract."""
         image = self.ensure_rgb(image)
+        width, height = image.size
 
         # Get full OCR data
         data = self._model.image_to_data(
@@ -54,44 +59,55 @@ class TesseractEngine(BaseEngine):
             config=self.tesseract_config,
         )
 
-        blocks = []
-        confidences = []
-
-        n_boxes = len(data["level"])
-        for i in range(n_boxes):
-            # Level 5 = word level
-            if data["level"][i] == 5 and data["text"][i].strip():
-                conf = float(data["conf"][i])
-                if conf > 0:  # Filter out invalid confidence
-                    blocks.append(
-                        {
-                            "text": data["text"][i],
-                            "confidence": conf / 100.0,  # Normalize to 0-1
-                            "bbox": {
-                                "x1": data["left"][i],
-                                "y1": data["top"][i],
-                                "x2": data["left"][i] + data["width"][i],
-                                "y2": data["top"][i] + data["height"][i],
-                            },
-                            "block_num": data["block_num"][i],
-                            "line_num": data["line_num"][i],
-                            "word_num": data["word_num"][i],
-                        }
-                    )
-                    confidences.append(conf / 100.0)
-
-        avg_confidence = sum(confidences) / len(confidences) if confidences else 0.0
+        # Column-wise filtering: level 5 = word level, conf <= 0 marks invalid boxes
+        levels = np.asarray(data["level"])
+        confs = np.asarray(data["conf"], dtype=np.float64)
+        has_text = np.fromiter(
+            (bool(word.strip()) for word in data["text"]), dtype=bool, count=len(levels)
+        )
+        keep = np.flatnonzero((levels == 5) & has_text & (confs > 0))
+
+        def column(name: str) -> np.ndarray:
+            return np.asarray(data[name])[keep]
+
+        x1, y1 = column("left"), column("top")
+        confidences = confs[keep] / 100.0  # Normalize to 0-1
+        words = [data["text"][i] for i in keep.tolist()]
+
+        blocks = [
+            {
+                "text": word,
+                "confidence": confidence,
+                "bbox": {"x1": left, "y1": top, "x2": right, "y2": bottom},
+                "block_num": block_num,
+                "line_num": line_num,
+                "word_num": word_num,
+            }
+            for word, confidence, left, top, right, bottom, block_num, line_num, word_num in zip(
+                words,
+                confidences.tolist(),
+                x1.tolist(),
+                y1.tolist(),
+                (x1 + column("width")).tolist(),
+                (y1 + column("height")).tolist(),
+                column("block_num").tolist(),
+                column("line_num").tolist(),
+                column("word_num").tolist(),
+            )
+        ]
+
+        avg_confidence = float(confidences.mean()) if len(confidences) else 0.0
 
         # Detect regions
-        regions = self.detect_regions(blocks, image.height)
+        regions = self.detect_regions(blocks, height)
 
         return OCRResult(
             text=text.strip(),
             confidence=round(avg_confidence, 4),
             blocks=blocks,
             layout={
-                "width": image.width,
-                "height": image.height,
+                "width": width,
+                "height": height,
                 "regions": regions,
                 "structured_text": text.strip(),
             },
@@ -174,6 +174,21 @@ class TestAuthentication:
             # Should work with correct key
             assert response.status_code in [200, 401]  # Depends on startup state
 
+    def test_api_key_comparison(self):
+        """Test key check accepts the configured key and rejects others."""
+        import asyncio
+        from fastapi import HTTPException
+        import api
+
+        with patch.object(api, "_API_KEY_BYTES", b"secret-key"):
+            assert asyncio.run(api._verify_api_key("secret-key")) is True
+            with pytest.raises(HTTPException) as exc:
+                asyncio.run(api._verify_api_key("secret-kez"))
+            assert exc.value.status_code == 403
+            with pytest.raises(HTTPException) as exc:
+                asyncio.run(api._verify_api_key(None))
+            assert exc.value.status_code == 401
+
 
 # =============================================================================
 # Process Endpoint Tests
@@ -232,6 +247,16 @@ class TestProcessEndpoint:
         )
         assert response.status_code in [200, 500]
 
+    def test_process_rejects_oversized_file(self, client, sample_image_bytes):
+        """Test uploads over MAX_FILE_SIZE are rejected with 413."""
+        with patch("api.MAX_FILE_SIZE", 10), patch("api.UPLOAD_CHUNK_SIZE", 4):
+            response = client.post(
+                "/api/v1/ocr/process",
+                files={"file": ("test.png", sample_image_bytes, "image/png")},
+                data={"engine": "tesseract"},
+            )
+        assert response.status_code == 413
+
 
 # =============================================================================
 # Process JSON Endpoint Tests
@@ -382,6 +407,196 @@ class TestAutoSelection:
             assert engine in ["mistral_ocr", "gutenocr-7b", "gutenocr-3b"]
 
 
+# =============================================================================
+# Result Cache Tests
+# =============================================================================
+
+class TestResultCache:
+    """Tests for the in-memory OCR result cache."""
+
+    def test_identical_requests_hit_cache(self, sample_image_bytes):
+        """Test the engine runs once for repeated identical requests."""
+        import asyncio
+        from unittest.mock import AsyncMock
+        import api
+
+        result = {"success": True, "text": "cached", "metadata": {}}
+        with patch.object(api, "RESULT_CACHE", api.OrderedDict()), \
+                patch("api._run_engine_uncached", AsyncMock(return_value=result)) as run:
+            first = asyncio.run(api.run_engine("tesseract", sample_image_bytes))
+            second = asyncio.run(api.run_engine("tesseract", sample_image_bytes))
+
+        assert first == second == result
+        assert run.await_count == 1
+
+    def test_failures_are_not_cached(self, sample_image_bytes):
+        """Test failed results are recomputed on the next call."""
+        import asyncio
+        from unittest.mock import AsyncMock
+        import api
+
+        result = {"success": False, "text": "", "metadata": {"error": "boom"}}
+        with patch.object(api, "RESULT_CACHE", api.OrderedDict()), \
+                patch("api._run_engine_uncached", AsyncMock(return_value=result)) as run:
+            asyncio.run(api.run_engine("tesseract", sample_image_bytes))
+            asyncio.run(api.run_engine("tesseract", sample_image_bytes))
+
+        assert run.await_count == 2
+
+    def test_concurrent_identical_requests_share_one_run(self, sample_image_bytes):
+        """Test identical in-flight requests are deduplicated."""
+        import asyncio
+        import api
+
+        calls = []
+
+        async def slow_run(engine_id, image_bytes, config=None):
+            calls.append(engine_id)
+            await asyncio.sleep(0.01)
+            return {"success": True, "text": "shared", "metadata": {}}
+
+        async def burst():
+            return await asyncio.gather(
+                *[api.run_engine("tesseract", sample_image_bytes) for _ in range(5)]
+            )
+
+        with patch.object(api, "RESULT_CACHE", api.OrderedDict()), \
+                patch("api._run_engine_uncached", slow_run):
+            results = asyncio.run(burst())
+
+        assert len(calls) == 1
+        assert all(r["text"] == "shared" for r in results)
+        assert not api.INFLIGHT
+
+
+# =============================================================================
+# Engine Pool Tests
+# =============================================================================
+
+class TestEnginePool:
+    """Tests for the per-engine instance pool."""
+
+    def test_failed_creation_wakes_waiter(self):
+        """Test a waiter retries the creation when the slot holder's load fails."""
+        import asyncio
+        import time
+        import api
+
+        engine = MagicMock()
+        attempts = []
+
+        def create(engine_id, config=None):
+            attempts.append(engine_id)
+            time.sleep(0.01)
+            if len(attempts) == 1:
+                raise RuntimeError("model load failed")
+            return engine
+
+        async def borrow():
+            async with api.acquire_engine("gutenocr") as borrowed:
+                return borrowed
+
+        async def burst():
+            return await asyncio.wait_for(
+                asyncio.gather(borrow(), borrow(), return_exceptions=True), timeout=5
+            )
+
+        with patch.dict(api.ENGINE_POOLS, clear=True), \
+                patch.dict(api.ENGINE_POOL_CREATED, clear=True), \
+                patch("api.engine_pool_size", return_value=1), \
+                patch("api.create_engine_instance", create):
+            first, second = asyncio.run(burst())
+
+        assert isinstance(first, RuntimeError)
+        assert second is engine
+        assert len(attempts) == 2
+
+
+# =============================================================================
+# API Engine Retry Tests
+# =============================================================================
+
+class TestApiEngineRetry:
+    """Tests for rate-limit retries on API-based engines."""
+
+    def test_rate_limited_call_is_retried(self, sample_image_bytes):
+        """Test a 429 failure is retried and the later success returned."""
+        import asyncio
+        from unittest.mock import AsyncMock
+        import api
+
+        info = api.EngineInfo(
+            id="mistral_ocr", name="Mistral OCR", description="", type="api",
+            languages=["fr"], gpu_required=False, available=True,
+        )
+        limited = {"success": False, "metadata": {"error": "API error 429: rate limited"}}
+        ok = {"success": True, "text": "done", "metadata": {}}
+        with patch.dict(api.ENGINE_REGISTRY, {"mistral_ocr": info}), \
+                patch.object(api, "API_RETRY_INITIAL_DELAY", 0.0), \
+                patch("api._dispatch", AsyncMock(side_effect=[limited, ok])) as dispatch:
+            result = asyncio.run(api._run_engine_uncached("mistral_ocr", sample_image_bytes))
+
+        assert result == ok
+        assert dispatch.await_count == 2
+
+    def test_self_retrying_engine_is_called_once(self, sample_image_bytes):
+        """Test an engine configured to retry on its own is not retried again here."""
+        import asyncio
+        from unittest.mock import AsyncMock
+        import api
+
+        info = api.EngineInfo(
+            id="mistral_ocr", name="Mistral OCR", description="", type="api",
+            languages=["fr"], gpu_required=False, available=True,
+        )
+        limited = {"success": False, "metadata": {"error": "API error 429: rate limited"}}
+        with patch.dict(api.ENGINE_REGISTRY, {"mistral_ocr": info}), \
+                patch("api._dispatch", AsyncMock(return_value=limited)) as dispatch:
+            result = asyncio.run(
+                api._run_engine_uncached("mistral_ocr", sample_image_bytes, {"retry_attempts": 3})
+            )
+
+        assert result == limited
+        assert dispatch.await_count == 1
+
+    def test_zero_retries_still_dispatches_once(self, sample_image_bytes):
+        """Test OCR_API_ENGINE_RETRIES=0 still makes one call and returns its result."""
+        import asyncio
+        from unittest.mock import AsyncMock
+        import api
+
+        info = api.EngineInfo(
+            id="mistral_ocr", name="Mistral OCR", description="", type="api",
+            languages=["fr"], gpu_required=False, available=True,
+        )
+        ok = {"success": True, "text": "done", "metadata": {}}
+        with patch.dict(api.ENGINE_REGISTRY, {"mistral_ocr": info}), \
+                patch.object(api, "API_ENGINE_RETRIES", 0), \
+                patch("api._dispatch", AsyncMock(return_value=ok)) as dispatch:
+            result = asyncio.run(api._run_engine_uncached("mistral_ocr", sample_image_bytes))
+
+        assert result == ok
+        assert dispatch.await_count == 1
+
+    def test_other_errors_are_not_retried(self, sample_image_bytes):
+        """Test non rate-limit failures return immediately."""
+        import asyncio
+        from unittest.mock import AsyncMock
+        import api
+
+        info = api.EngineInfo(
+            id="mistral_ocr", name="Mistral OCR", description="", type="api",
+            languages=["fr"], gpu_required=False, available=True,
+        )
+        failed = {"success": False, "metadata": {"error": "API error 400: bad image"}}
+        with patch.dict(api.ENGINE_REGISTRY, {"mistral_ocr": info}), \
+                patch("api._dispatch", AsyncMock(return_value=failed)) as dispatch:
+            result = asyncio.run(api._run_engine_uncached("mistral_ocr", sample_image_bytes))
+
+        assert result == failed
+        assert dispatch.await_count == 1
+
+
 # =============================================================================
 # Response Format Tests
 # =============================================================================
@@ -0,0 +1,59 @@
+"""
+Tests for the fused rescale+normalize of the GutenOCR image processor
+=====================================================================
+
+Compare pixel_values from a patched and a stock Qwen2VLImageProcessor.
+"""
+
+import sys
+from pathlib import Path
+
+import numpy as np
+import pytest
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+pytest.importorskip("modal")
+transformers = pytest.importorskip("transformers")
+
+# NumPy/PIL image processor: Qwen2VLImageProcessorPil in transformers 5.x, the slow class in 4.x
+SlowProcessor = (
+    getattr(transformers, "Qwen2VLImageProcessorPil", None) or transformers.Qwen2VLImageProcessor
+)
+
+
+@pytest.fixture
+def image():
+    """Random RGB page crop, as produced by the image decoder."""
+    rng = np.random.default_rng(0)
+    return rng.integers(0, 256, size=(112, 168, 3), dtype=np.uint8)
+
+
+@pytest.mark.parametrize(
+    "overrides",
+    [{}, {"do_rescale": False}, {"do_normalize": False}, {"rescale_factor": 1 / 127.5}],
+)
+def test_fused_matches_stock_pixel_values(image, overrides):
+    """Test the patched processor yields the stock pixel_values, per-call overrides included."""
+    from app import install_fused_normalize
+
+    stock = SlowProcessor()
+    fused = SlowProcessor()
+    assert install_fused_normalize(fused)
+
+    expected = stock(images=[image], return_tensors="np", **overrides)["pixel_values"]
+    actual = fused(images=[image], return_tensors="np", **overrides)["pixel_values"]
+
+    np.testing.assert_allclose(actual, expected, rtol=1e-4, atol=1e-4)
+
+
+def test_other_processors_are_left_alone():
+    """Test processors other than the NumPy Qwen2-VL processor are not patched."""
+    from app import install_fused_normalize
+
+    class OtherProcessor(SlowProcessor):
+        pass
+
+    processor = OtherProcessor()
+    assert not install_fused_normalize(processor)
+    assert "normalize" not in vars(processor)
@@ -1,5 +1,7 @@
 """Tests for GutenOCR engine."""
 
+import importlib
+import json
 import unittest
 from pathlib import Path
 from unittest.mock import MagicMock, patch, PropertyMock
@@ -10,6 +12,13 @@ sys.path.insert(0, str(Path(__file__).parent.parent))
 from core.ocr_strategy import OCRResult
 
 
+def import_gutenocr_engine():
+    """Import the real engine module: test_api stubs it in sys.modules."""
+    with patch.dict(sys.modules):
+        sys.modules.pop("engines.gutenocr_engine", None)
+        return importlib.import_module("engines.gutenocr_engine")
+
+
 class TestGutenOCREngine(unittest.TestCase):
     """Test cases for GutenOCR engine."""
 
@@ -162,6 +171,21 @@ class TestGutenOCREngine(unittest.TestCase):
         self.assertEqual(blocks[0]["text"], "Hello")
         self.assertEqual(blocks[0]["confidence"], 0.95)
 
+    def test_gutenocr_parse_output_words_fenced_json(self):
+        """Test parsing WORDS output wrapped in a Markdown code fence."""
+        gutenocr_engine = import_gutenocr_engine()
+
+        engine = gutenocr_engine.GutenOCREngine(self.config)
+        engine.output_format = gutenocr_engine.GutenOCROutputFormat.WORDS
+
+        text = '```json\n[{"word": "Hello", "confidence": 0.95}]\n```\nDone.'
+        with patch.object(gutenocr_engine, "json_repair", None), \
+                patch.object(gutenocr_engine, "_json", json):
+            blocks = engine._parse_output(text)
+
+        self.assertEqual(len(blocks), 1)
+        self.assertEqual(blocks[0]["text"], "Hello")
+
     def test_gutenocr_estimate_confidence(self):
         """Test confidence estimation."""
         from engines.gutenocr_engine import GutenOCREngine
@@ -237,6 +261,40 @@ class TestGutenOCREngine(unittest.TestCase):
         self.assertEqual(result.metadata["engine"], "gutenocr")
         self.assertEqual(result.metadata["model_size"], "3b")
 
+    def test_gutenocr_batch_process_single_generate(self):
+        """Test batch_process runs one padded generate() per chunk, one result per path in order."""
+        import tempfile
+        import numpy as np
+        from PIL import Image
+
+        gutenocr_engine = import_gutenocr_engine()
+
+        mock_processor = MagicMock()
+        mock_processor.apply_chat_template.return_value = "formatted_prompt"
+        mock_processor.return_value = {"input_ids": np.ones((2, 3), dtype=np.int64)}
+        mock_processor.batch_decode.return_value = ["first page", "second page"]
+        mock_model = MagicMock()
+        mock_model.generate.return_value = np.ones((2, 6), dtype=np.int64)
+
+        engine = gutenocr_engine.GutenOCREngine({**self.config, "batch_size": 8})
+        engine._model = mock_model
+        engine._processor = mock_processor
+
+        with tempfile.TemporaryDirectory() as tmp:
+            paths = [Path(tmp) / name for name in ("a.png", "missing.png", "b.png")]
+            Image.new("RGB", (60, 40), color="white").save(paths[0])
+            Image.new("RGB", (40, 60), color="white").save(paths[2])
+            with patch.dict(sys.modules, {"torch": MagicMock()}):
+                results = engine.batch_process(paths)
+
+        mock_model.generate.assert_called_once()
+        _, kwargs = mock_processor.call_args
+        self.assertEqual(kwargs["text"], ["formatted_prompt"] * 2)
+        self.assertTrue(kwargs["padding"])
+        self.assertEqual([r.text for r in results], ["first page", "", "second page"])
+        self.assertIn("error", results[1].metadata)
+        self.assertEqual(results[2].layout["width"], 40)
+
 
 class TestGutenOCRIntegration(unittest.TestCase):
     """Integration tests for GutenOCR (requires dependencies)."""
@@ -39,6 +39,27 @@ class TestOCRFactory(unittest.TestCase):
 
         self.assertIn("désactivé", str(ctx.exception))
 
+    def test_uninstalled_engines_are_not_available(self):
+        """Test listing and auto-selection skip engines whose dependency is missing."""
+        from core import ocr_factory
+        from core.ocr_factory import OCREngineFactory, SelectionPriority
+
+        installed = {"paddleocr"}
+        with patch.object(ocr_factory, "_module_available", installed.__contains__), \
+                patch.dict(OCREngineFactory._selection_table, clear=True):
+            engines = OCREngineFactory.get_available_engines()
+            engine_info = OCREngineFactory.get_engine_info()
+            selected = OCREngineFactory.auto_select_engine(
+                priority=SelectionPriority.ACCURACY, has_gpu=True
+            )
+
+        self.assertIn("paddleocr", engines)
+        self.assertNotIn("gutenocr-3b", engines)
+        self.assertNotIn("surya", engines)
+        self.assertIn("paddleocr", engine_info)
+        self.assertNotIn("gutenocr", engine_info)
+        self.assertEqual(selected, "paddleocr")
+
 
 class TestDocumentProcessor(unittest.TestCase):
     """Test Document Processor functionality."""
@@ -155,6 +176,21 @@ class TestOCRResult(unittest.TestCase):
         self.assertEqual(json_data["confidence"], 0.85)
         self.assertEqual(json_data["metadata"]["engine"], "test")
 
+    def test_ocr_result_to_json_bytes(self):
+        """Test OCRResult serializes to the same document as to_json."""
+        import json
+        from core.ocr_strategy import OCRResult
+
+        result = OCRResult(
+            text="Tést",
+            confidence=0.85,
+            blocks=[{"text": "Tést", "bbox": [0, 0, 10, 10]}],
+            metadata={"engine": "test"},
+        )
+
+        self.assertEqual(json.loads(result.to_json_bytes()), result.to_json())
+        self.assertEqual(json.loads(result.to_json_bytes(indent=True)), result.to_json())
+
 
 class TestEngineSwitching(unittest.TestCase):
     """Test switching between different engines."""
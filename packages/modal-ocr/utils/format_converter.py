@@ -1,6 +1,8 @@
 """Format conversion utilities."""
 
 import json
+from itertools import groupby
+from operator import itemgetter
 from typing import Any, Dict, List, Optional
 
 from core.ocr_strategy import OCRResult
@@ -113,20 +115,23 @@ def merge_results(results: List[OCRResult]) -> OCRResult:
     if len(results) == 1:
         return results[0]
 
-    # Merge text
-    texts = [r.text for r in results if r.text]
-    merged_text = "\n\n---\n\n".join(texts)
-
-    # Merge blocks
+    # Merge text and blocks, averaging confidence with a running sum, in one pass
+    texts = []
     all_blocks = []
-    for i, result in enumerate(results):
+    total_confidence = 0.0
+    confident_pages = 0
+    for page, result in enumerate(results, 1):
+        if result.text:
+            texts.append(result.text)
+        if result.confidence > 0:
+            total_confidence += result.confidence
+            confident_pages += 1
         for block in result.blocks:
-            block["page"] = i + 1
-            all_blocks.append(block)
+            block["page"] = page
+        all_blocks.extend(result.blocks)
 
-    # Average confidence
-    confidences = [r.confidence for r in results if r.confidence > 0]
-    avg_confidence = sum(confidences) / len(confidences) if confidences else 0.0
+    merged_text = "\n\n---\n\n".join(texts)
+    avg_confidence = total_confidence / confident_pages if confident_pages else 0.0
 
     # Merge metadata
     merged_metadata = {
@@ -161,22 +166,21 @@ def extract_tables(result: OCRResult) -> List[Dict[str, Any]]:
     # Try to detect tables from blocks
     # This is a simple heuristic - could be improved with ML
     if result.blocks:
-        # Group blocks by y-coordinate to find rows
-        rows: Dict[int, List[Dict]] = {}
-        for block in result.blocks:
-            if "bbox" in block:
-                y = block["bbox"].get("y1", 0)
-                y_key = int(y / 30) * 30  # 30px tolerance
-                if y_key not in rows:
-                    rows[y_key] = []
-                rows[y_key].append(block)
+        # One sort by (row, x); rows are the runs of equal y_key (30px tolerance).
+        # The block index keeps the order stable and avoids comparing dicts.
+        blocks = result.blocks
+        keys = sorted(
+            (int(block["bbox"].get("y1", 0) / 30) * 30, block["bbox"].get("x1", 0), index)
+            for index, block in enumerate(blocks)
+            if "bbox" in block
+        )
 
         # Check if we have table-like structure (multiple columns per row)
         potential_table_rows = []
-        for y_key in sorted(rows.keys()):
-            row_blocks = sorted(rows[y_key], key=lambda b: b["bbox"].get("x1", 0))
-            if len(row_blocks) >= 2:  # At least 2 columns
-                potential_table_rows.append([b["text"] for b in row_blocks])
+        for _, row in groupby(keys, key=itemgetter(0)):
+            row_texts = [blocks[index]["text"] for _, _, index in row]
+            if len(row_texts) >= 2:  # At least 2 columns
+                potential_table_rows.append(row_texts)
 
         if len(potential_table_rows) >= 2:
             tables.append(
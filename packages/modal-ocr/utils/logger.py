@@ -84,7 +84,7 @@ class LogContext:
 
         self.start_time = time.time()
         context_str = ", ".join(f"{k}={v}" for k, v in self.context.items())
-        self.logger.info(f"Starting {self.operation} ({context_str})")
+        self.logger.info("Starting %s (%s)", self.operation, context_str)
         return self
 
     def __exit__(self, exc_type, exc_val, exc_tb):
@@ -94,10 +94,10 @@ class LogContext:
 
         if exc_type is not None:
             self.logger.error(
-                f"Failed {self.operation} after {duration:.2f}s: {exc_val}"
+                "Failed %s after %.2fs: %s", self.operation, duration, exc_val
             )
         else:
-            self.logger.info(f"Completed {self.operation} in {duration:.2f}s")
+            self.logger.info("Completed %s in %.2fs", self.operation, duration)
 
         return False  # Don't suppress exceptions
 
@@ -121,4 +121,4 @@ def log_progress(
         logger = get_logger()
 
     percentage = (current / total) * 100 if total > 0 else 0
-    logger.info(f"{prefix}: {current}/{total} ({percentage:.1f}%)")
+    logger.info("%s: %s/%s (%.1f%%)", prefix, current, total, percentage)